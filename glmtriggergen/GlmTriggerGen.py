@@ -19,7 +19,6 @@
 # under the License.
 #################################################################################################
 
-import glob
 import os
 import signal
 import sys
@@ -28,20 +27,28 @@ import time
 from collections import deque, namedtuple
 from datetime import datetime, timedelta
 
-import numpy as np
 from joblib import load
 
 import src.helper_funs.database_helpers as dbh
 import src.helper_funs.datetime_helpers as dth
 from config import glmtriggergenconfig as settings
 from src.helper_funs import status_helpers_queue
+from src.helper_funs.backfill_helpers import run_parallel_backfill
+from src.helper_funs.cluster_helpers import StreamingClusterState
 from src.helper_funs.file_io_helpers import (
     cleanup_files,
     download_glm_files,
-    get_glm_file_meta,
+    get_glm_file_index,
     load_cal_tables,
+    write_event_trigger_array,
 )
 from src.helper_funs.glm_data_set_helpers import process_glm_files
+from src.helper_funs.glm_decode_helpers import set_decode_workers
+from src.helper_funs.netcdf_cache_helpers import NetcdfFileCache
+from src.helper_funs.prefetch_helpers import (
+    GlmFilePrefetcher,
+    get_upcoming_event_dates,
+)
 from src.helper_funs.util_helpers import in_glm_file_latter_half, signal_handler
 
 
@@ -74,6 +81,9 @@ def process_inputs(sys_input):
             output_trigger_file - if true, save a .csv file of trigger times and
             number of triggers to data_dir. Default is false
 
+            num_backfill_workers - number of worker processes to process
+            historical events with. Default is 1 (no worker processes)
+
         event_dates_que - table of event dates that should be checked
 
     More information can be found by using the --help or -h flags
@@ -86,6 +96,7 @@ def process_inputs(sys_input):
     do_plots = False
     debug_mode = False
     output_trigger_file = False
+    num_backfill_workers = 1
     continuous_mode = len(sys_input) == 1
     local_only = False
     generate_event_dates = False
@@ -147,6 +158,10 @@ INPUTS:
 -o
     output trigger data: Save a .csv file of trigger times and number of
       triggers to data_dir. (NOT RECOMMENDED IN CONTINUOUS MODE)
+-j
+    backfill workers: Number of worker processes to process the events from
+      -f, -e, and -g with. The events are split into contiguous time ranges
+      that are processed in parallel. Cannot be used in continuous mode.
 --keep-netcdfs
     save netcdfs: If --keep-netcdfs is included, none of the downloaded GLM
       netCDF files will be deleted after processing. (NOT RECOMMENDED IN
@@ -223,6 +238,12 @@ INPUTS:
             output_trigger_file = True
             input_count += 1
 
+        elif sys_input[input_count] == "-j":  # number of backfill workers
+            num_backfill_workers = int(sys_input[input_count + 1])
+            if num_backfill_workers < 1:
+                raise ValueError("The number of backfill workers must be at least 1")
+            input_count += 2
+
         elif sys_input[input_count] == "--keep-netcdfs":  # turn on keep_netcdfs
             keep_netcdfs = True
             input_count += 1
@@ -244,24 +265,28 @@ INPUTS:
         else:
             raise ValueError("Unrecognized option: " + str(sys_input[input_count]))
 
+    # Local files are provided by the user, so make sure the index of the
+    # files in the data directory is up to date
+    if local_only:
+        get_glm_file_index(data_dir).rescan()
+
     if generate_event_dates:  # add all the files to the event_dates_que deque
         print("Generating event dates from the data directory")
-        # grab the file times and add them to event_dates_que
-        file_paths = glob.glob(data_dir + "**/*.nc", recursive=True)
-        for file_path in file_paths:
-            file_start_time_ssue, file_end_time_ssue, _ = get_glm_file_meta(file_path)
-            if (
-                processing_start_time < file_end_time_ssue
-                and processing_end_time >= file_start_time_ssue
-            ):
-                # Define the event time as the file start time + processing interval / 2
-                gen_event_time = (
-                    round(file_start_time_ssue) + settings.PROCESS_INTERVAL_S / 2
-                )
-                # Check if any other event times overlap
-                # (Start times between glm satellites should be consistent)
-                if gen_event_time not in event_dates_que:
-                    event_dates_que.appendleft(gen_event_time)
+        # grab the times of the files within the processing window and add
+        # them to event_dates_que
+        glm_file_index = get_glm_file_index(data_dir)
+        for file_path in glm_file_index.query(
+            processing_start_time, processing_end_time
+        ):
+            file_start_time_ssue = glm_file_index.files[file_path][0]
+            # Define the event time as the file start time + processing interval / 2
+            gen_event_time = (
+                round(file_start_time_ssue) + settings.PROCESS_INTERVAL_S / 2
+            )
+            # Check if any other event times overlap
+            # (Start times between glm satellites should be consistent)
+            if gen_event_time not in event_dates_que:
+                event_dates_que.appendleft(gen_event_time)
 
     if len(event_dates_que) > 0:
         # Sort the specified historic event dates from oldest to newest
@@ -282,6 +307,9 @@ INPUTS:
     if len(event_dates_que) == 0:
         raise ValueError("No events provided and continuous mode was not activated")
 
+    if continuous_mode and num_backfill_workers > 1:
+        raise ValueError("Backfill workers (-j) cannot be used in continuous mode")
+
     # Create a named tuple class for setup using the namedtuple factory
     # The class instances will be immutable and allow dot notation for
     # accessing data members.
@@ -296,6 +324,7 @@ INPUTS:
             "output_trigger_file",
             "debug_mode",
             "processing_end_time",
+            "num_backfill_workers",
         ],
     )
     setup = SetupNamedTuple(
@@ -307,6 +336,7 @@ INPUTS:
         output_trigger_file,
         debug_mode,
         processing_end_time,
+        num_backfill_workers,
     )
 
     return [setup, event_dates_que]
@@ -339,6 +369,21 @@ def main():
     status_thread.start()
     print("Server listening for status requests")
 
+    # Process historical events over a pool of worker processes if requested.
+    # Each worker loads its own calibration tables, model, and database helper.
+    if setup.num_backfill_workers > 1:
+        status_helpers_queue.send_setup_status(setup, event_dates_que, status_helper)
+        signal.signal(signal.SIGINT, signal_handler)
+        print_processing_header()
+        [event_file_dates, triggered_events] = run_parallel_backfill(
+            setup, event_dates_que, status_helper
+        )
+        if setup.output_trigger_file:
+            write_event_trigger_array(
+                setup.data_dir, event_file_dates, triggered_events
+            )
+        return
+
     # Instantiate a database helper if requested
     if settings.SAVE_TO_DATABASE:
         db_helper = dbh.DBHelper(status_helper)
@@ -351,6 +396,9 @@ def main():
     # Prepare to handle Ctrl+C
     signal.signal(signal.SIGINT, signal_handler)
 
+    # Decode the files of each batch over a pool of worker processes if requested
+    set_decode_workers(settings.DECODE_WORKERS)
+
     # Load all of the GOES GLM calibration tables
     l2_cal_tables_dict = load_cal_tables(settings.L2_CAL_TABLES_PATH)
 
@@ -360,16 +408,30 @@ def main():
     )
 
     # Print out some useful info header
-    print(
-        "  TIME PROCESSING   #Files LastTime MeanTime  #TRIGGERS     CURRENT TIME    #EVENTS"
-    )
-    print(
-        "------------------- ------ -------- -------- ---------- ------------------- -------"
-    )
+    print_processing_header()
     mean_time = 20.0
 
-    # Store names of files already in the data_dir
-    local_filenames = glob.glob(setup.data_dir + "**/*.nc", recursive=True)
+    # Keep downloaded files in a size limited cache if requested, otherwise
+    # store names of files already in the data_dir to clean up as we go
+    if (not setup.keep_netcdfs) and (settings.NETCDF_CACHE_MAX_BYTES > 0):
+        netcdf_cache = NetcdfFileCache(setup.data_dir, settings.NETCDF_CACHE_MAX_BYTES)
+        local_filenames = []
+    else:
+        netcdf_cache = None
+        local_filenames = get_glm_file_index(setup.data_dir).file_paths()
+
+    # Download the files for upcoming events in the background
+    if (not setup.local_only) and (settings.PREFETCH_WINDOWS > 0):
+        prefetcher = GlmFilePrefetcher(setup.data_dir, status_helper)
+    else:
+        prefetcher = None
+
+    # Carry the clusters from batch to batch if requested. Only continuous
+    # mode processes consecutive batches.
+    if setup.continuous_mode and settings.STREAMING_CLUSTERING:
+        cluster_state = StreamingClusterState()
+    else:
+        cluster_state = None
 
     # Variable to iterate through in the processing while loop
     event_index = len(event_dates_que) - 1
@@ -466,7 +528,11 @@ def main():
         clock_time = time.time()
         got_all = True
         if not setup.local_only:
-            # Attempt to get the latest files
+            # Hand over any files already prefetched for this event
+            if prefetcher is not None:
+                local_filenames.extend(prefetcher.collect(cur_event_ssue))
+
+            # Attempt to get the latest (or still missing) files
             [local_names, got_all] = download_glm_files(
                 cur_event_ssue - settings.PROCESS_TIME_SIZE_S / 2,
                 cur_event_ssue + settings.PROCESS_TIME_SIZE_S / 2,
@@ -475,6 +541,22 @@ def main():
             )
             local_filenames.extend(local_names)
 
+            # Start downloading the files for the next events while this
+            # event is processed. Only events old enough to have all of their
+            # files on the gcloud are prefetched.
+            if prefetcher is not None:
+                now_ssue = (datetime.utcnow() - dth.EPOCH).total_seconds()
+                for next_event_ssue in get_upcoming_event_dates(
+                    event_dates_que,
+                    event_index,
+                    setup.continuous_mode,
+                    settings.PREFETCH_WINDOWS,
+                ):
+                    if (now_ssue - next_event_ssue >= settings.WAIT_TIME_S) and (
+                        next_event_ssue < setup.processing_end_time
+                    ):
+                        prefetcher.schedule(next_event_ssue)
+
         # Check for data, then process the glm files (look for events)
         if (not got_all) and (time_to_now_s < settings.MAX_HOLD_TIME):
             # If all files did not download and time_to_now_s is within
@@ -496,6 +578,7 @@ def main():
                 setup.do_plots,
                 setup.debug_mode,
                 setup.output_trigger_file,
+                cluster_state,
             )
 
             # Store for post-processing analysis
@@ -527,7 +610,16 @@ def main():
 
             # Unless the --keep-netcdfs flag was provided, delete the files
             # that will not be needed for future processing
-            if not setup.keep_netcdfs:
+            if netcdf_cache is not None:
+                # Hand the new files to the cache, then evict down to its budget
+                netcdf_cache.add(local_filenames)
+                local_filenames = []
+                netcdf_cache.touch_window(
+                    cur_event_ssue - settings.PROCESS_TIME_SIZE_S / 2,
+                    cur_event_ssue + settings.PROCESS_TIME_SIZE_S / 2,
+                )
+                netcdf_cache.evict(event_dates_que)
+            elif not setup.keep_netcdfs:
                 local_filenames = cleanup_files(local_filenames, event_dates_que)
 
             # Calculate the mean time to process and the current time
@@ -583,27 +675,32 @@ def main():
     # End of processing while loop
 
     if setup.output_trigger_file:
-        # Concatenate the performance metrics and save as a .csv to output directory
-        event_trigger_array = np.concatenate(
-            (
-                np.array(event_file_dates).reshape(-1, 1),
-                np.array(triggered_events).reshape(-1, 1).astype("str"),
-            ),
-            axis=1,
-        )
-        np.savetxt(
-            setup.data_dir + "event_trigger_array.csv",
-            event_trigger_array,
-            delimiter=",",
-            header="EventDateTime,Triggers",
-            comments="",
-            fmt="%s",
-        )
+        write_event_trigger_array(setup.data_dir, event_file_dates, triggered_events)
+
+    # Wait on any outstanding prefetches so their files get cleaned up too
+    if prefetcher is not None:
+        local_filenames.extend(prefetcher.shutdown())
 
     # Unless the --keep-netcdfs flag was provided, clean up any remaining files
-    if not setup.keep_netcdfs:
+    if netcdf_cache is not None:
+        netcdf_cache.add(local_filenames)
+        netcdf_cache.evict(event_dates_que)
+    elif not setup.keep_netcdfs:
         _ = cleanup_files(local_filenames, event_dates_que)
 
 
+def print_processing_header():
+    """print_processing_header()
+
+    Print out the header of the columns printed for each processed event
+    """
+    print(
+        "  TIME PROCESSING   #Files LastTime MeanTime  #TRIGGERS     CURRENT TIME    #EVENTS"
+    )
+    print(
+        "------------------- ------ -------- -------- ---------- ------------------- -------"
+    )
+
+
 if __name__ == "__main__":
     main()
@@ -64,6 +64,11 @@ GLM_TG_VERSION_FULL = GLM_TG_VERSION + COMMIT_HASH_AND_BRANCH_NAME
 
 # Path information for glm processing
 GS_UTIL = os.environ.get("GS_UTIL", "gsutil")
+# Backend used to reach the GOES gcloud buckets: "http" (public https access),
+# "gsutil" (runs GS_UTIL), or "local" (a directory mirroring the buckets at
+# LOCAL_STORAGE_ROOT)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "gsutil")
+LOCAL_STORAGE_ROOT = os.environ.get("LOCAL_STORAGE_ROOT", "")
 BASE_PATH = os.environ.get("BASE_PATH", "/home/developer/glmtriggergen/")
 DATA_PATH = os.path.join(BASE_PATH, os.environ.get("DATA_DIR", "data/"))
 L2_CAL_TABLES_PATH = os.path.join(
@@ -82,6 +87,14 @@ DB_PASSWORD = os.environ.get("DB_PASSWORD", "password")
 DB_HOST = os.environ.get("DB_HOST", "database")
 DB_PORT = int(os.environ.get("DB_PORT", "5432"))
 
+# Optional file to persist gcloud directory listings in between runs (one json
+# line per listing)
+GCLOUD_LISTING_CACHE_FILE = os.environ.get("GCLOUD_LISTING_CACHE_FILE", "")
+# Bytes of GLM netCDF files to keep in the data directory for reuse. Least
+# recently used files beyond this are deleted. When 0, files are deleted as
+# soon as no queued event needs them.
+NETCDF_CACHE_MAX_BYTES = int(os.environ.get("NETCDF_CACHE_MAX_BYTES", "0"))
+
 # Save results to database
 SAVE_TO_DATABASE = os.environ.get("SAVE_TO_DATABASE", "True") == "True"
 
@@ -121,6 +134,13 @@ SAT_INFO_DICT = {
 SAT_ID_NUMS = [satellite_info["ID"] for satellite_info in SAT_INFO_DICT.values()]
 CLUSTER_TIME_S = 2.0
 CLUSTER_DISTANCE_M = 25.0e3
+# In continuous mode, carry the clusters of each batch into the next, so only
+# newly arrived groups are clustered and each cluster is reported once, after
+# no more groups can join it. Otherwise each batch is clustered from scratch
+# and clusters that may be reported by a neighboring batch are filtered out.
+# Clusters still open when the next batch processed is not the following one
+# (e.g., while catching up on missed data) are not reported.
+STREAMING_CLUSTERING = False
 # Will filter out all clusters with durations beyond this limit
 CLUSTER_DURATION_LIMIT_S = 10.0
 MIN_ENERGY_LVL_J = 5e-15
@@ -130,7 +150,48 @@ VALID_RANK = 30
 # MAX_NUM_TRIGGERS limits the number of triggers from a single batch of files
 # to less than MAX_NUM_TRIGGERS
 MAX_NUM_TRIGGERS = 20
+# Batches with many more groups than usual (e.g., during large lightning
+# storms) can take longer than PROCESS_INTERVAL_S to process. Groups beyond
+# MAX_GROUPS_PER_BATCH are shed before clustering: first groups with a degraded
+# quality flag, then groups below SHED_ENERGY_FRACTION * MIN_ENERGY_LVL_J, then
+# the groups in the densest SHED_CELL_SIZE_DEG lat-lon cells of each satellite.
+# 0 turns off shedding.
+MAX_GROUPS_PER_BATCH = 0
+SHED_ENERGY_FRACTION = 0.5
+SHED_CELL_SIZE_DEG = 1.0
 STRONG_SIGNAL_RANK_THRESHOLD = 175
+# Once the candidate clusters (the live clusters, or after ranking, the
+# clusters still able to trigger) hold less than COMPACT_LIVE_FRACTION of the
+# groups, the rest of the groups and their events are dropped, so the later
+# stages of the batch only process the candidate data (0 turns off compaction).
+COMPACT_LIVE_FRACTION = 0.25
+# The stages process_glm_files runs on each batch, in order. Optional stages
+# can be removed or moved, as long as each stage still comes after the stages
+# producing its inputs (see glm_data_set_helpers.PROCESS_STAGE_REGISTRY).
+# Required stages (load, cluster, mark_redundant_clusters, mark_higher_energies,
+# rank, limit_triggers, compute_source_intensities, and publish) cannot be
+# removed. A batch stops early once no candidate clusters remain.
+PROCESS_STAGES = [
+    "load",
+    "shed_load",
+    "cluster",
+    "mark_redundant_clusters",
+    "mark_long_durations",
+    "mark_low_altitude_stereo_events",
+    "mark_higher_energies",
+    "mark_bad_points",
+    "mark_goes19_anomalies",
+    "rank",
+    "omit_large_group_size_clusters",
+    "rocket_filter",
+    "limit_triggers",
+    "estimate_velocities",
+    "prune_event_data",
+    "compute_source_intensities",
+    "write_trigger_data",
+    "plot_clusters",
+    "publish",
+]
 # For the Rocket model data preprocessing
 ROCKET_MODEL_NAME = "rocket_pipeline_v2.joblib"
 DOWN_SAMPLE_LENGTH = 1000  # Chosen due to distributions in training data
@@ -147,5 +208,28 @@ PROCESS_INTERVAL_S = 20.0
 PROCESS_TIME_SIZE_S = 20.0
 # The max time (in secs) to hold off processing files until all are downloaded
 MAX_HOLD_TIME = 10000
+# The max number of .nc files to download at once, and the max number of those
+# downloads that can come from a single GOES satellite
+DOWNLOAD_MAX_WORKERS = 8
+DOWNLOAD_MAX_WORKERS_PER_SAT = 2
+# Time (in secs) before a gcloud listing of a recent hour is refreshed. Listings
+# fetched more than MAX_HOLD_TIME after their hour ended are never refreshed.
+GCLOUD_LISTING_TTL_S = 20.0
+# The number of upcoming batches to download in the background while the
+# current batch is processed (0 turns off prefetching)
+PREFETCH_WINDOWS = 2
+# The max bytes of decoded GLM file data to hold in memory, so the files shared
+# by consecutive batches are only decoded once (0 turns off the cache)
+DECODED_FILE_CACHE_MAX_BYTES = 1024**3
+# The number of worker processes GlmTriggerGen uses to decode the GLM files of a
+# batch in parallel (1 decodes serially). Other callers decode serially unless
+# they call glm_decode_helpers.set_decode_workers. Files are never decoded on
+# threads, since netCDF4/HDF5 cannot open files from several threads at once.
+DECODE_WORKERS = 1
+# The number of worker processes that cluster a batch in parallel, each
+# searching a longitude tile of the data (1 clusters serially). Batches with
+# fewer than CLUSTER_TILE_MIN_GROUPS groups are always clustered serially.
+CLUSTER_WORKERS = 1
+CLUSTER_TILE_MIN_GROUPS = 50000
 # The max number of status and log records to hold in the queue and send on each status request
 MAX_QUEUED_STATUS_RECORDS = 300
@@ -17,18 +17,17 @@
 # under the License.
 #################################################################################################
 
-import glob
 import warnings
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import numpy as np
 import numpy.ma as ma
 import zmq
 from google.protobuf.json_format import MessageToJson
 from matplotlib import pyplot as plt
-from netCDF4 import Dataset
 from pandas import DataFrame
 
+import src.helper_funs.cluster_helpers as chf
 import src.helper_funs.datetime_helpers as dth
 import src.helper_funs.geo_helpers as ghf
 import src.helper_funs.smtp_helpers as smtp
@@ -36,10 +35,25 @@ import src.helper_funs.velocity_helpers as vhf
 from config import glmtriggergenconfig as settings
 from src import rocketUtils
 from src.helper_funs.calibration_helpers import find_nearest_unmasked_value
-from src.helper_funs.file_io_helpers import get_glm_file_meta
-from src.helper_funs.math_helpers import comb, continuous_above_min, energy_filter
+from src.helper_funs.file_io_helpers import get_glm_file_index, get_glm_file_meta
+from src.helper_funs.glm_decode_helpers import (
+    DECODED_FILE_CACHE,
+    get_block_basetime_ssue,
+)
+from src.helper_funs.index_helpers import ClusterSegmentIndex, GroupEventIndex
+from src.helper_funs.math_helpers import (
+    comb,
+    segment_continuous_above_min,
+    segment_energy_filter,
+    segment_low_medians,
+    segment_percentiles,
+)
 from src.helper_funs.plotting_helpers import plot_pairs
-from src.helper_funs.util_helpers import debug_print, in_glm_file_latter_half
+from src.helper_funs.util_helpers import (
+    debug_print,
+    get_cluster_key,
+    in_glm_file_latter_half,
+)
 from src.protobuf import glm_pb2, msg_track_pb2
 
 # Constants which affect the degree to which the calibration tables are
@@ -81,6 +95,16 @@ HALF_GLM_SAMPLE_PERIOD_S = GLM_SAMPLE_PERIOD_S / 2
 # Default nonstereo altitude estimate for an event (in meters)
 DEFAULT_NONSTEREO_ALTITUDE_ESTIMATE_M = 32000
 
+# The group_quality_flag value of groups with good quality (any other value
+# flags a degraded group)
+GOOD_QUALITY_FLAG = 0
+
+# Data types of the compact group level arrays
+CLUSTER_ID_DTYPE = np.int32
+SAT_ID_DTYPE = np.uint8
+FLAG_DTYPE = np.int8
+SAT_POS_INDEX_DTYPE = np.uint16
+
 # GOES-19 anomaly regions
 GOES19_ANOMALY_LAT_LONS = [(-21.2, -121.4), (3.4, -127.9)]
 GOES19_ANOMALY_TOLERANCE_DEG = 0.5
@@ -144,8 +168,11 @@ class GlmDataSet:
         cloud_top_lat_lon_deg - the latitude and longitude (in degrees) provided
         for the point in the file
 
-        sat_pos_ecef_m - the position of the satellite at the time the point was
-        recorded.
+        sat_pos_table - the positions of the satellites (one row per file
+        loaded) in the ECEF coordinate frame (in meters)
+
+        sat_pos_index - the row of sat_pos_table holding the position of the
+        satellite at the time the point was recorded (see get_sat_pos_ecef_m)
 
         high_pos_ecef_m - the position in the ECEF coordinate frame (in meters) at
         HIGH_ALTITUDE_M given the satellite position
@@ -197,6 +224,34 @@ class GlmDataSet:
         the result
     """
 
+    # Names of the arrays with one row per event, which are subset together
+    EVENT_ARRAY_NAMES = (
+        "event_time",
+        "event_lat",
+        "event_lon",
+        "event_energy",
+        "event_intensity_wsr",
+        "event_parent_group_id",
+    )
+
+    # Names of the arrays with one row per group, which are subset together
+    GROUP_ARRAY_NAMES = (
+        "cloud_top_lat_lon_deg",
+        "high_pos_ecef_m",
+        "low_pos_ecef_m",
+        "yaw_flip_flag",
+        "group_id",
+        "time_s",
+        "energy_joules",
+        "source_intensity_wpsr",
+        "sat_id",
+        "sat_pos_index",
+        "cluster_id",
+        "quality_flag",
+        "fitness",
+        "highest_energy",
+    )
+
     def __init__(self, status_helper):
         # NEEDED CONSTANTS
         # definition of the cloud top layer
@@ -216,26 +271,33 @@ class GlmDataSet:
         self.event_energy = np.array([])
         self.event_intensity_wsr = np.array([])
         self.event_parent_group_id = np.array([])
+        # index from group IDs to their events, built on first use after the
+        # event data is loaded (see get_group_event_index)
+        self.group_event_index = None
 
         # Group / Cluster level data
         # unique id provided by the glm data (called group_id)
         self.group_id = np.array([])
         # satellite that provided the data
-        self.sat_id = np.array([])
+        self.sat_id = np.array([], dtype=SAT_ID_DTYPE)
         # earliest and latest times amongst all files in batch processed
         self.files_start_ssue = np.nan
         self.files_end_ssue = np.nan
         # derived cluster (SDL made groups) of the data
-        self.cluster_id = np.array([])
+        self.cluster_id = np.array([], dtype=CLUSTER_ID_DTYPE)
         self.num_clusters = 0
+        # index of the rows sorted by cluster, satellite, and time, built on
+        # first use after clustering (see get_cluster_segment_index)
+        self.cluster_segment_index = None
         # position information from glm (provided and derived)
         self.cloud_top_lat_lon_deg = np.array([])
-        self.sat_pos_ecef_m = np.array([])
+        self.sat_pos_table = np.zeros((0, 3))
+        self.sat_pos_index = np.array([], dtype=SAT_POS_INDEX_DTYPE)
         self.high_pos_ecef_m = np.array([])
         self.low_pos_ecef_m = np.array([])
         # a flag indicating whether the satellite is upright (0), inverted (2),
         # or somewhere between (1)
-        self.yaw_flip_flag = np.array([])
+        self.yaw_flip_flag = np.array([], dtype=FLAG_DTYPE)
         # time information (seconds since unix epoch)
         self.time_s = np.array([])
         self.basetime_str = ""
@@ -257,8 +319,8 @@ class GlmDataSet:
 
         # Quality information (provided and derived)
         self.quality_flag = np.array([])
-        self.fitness = np.array([])
-        self.highest_energy = np.array([])
+        self.fitness = np.array([], dtype=FLAG_DTYPE)
+        self.highest_energy = np.array([], dtype=FLAG_DTYPE)
         self.ranks = np.array([])
 
         # Store the send_status and send_logs methods as glmDataSet methods
@@ -278,13 +340,31 @@ class GlmDataSet:
         Returns:
             num_unique_clusters (int): The number of unique cluster IDs
         """
-        bad_cluster_mask = self.cluster_id == self.BAD_CLUSTER_ID
-        good_cluster_ids = self.cluster_id[~bad_cluster_mask]
-        num_unique_clusters = len(np.unique(good_cluster_ids))
+        num_unique_clusters = len(self.get_cluster_segment_index().live_cluster_ids())
         if update_self:
             self.num_clusters = num_unique_clusters
         return num_unique_clusters
 
+    def decode_glm_files(self, file_paths):
+        """blocks = decode_glm_files(self, file_paths)
+
+        Get the decoded data of the GLM files listed in file_paths, decoding
+        the files that were not already decoded for a previous batch
+
+        INPUTS:
+            self - class instance
+
+            file_paths - files to decode (path and filename)
+
+        OUTPUTS:
+            blocks - decoded data for each file (see decode_glm_file)
+        """
+        return DECODED_FILE_CACHE.get_many(
+            file_paths,
+            (self.CLOUD_TOP_EQUATOR_M, self.CLOUD_TOP_POLE_M),
+            (self.HIGH_ALTITUDE_M, self.LOW_ALTITUDE_M),
+        )
+
     def load_glm_files(self, file_paths):
         """load_glm_files(self, file_paths)
 
@@ -302,37 +382,48 @@ class GlmDataSet:
         if not file_paths:
             return
 
-        # temporary python arrays to hold the data between files
-        event_time = []
-        event_lat = []
-        event_lon = []
-        event_energy = []
-        event_parent_group_id = []
-        lat = []
-        lon = []
-        time = []
-        energy = []
-        q_flag = []
-        flip_flag = []
-        g_id = []
-        sat_ids = []
-        sat_pos_ecef = []
+        blocks = self.decode_glm_files(file_paths)
+        num_groups = [len(block["group_id"]) for block in blocks]
+        num_events = [len(block["event_parent_group_id"]) for block in blocks]
+        group_offsets = np.concatenate(([0], np.cumsum(num_groups)))
+        event_offsets = np.concatenate(([0], np.cumsum(num_events)))
+
+        # allocate the class arrays for all of the files at once
+        total_groups = group_offsets[-1]
+        total_events = event_offsets[-1]
+        first_block = blocks[0]
+        self.event_time = np.empty(total_events)
+        self.event_lat = np.empty(total_events, first_block["event_lat"].dtype)
+        self.event_lon = np.empty(total_events, first_block["event_lon"].dtype)
+        self.event_energy = np.empty(total_events, first_block["event_energy"].dtype)
+        self.event_parent_group_id = np.empty(
+            total_events, first_block["event_parent_group_id"].dtype
+        )
+        self.cloud_top_lat_lon_deg = np.empty(
+            (total_groups, 2), first_block["cloud_top_lat_lon_deg"].dtype
+        )
+        self.high_pos_ecef_m = np.empty((total_groups, 3))
+        self.low_pos_ecef_m = np.empty((total_groups, 3))
+        self.sat_pos_table = np.empty((len(blocks), 3))
+        self.sat_pos_index = np.empty(total_groups, SAT_POS_INDEX_DTYPE)
+        self.yaw_flip_flag = np.empty(total_groups, FLAG_DTYPE)
+        self.sat_id = np.empty(total_groups, SAT_ID_DTYPE)
+        self.group_id = np.empty(total_groups, first_block["group_id"].dtype)
+        self.time_s = np.empty(total_groups)
+        self.energy_joules = np.empty(total_groups, first_block["energy_joules"].dtype)
+        self.quality_flag = np.empty(total_groups, first_block["quality_flag"].dtype)
+
+        # merge the files in the order given, which is sorted by start time
         files_start_ssue = np.nan
         files_end_ssue = np.nan
-
-        for file_path in file_paths:
+        for file_ind, (file_path, block) in enumerate(zip(file_paths, blocks)):
             file_start_ssue, file_end_ssue, sat_id = get_glm_file_meta(file_path)
             files_start_ssue = np.nanmin([files_start_ssue, file_start_ssue])
             files_end_ssue = np.nanmax([files_end_ssue, file_end_ssue])
 
-            # open up the file
-            nc_data = Dataset(file_path, "r")
-
             # grab the basetime
-            basetime = datetime(2000, 1, 1, 12, 0, 0) + timedelta(
-                seconds=float(nc_data.variables["product_time"][:])
-            )
-            if (basetime - dth.EPOCH).total_seconds() < self.basetime_ssue:
+            basetime = block["basetime"]
+            if get_block_basetime_ssue(block) < self.basetime_ssue:
                 error_message = (
                     "GOES data ingest relies on processing earlier "
                     "files first, but subsequent file basetime is less "
@@ -341,108 +432,225 @@ class GlmDataSet:
                 self.send_logs([("error", error_message)])
             if self.basetime_ssue == 0:
                 self.basetime_str = basetime.strftime("%Y/%m/%d %H:%M:%S")
-                self.basetime_ssue = (basetime - dth.EPOCH).total_seconds()
-            time_adjust = (basetime - dth.EPOCH).total_seconds() - self.basetime_ssue
-
-            # grab satellite position
-            sat_pos = ghf.adjusted_lat_lon_to_ecef(
-                np.array(
-                    [
-                        nc_data.variables["nominal_satellite_subpoint_lat"][:],
-                        nc_data.variables["nominal_satellite_subpoint_lon"][:],
-                        nc_data.variables["nominal_satellite_height"][:].data * 1e3,
-                    ]
-                )
-            )
-
-            # Store the event (or GLM pixel) time, location, energy, and parent group ID
-            # Account for change from seconds to milliseconds in L2 data on Dec 4th, 2018
-            if basetime < datetime(2018, 12, 4, 0, 0, 0):
-                event_time.append(
-                    time_adjust
-                    + 0.001 * np.float64(nc_data.variables["event_time_offset"][:])
-                )
-            else:
-                event_time.append(
-                    time_adjust + np.float64(nc_data.variables["event_time_offset"][:])
-                )
-            event_lat.append(nc_data.variables["event_lat"][:])
-            event_lon.append(nc_data.variables["event_lon"][:])
-            # Carefully handle loading the event energies
-            event_energy.append(self.extract_event_energy(nc_data))
-            event_parent_group_id.append(nc_data.variables["event_parent_group_id"][:])
-
-            # grab the desired information, append to previous values
-            lat.append(nc_data.variables["group_lat"][:])
-            lon.append(nc_data.variables["group_lon"][:])
-            if basetime < datetime(2018, 12, 4, 0, 0, 0):
-                group_time = time_adjust + 0.001 * np.float64(
-                    nc_data.variables["group_time_offset"][:]
-                )
-            else:
-                group_time = time_adjust + np.float64(
-                    nc_data.variables["group_time_offset"][:]
-                )
-            # If the group_time consist of a single np.float then insert it into a list
-            if isinstance(group_time, np.floating):
-                group_time = [group_time]
-            time.append(group_time)
-            energy.append(nc_data.variables["group_energy"][:])
-            q_flag.append(nc_data.variables["group_quality_flag"][:])
-            g_id.append(nc_data.variables["group_id"][:])
-            flip_flag.append(
-                list(
-                    np.ma.getdata(nc_data.variables["yaw_flip_flag"][:]).tolist()
-                    * np.full(len(g_id[-1]), 1)
-                )
-            )
-            sat_ids.append(list(sat_id * np.ones(len(g_id[-1]))))
-            sat_pos_ecef.append(np.tile(sat_pos, [len(g_id[-1]), 1]))
+                self.basetime_ssue = get_block_basetime_ssue(block)
+            time_adjust = get_block_basetime_ssue(block) - self.basetime_ssue
+
+            # copy the event (or GLM pixel) data, with the times shifted to be
+            # relative to the batch basetime
+            events = slice(event_offsets[file_ind], event_offsets[file_ind + 1])
+            self.event_time[events] = time_adjust + block["event_time_s"]
+            self.event_lat[events] = block["event_lat"]
+            self.event_lon[events] = block["event_lon"]
+            self.event_energy[events] = block["event_energy"]
+            self.event_parent_group_id[events] = block["event_parent_group_id"]
+
+            # copy the group data
+            groups = slice(group_offsets[file_ind], group_offsets[file_ind + 1])
+            self.cloud_top_lat_lon_deg[groups] = block["cloud_top_lat_lon_deg"]
+            self.high_pos_ecef_m[groups] = block["high_pos_ecef_m"]
+            self.low_pos_ecef_m[groups] = block["low_pos_ecef_m"]
+            self.sat_pos_table[file_ind] = block["sat_pos_ecef_m"]
+            self.sat_pos_index[groups] = file_ind
+            self.yaw_flip_flag[groups] = block["yaw_flip_flag"]
+            self.sat_id[groups] = sat_id
+            self.group_id[groups] = block["group_id"]
+            self.time_s[groups] = time_adjust + block["time_s"]
+            self.energy_joules[groups] = block["energy_joules"]
+            self.quality_flag[groups] = block["quality_flag"]
         # end of file_path in file_paths
 
-        # store event data as class data members
-        self.event_time = np.array(np.concatenate(event_time))
-        self.event_lat = np.array(np.concatenate(event_lat))
-        self.event_lon = np.array(np.concatenate(event_lon))
-        self.event_energy = np.array(np.concatenate(event_energy))
         self.event_intensity_wsr = np.zeros(self.event_energy.shape)
-        self.event_parent_group_id = np.array(np.concatenate(event_parent_group_id))
-
-        # process the discovered position data
-        self.cloud_top_lat_lon_deg = np.vstack(
-            (np.concatenate(lat), np.concatenate(lon))
-        ).data.transpose()
-        ecef_pos = ghf.adjusted_lat_lon_to_ecef(
-            self.cloud_top_lat_lon_deg, self.CLOUD_TOP_EQUATOR_M, self.CLOUD_TOP_POLE_M
-        )
-        self.sat_pos_ecef_m = np.array(np.concatenate(sat_pos_ecef))
-        self.high_pos_ecef_m = ghf.find_pierce_point_at_alt(
-            self.sat_pos_ecef_m, ecef_pos, self.HIGH_ALTITUDE_M
-        )
-        self.low_pos_ecef_m = ghf.find_pierce_point_at_alt(
-            self.sat_pos_ecef_m, ecef_pos, self.LOW_ALTITUDE_M
-        )
-
-        # store the yaw flip flag
-        self.yaw_flip_flag = np.array(np.concatenate(flip_flag))
-
-        # satellite that provided the data
-        self.sat_id = np.array(np.concatenate(sat_ids))
         self.files_start_ssue = files_start_ssue
         self.files_end_ssue = files_end_ssue
-        # process the other data
-        self.group_id = np.array(np.concatenate(g_id))
-        self.time_s = np.array(np.concatenate(time))
-        # energy joules
-        self.energy_joules = np.array(np.concatenate(energy))
         # source intensity in W/sr
         self.source_intensity_wpsr = np.zeros(self.sat_id.shape)
         # derived cluster of the data
-        self.cluster_id = np.zeros(self.sat_id.shape)
-        # quality information (provided and derived)
-        self.quality_flag = np.array(np.concatenate(q_flag))
-        self.fitness = np.ones(self.sat_id.shape)
-        self.highest_energy = np.zeros(self.sat_id.shape)
+        self.cluster_id = np.zeros(self.sat_id.shape, CLUSTER_ID_DTYPE)
+        # quality information (derived)
+        self.fitness = np.ones(self.sat_id.shape, FLAG_DTYPE)
+        self.highest_energy = np.zeros(self.sat_id.shape, FLAG_DTYPE)
+
+    def get_sat_pos_ecef_m(self, rows=slice(None)):
+        """self.get_sat_pos_ecef_m(rows=slice(None))
+
+        Look up the satellite positions for rows of the group level arrays
+
+        Args:
+            rows (slice, int, or numpy array, optional): The rows (or boolean
+            mask of rows) to look up. Defaults to all rows.
+
+        Returns:
+            numpy array: The satellite ECEF positions in meters (Nx3, or 3
+            for a single row)
+        """
+        return self.sat_pos_table[self.sat_pos_index[rows]]
+
+    def get_group_event_index(self):
+        """self.get_group_event_index()
+
+        Get the index from group IDs to their events (pixels), rebuilding it
+        if the event data has been replaced since it was built
+
+        Returns:
+            GroupEventIndex: The index for the current event data
+        """
+        if self.group_event_index is None or not (
+            self.group_event_index.is_built_from(self.event_parent_group_id)
+        ):
+            self.group_event_index = GroupEventIndex(self.event_parent_group_id)
+        return self.group_event_index
+
+    def get_group_event_indices(self, group_id):
+        """self.get_group_event_indices(group_id)
+
+        Args:
+            group_id (int): The group ID to look up
+
+        Returns:
+            numpy array: Sorted indices of the events (pixels) whose parent
+            group ID is group_id
+        """
+        return self.get_group_event_index().event_indices(group_id)
+
+    def count_group_events(self, group_ids):
+        """self.count_group_events(group_ids)
+
+        Args:
+            group_ids (numpy array): The group IDs to look up
+
+        Returns:
+            numpy array: The number of events (pixels) in each group
+        """
+        return self.get_group_event_index().event_counts(group_ids)
+
+    def get_cluster_segment_index(self):
+        """self.get_cluster_segment_index()
+
+        Get the index of the rows sorted by cluster, satellite, and time,
+        rebuilding it if the cluster IDs have been replaced since it was built
+
+        Returns:
+            ClusterSegmentIndex: The index for the current cluster IDs
+        """
+        if self.cluster_segment_index is None or not (
+            self.cluster_segment_index.is_built_from(self.cluster_id)
+        ):
+            self.cluster_segment_index = ClusterSegmentIndex(
+                self.cluster_id, self.sat_id, self.time_s, self.BAD_CLUSTER_ID
+            )
+        return self.cluster_segment_index
+
+    def get_cluster_sat_rows(self, cluster_id=None):
+        """self.get_cluster_sat_rows(cluster_id=None)
+
+        Args:
+            cluster_id (int, optional): Only return the rows of this cluster.
+            Defaults to the rows of all clusters.
+
+        Returns:
+            list: (cluster_id, sat_id, rows) tuples for each cluster and
+            satellite, sorted by cluster and satellite. The rows are in time
+            order. Rows of the bad cluster are not included.
+        """
+        index = self.get_cluster_segment_index()
+        return [
+            (
+                index.segment_cluster_ids[segment_ind],
+                index.segment_sat_ids[segment_ind],
+                index.segment_rows(segment_ind),
+            )
+            for segment_ind in index.live_segments(cluster_id)
+        ]
+
+    def get_cluster_rows(self, cluster_id):
+        """self.get_cluster_rows(cluster_id)
+
+        Args:
+            cluster_id (int): The cluster ID to look up
+
+        Returns:
+            numpy array: The sorted indices of the rows in the cluster
+        """
+        cluster_sat_rows = self.get_cluster_sat_rows(cluster_id)
+        if not cluster_sat_rows:
+            return np.array([], dtype=np.intp)
+        return np.sort(np.concatenate([rows for _, _, rows in cluster_sat_rows]))
+
+    def get_cluster_bools(self, cluster_id):
+        """self.get_cluster_bools(cluster_id)
+
+        Args:
+            cluster_id (int): The cluster ID to look up
+
+        Returns:
+            numpy array: Booleans which are True for the rows in the cluster
+        """
+        in_cluster_bools = np.zeros(self.cluster_id.shape, dtype=bool)
+        in_cluster_bools[self.get_cluster_rows(cluster_id)] = True
+        return in_cluster_bools
+
+    def mark_rows_bad(self, rows):
+        """self.mark_rows_bad(rows)
+
+        Mark rows as BAD_CLUSTER_ID, keeping the cluster segment index in sync.
+        All changes to cluster_id after clustering go through this method.
+
+        Args:
+            rows (numpy array): The indices (or boolean mask) of the rows
+        """
+        self.cluster_id[rows] = self.BAD_CLUSTER_ID
+        if self.cluster_segment_index is not None and not (
+            self.cluster_segment_index.is_built_from(self.cluster_id)
+            and self.cluster_segment_index.mark_rows_bad(rows)
+        ):
+            self.cluster_segment_index = None
+
+    def take_group_rows(self, rows):
+        """self.take_group_rows(rows)
+
+        Subset all of the group level arrays (see GROUP_ARRAY_NAMES) to rows
+
+        Args:
+            rows (numpy array): The indices (or boolean mask) of the rows to keep
+        """
+        for array_name in self.GROUP_ARRAY_NAMES:
+            setattr(self, array_name, getattr(self, array_name)[rows])
+
+    def take_event_rows(self, rows):
+        """self.take_event_rows(rows)
+
+        Subset all of the event level arrays (see EVENT_ARRAY_NAMES) to rows
+
+        Args:
+            rows (numpy array): The indices (or boolean mask) of the rows to keep
+        """
+        for array_name in self.EVENT_ARRAY_NAMES:
+            setattr(self, array_name, getattr(self, array_name)[rows])
+
+    def compact_to_clusters(self, cluster_ids):
+        """num_groups, num_events = self.compact_to_clusters(cluster_ids)
+
+        Drop the group level rows outside of the given clusters, and the
+        events of the dropped groups, so later stages only work on the data
+        that can still trigger. The cluster segment and group event indexes
+        are rebuilt on their next use.
+
+        Args:
+            cluster_ids (numpy array): The IDs of the clusters to keep. Rows of
+            BAD_CLUSTER_ID are always dropped.
+
+        Returns:
+            num_groups (int): The number of groups before compacting
+            num_events (int): The number of events before compacting
+        """
+        num_groups = self.time_s.size
+        num_events = self.event_parent_group_id.size
+        keep_rows = np.isin(self.cluster_id, cluster_ids) & (
+            self.cluster_id != self.BAD_CLUSTER_ID
+        )
+        self.take_group_rows(keep_rows)
+        self.take_event_rows(np.isin(self.event_parent_group_id, self.group_id))
+        return num_groups, num_events
 
     def trim_glm_files(self, start_time_ssue, end_time_ssue):
         """trim_glm_files(self, start_time_ssue, end_time_ssue)
@@ -483,90 +691,76 @@ class GlmDataSet:
             return
 
         # shrink the data to the appropriate window
-        self.cloud_top_lat_lon_deg = self.cloud_top_lat_lon_deg[valid_times, :]
-        self.high_pos_ecef_m = self.high_pos_ecef_m[valid_times, :]
-        self.low_pos_ecef_m = self.low_pos_ecef_m[valid_times, :]
-        self.yaw_flip_flag = self.yaw_flip_flag[valid_times]
-        self.group_id = self.group_id[valid_times]
-        self.time_s = self.time_s[valid_times]
-        self.energy_joules = self.energy_joules[valid_times]
-        self.source_intensity_wpsr = self.source_intensity_wpsr[valid_times]
-        self.sat_id = self.sat_id[valid_times]
-        self.sat_pos_ecef_m = self.sat_pos_ecef_m[valid_times, :]
-        self.cluster_id = self.cluster_id[valid_times]
-        self.quality_flag = self.quality_flag[valid_times]
-        self.fitness = self.fitness[valid_times]
-        self.highest_energy = self.highest_energy[valid_times]
+        self.take_group_rows(valid_times)
 
         # end of trim_glm_files
 
-    def extract_event_energy(self, nc_obj):
-        """self.extract_event_energy(nc_obj)
+    def shed_load(self, max_groups, min_energy_j):
+        """shed_counts = shed_load(self, max_groups, min_energy_j)
 
-        Ground processing results in L2 netCDF files where the
-        event_energy variable has a fill value of -1 for missing data.
-        However, since the _Unsigned flag is set to true for this
-        otherwise (signed) int16 variable, the fill value is converted
-        into 65535 (2 ** 16 - 1) when netCDF4 loads the .nc files into
-        memory.
+        Drop the groups least likely to belong to an event until at most
+        max_groups remain, so an extreme batch (e.g., during a large lightning
+        storm) can still be processed in time. Groups are shed in stages,
+        each only if the batch is still too large:
+            (1) groups with a degraded quality flag
+            (2) groups below settings.SHED_ENERGY_FRACTION * min_energy_j
+            (3) groups in the densest settings.SHED_CELL_SIZE_DEG lat-lon
+            cells of each satellite, densest cell first
 
-        While not all reasons are currently (March 2023) known for what
-        causes missing events (pixel energies) in the L2 data,
-        converting the missing values into maximum recordable event
-        energies (in Joules) gets us closest to the event energies
-        present in the L0 data.
+        Must be called before clustering.
 
-        The maximum recordable event energy is estimated by multiplying
-        the event_energy scale_factor to the maximum recordable event
-        integer and then adding the event_energy add_offset.
-
-        Args:
-            nc_obj (Dataset): A Dataset object created by the netCDF4
-            python library for a given .nc file.
-
-        Returns:
-            event_energies (numpy array): An array of event energies.
-        """
+        INPUTS:
+            self - class instance
 
-        # Extract the event_energy variable from the netCDF object
-        nc_event_energy_obj = nc_obj.variables["event_energy"]
-        event_energies = np.array(nc_event_energy_obj[:])
-        event_energies_mask = nc_event_energy_obj[:].mask
-
-        # If at least one value is missing in the event_energies,
-        # replace all of the original FillValues in the event_energies
-        # with a new FillValue
-        if not isinstance(event_energies_mask, np.bool_):
-            # Store the scale_factor and add_offset for the event_energy variable
-            event_energy_scale_factor = nc_event_energy_obj.scale_factor
-            event_energy_add_offset = nc_event_energy_obj.add_offset
-
-            # Determine if the event_energy variable is stored as an unsigned value
-            event_energy_is_unsigned = nc_event_energy_obj._Unsigned.lower()[0] == "t"
-
-            # Determine if the data type of the event_energy variable is a numpy signed int
-            event_energy_base_type_is_signed_int = nc_event_energy_obj.dtype.kind == "i"
-
-            # Extract the maximum possible value for the event_energy dtype
-            event_energy_type_max_value = np.iinfo(nc_event_energy_obj.dtype).max
-
-            # If the event_energy base type is a signed int and the
-            # event_energy _Unsigned flag is true, double the base type
-            # max possible value and add one
-            if event_energy_base_type_is_signed_int and event_energy_is_unsigned:
-                event_energy_type_max_value = 2 * event_energy_type_max_value + 1
-
-            # Create a new fill value by multiplying the event_energy
-            # scale_factor to the maximum recordable event integer and
-            # then adding the event_energy add_offset
-            new_event_energy_fill_value = (
-                event_energy_type_max_value * event_energy_scale_factor
-                + event_energy_add_offset
-            )
+            max_groups - the max number of groups to keep
 
-            event_energies[event_energies_mask] = new_event_energy_fill_value
+            min_energy_j - the min energy (in joules) used to rank clusters
 
-        return event_energies
+        OUTPUTS:
+            shed_counts - a list of (reason, number of groups shed) for each
+            stage that shed groups
+        """
+        shed_counts = []
+
+        # (1) and (2) shed whole classes of weak groups
+        for reason in ("degraded quality", "low energy"):
+            if self.time_s.size <= max_groups:
+                return shed_counts
+            if reason == "degraded quality":
+                shed_bools = self.quality_flag != GOOD_QUALITY_FLAG
+            else:
+                shed_bools = (
+                    self.energy_joules < settings.SHED_ENERGY_FRACTION * min_energy_j
+                )
+            num_shed = int(np.count_nonzero(shed_bools))
+            if num_shed > 0:
+                self.take_group_rows(~shed_bools)
+                shed_counts.append((reason, num_shed))
+
+        # (3) shed the densest cells, which are likely thunderstorms
+        num_excess = self.time_s.size - max_groups
+        if num_excess <= 0:
+            return shed_counts
+        cell_lat_lon = np.floor(
+            np.nan_to_num(self.cloud_top_lat_lon_deg, nan=-1000.0)
+            / settings.SHED_CELL_SIZE_DEG
+        ).astype(np.int64)
+        _, cell_inds, cell_counts = np.unique(
+            np.column_stack((self.sat_id, cell_lat_lon)),
+            axis=0,
+            return_inverse=True,
+            return_counts=True,
+        )
+        cell_order = np.argsort(-cell_counts, kind="stable")
+        num_shed_cells = (
+            np.searchsorted(np.cumsum(cell_counts[cell_order]), num_excess) + 1
+        )
+        are_shed_cells = np.zeros(len(cell_counts), dtype=bool)
+        are_shed_cells[cell_order[:num_shed_cells]] = True
+        shed_bools = are_shed_cells[cell_inds.reshape(-1)]
+        self.take_group_rows(~shed_bools)
+        shed_counts.append(("dense cells", int(np.count_nonzero(shed_bools))))
+        return shed_counts
 
     def load_glm_data_at_time(self, datafolder, start_time_ssue, end_time_ssue):
         """load_glm_data_at_time(self, datafolder, start_time_ssue, end_time_ssue)
@@ -604,9 +798,12 @@ class GlmDataSet:
         information from the files found.
         """
 
-        # search the directory for all netcdf files (.nc)
-        file_paths = glob.glob(datafolder + "**/*.nc", recursive=True)
-        if not file_paths:
+        # look up the netcdf files (.nc) in the window with the file index,
+        # which returns the files sorted so the earliest file is processed
+        # first
+        glm_file_index = get_glm_file_index(datafolder)
+        valid_paths = glm_file_index.query(start_time_ssue, end_time_ssue)
+        if not glm_file_index.files:
             print(
                 "No file paths found. "
                 + f"Start time: {dth.convert_ssue_to_string(start_time_ssue)}, "
@@ -614,15 +811,6 @@ class GlmDataSet:
                 + f"Current time: {datetime.utcnow()}"
             )
             return 0  # return if there was no data
-        # save variable for valid paths
-        valid_paths = []
-
-        # determine start and end time of the files
-        for file_path in file_paths:
-            file_start_ssue, file_end_ssue, _ = get_glm_file_meta(file_path)
-            # if the file is in the right window, load the data and insert into the structure
-            if start_time_ssue < file_end_ssue and end_time_ssue >= file_start_ssue:
-                valid_paths.append((file_path, file_start_ssue))
 
         # this shouldn't happen but if it does problems can arise
         if len(valid_paths) == 0:
@@ -634,10 +822,6 @@ class GlmDataSet:
             )
             return 0
 
-        # Ensure valid_paths is sorted so the earliest file is processed first
-        valid_paths = sorted(valid_paths, key=lambda x: x[1])
-        valid_paths = [pathTuple[0] for pathTuple in valid_paths]
-
         self.load_glm_files(valid_paths)
 
         self.trim_glm_files(start_time_ssue, end_time_ssue)
@@ -841,7 +1025,7 @@ class GlmDataSet:
             # Pick off the Sat position of the first point
             # (these are likely to be the same across all points
             # within the same sat)
-            sat_pos_ecef_m = self.sat_pos_ecef_m[in_cluster_sat_bools][0]
+            sat_pos_ecef_m = self.get_sat_pos_ecef_m(in_cluster_sat_bools)[0]
 
             # Subset data members by the cluster-sat ID boolean index
             cluster_sat_lat_lon_deg = self.cloud_top_lat_lon_deg[in_cluster_sat_bools]
@@ -972,10 +1156,10 @@ class GlmDataSet:
         for group_ind, group_id in enumerate(group_ids_in_cluster_sat):
             debug_print(f"\tGroup ID = {group_id}", debug_mode=debug_mode)
             # Subset the event data associated with the parent group ID
-            keep_event_bool = self.event_parent_group_id == group_id
-            event_lats_deg = self.event_lat[keep_event_bool]
-            event_lons_deg = self.event_lon[keep_event_bool]
-            event_energies_j = self.event_energy[keep_event_bool]
+            keep_event_inds = self.get_group_event_indices(group_id)
+            event_lats_deg = self.event_lat[keep_event_inds]
+            event_lons_deg = self.event_lon[keep_event_inds]
+            event_energies_j = self.event_energy[keep_event_inds]
 
             # Ensure longitudinals are within 0 to -360
             event_lons_deg = ghf.wrap_longitudes(event_lons_deg, 0)
@@ -1006,7 +1190,7 @@ class GlmDataSet:
             )
 
             # Store the event intensities for the given group
-            self.event_intensity_wsr[keep_event_bool] = event_intensities_wpsr
+            self.event_intensity_wsr[keep_event_inds] = event_intensities_wpsr
 
         return summed_event_intensities
 
@@ -1194,8 +1378,8 @@ class GlmDataSet:
         # Convert event energies into source intensities
         return intensity_conversion_coefficient * event_energy_j * lut_value
 
-    def cluster_glm_data(self, cluster_distance_m, time_distance_s):
-        """cluster_glm_data(self,cluster_distance_m, time_distance_s)
+    def cluster_glm_data(self, cluster_distance_m, time_distance_s, cluster_state=None):
+        """cluster_glm_data(self,cluster_distance_m, time_distance_s, cluster_state=None)
 
         Identify clusters in the data by finding points with a minimal distance
         between them of less than cluster_distance_m and a time difference of
@@ -1213,6 +1397,12 @@ class GlmDataSet:
             time_distance_s - the time in seconds two lines-of-sight can be
             separated by to pass the clustering test
 
+            cluster_state - a chf.StreamingClusterState holding the clusters of
+            the previous batch. When given, the groups shared with the previous
+            batch keep their clusters and only the newly arrived groups are
+            compared with the others (defaults to None, i.e. cluster from
+            scratch).
+
         OUTPUTS:
             There are no explicit outputs. The cluster_id class member will be
             updated.
@@ -1225,98 +1415,143 @@ class GlmDataSet:
         if self.high_pos_ecef_m.size == 0:
             return
 
-        # sort the points by time, latitude, and longitude
+        # sort the points by time
         sorted_time_indices = np.argsort(self.time_s)
+        # the last row is only given a cluster, it is not compared with others
         last_time_index = np.max(sorted_time_indices)
 
-        # Initialize num_clusters using current highest cluster ID
-        if self.cluster_id.size == 0:
-            num_clusters = 0
+        if cluster_state is not None:
+            # Groups shared with the previous batch keep their clusters. Their
+            # pairs were already compared, so only the pairs with a newly
+            # arrived group are merged.
+            carried_cluster_id = cluster_state.find_carried_rows(self.get_group_keys())
+            self.cluster_id = carried_cluster_id.astype(CLUSTER_ID_DTYPE)
+            are_carried = carried_cluster_id > 0
+            last_time_index = None
+            num_clusters = cluster_state.num_clusters
         else:
-            num_clusters = max(self.cluster_id)
-
-        # loop through all points in order of time
-        for current_index in sorted_time_indices:
-            # if this doesn't belong to a cluster add it to a new one
-            if self.cluster_id[current_index] == 0:
-                self.cluster_id[current_index] = num_clusters + 1
-                num_clusters += 1
-
-            # if we are on the last point, leave
-            # we go this far so that if the last point isn't grouped, it gets added to one here
-            if current_index == last_time_index:
-                continue
-
-            # determine at this latitude, what the approximate distance between longitude is
-            current_time = self.time_s[current_index]
-            current_lat = self.cloud_top_lat_lon_deg[current_index, 0]
-            current_lon = self.cloud_top_lat_lon_deg[current_index, 1]
-            current_cluster_id = self.cluster_id[current_index]
-
-            # determine what the range of latitude and longitudes would be at this point
-            dlon_dist_m = np.cos(np.radians(current_lat)) * DLAT_DIST_M
-            rough_lon_deg = rough_lon_distance_m / dlon_dist_m
-
-            min_lat = current_lat - rough_lat_deg
-            max_lat = current_lat + rough_lat_deg
-            min_lon = current_lon - rough_lon_deg
-            max_lon = current_lon + rough_lon_deg
-
-            # Find indices of points to compare with that fall within
-            # time_distance_s, a rough lat-lon rectangle, and are not in the
-            # same cluster
-            # Within time_distance_s
-            comp_points_bools = (current_time <= self.time_s) & (
-                self.time_s <= (current_time + time_distance_s)
+            are_carried = np.zeros(self.cluster_id.shape, dtype=bool)
+            num_clusters = None
+
+        # Visit all points in order of time, adding points without a cluster
+        # to a new one, and merging into it the clusters of the points that
+        # fall within time_distance_s after it and within a rough lat-lon
+        # rectangle around it, and whose LOSs are within cluster_distance_m
+        executor = chf.get_cluster_executor()
+        if (executor is not None) and (
+            self.time_s.size >= settings.CLUSTER_TILE_MIN_GROUPS
+        ):
+            current_inds, window_inds = chf.find_merge_pairs_in_tiles(
+                executor,
+                chf.CLUSTER_EXECUTOR_STATE["num_workers"],
+                self.time_s,
+                self.cloud_top_lat_lon_deg[:, 0],
+                self.cloud_top_lat_lon_deg[:, 1],
+                self.low_pos_ecef_m,
+                self.high_pos_ecef_m,
+                sorted_time_indices,
+                time_distance_s,
+                cluster_distance_m,
+                rough_lat_deg,
+                rough_lon_distance_m,
+                DLAT_DIST_M,
+                are_carried=are_carried,
+                last_index=last_time_index,
             )
-            # Within rough lat window
-            time_lat_window_bools = (
-                min_lat <= self.cloud_top_lat_lon_deg[comp_points_bools, 0]
-            ) & (self.cloud_top_lat_lon_deg[comp_points_bools, 0] <= max_lat)
-            # Reduce the points to compare with to only those within the time
-            # AND lat windows
-            comp_points_bools[comp_points_bools] = time_lat_window_bools
-            # Within rough lon window
-            time_lat_lon_window_bools = (
-                min_lon <= self.cloud_top_lat_lon_deg[comp_points_bools, 1]
-            ) & (self.cloud_top_lat_lon_deg[comp_points_bools, 1] <= max_lon)
-            # Reduce the points to compare with to only those within the time,
-            # lat, and lon windows
-            comp_points_bools[comp_points_bools] = time_lat_lon_window_bools
-            # And are not in the same cluster
-            time_lat_lon_id_window_bools = (
-                self.cluster_id[comp_points_bools] != current_cluster_id
+            self.cluster_id = chf.merge_clusters(
+                self.cluster_id,
+                sorted_time_indices,
+                current_inds,
+                window_inds,
+                last_index=last_time_index,
+                num_clusters=num_clusters,
             )
-            # Reduce the points to compare with to only those within the time,
-            # lat, lon windows, and that are not in the same cluster
-            comp_points_bools[comp_points_bools] = time_lat_lon_id_window_bools
-            # Convert the comparison point booleans to indices
-            window_indices = np.where(comp_points_bools)[0]
-
-            # For all points within the window, assign to same cluster_id if
-            # within cluster_distance_m
-            for window_index in window_indices:
-                # Compute distance between LOSs
-                closest_distance, _, _ = ghf.dist3d_segment_to_segment(
-                    self.low_pos_ecef_m[window_index],
-                    self.high_pos_ecef_m[window_index],
-                    self.low_pos_ecef_m[current_index],
-                    self.high_pos_ecef_m[current_index],
-                )
-                if closest_distance > cluster_distance_m:
-                    continue
-
-                # if window_index is already in a cluster, assign all points in
-                # that cluster to this one
-                if self.cluster_id[window_index] > 0:
-                    self.cluster_id[
-                        self.cluster_id == self.cluster_id[window_index]
-                    ] = current_cluster_id
-                else:  # otherwise, just assign it to the cluster
-                    self.cluster_id[window_index] = current_cluster_id
+        else:
+            are_searched = np.ones(self.cluster_id.shape, dtype=bool)
+            if last_time_index is not None:
+                are_searched[last_time_index] = False
+            merger = chf.ClusterMerger(self.cluster_id, num_clusters)
+            chf.cluster_close_pairs(
+                merger,
+                self.time_s,
+                self.cloud_top_lat_lon_deg[:, 0],
+                self.cloud_top_lat_lon_deg[:, 1],
+                self.low_pos_ecef_m,
+                self.high_pos_ecef_m,
+                sorted_time_indices,
+                time_distance_s,
+                cluster_distance_m,
+                rough_lat_deg,
+                rough_lon_distance_m,
+                DLAT_DIST_M,
+                are_searched=are_searched,
+                are_carried=are_carried,
+            )
+            self.cluster_id = merger.get_cluster_id()
 
         # end of cluster_glm_data
 
+    def mark_streamed_clusters(self, cluster_state, time_distance_s):
+        """mark_streamed_clusters(self, cluster_state, time_distance_s)
+
+        Used in place of mark_redundant_clusters when clustering with a
+        cluster_state. A cluster is final once its last group is more than
+        time_distance_s before the watermark, the earliest of the latest
+        group times of the satellites (see
+        chf.StreamingClusterState.update_watermark), since no later group of
+        any satellite can join it. Clusters still open are left for the next batch, and final
+        clusters reported by an earlier batch are not reported again. The
+        clusters are then carried into cluster_state for the next batch.
+
+        INPUTS:
+            self - class instance
+
+            cluster_state - the chf.StreamingClusterState used to cluster the
+            data
+
+            time_distance_s - the time in seconds two lines-of-sight can be
+            separated by to pass the clustering test
+
+        OUTPUTS:
+            There are no explicit outputs. The cluster_id class member will be
+            updated.
+        """
+        if self.cluster_id.size == 0:
+            return
+
+        # Clusters with a group within time_distance_s of the watermark are
+        # open, as a satellite lagging the others can still add to them
+        times_ssue = self.basetime_ssue + self.time_s
+        watermark_ssue = cluster_state.update_watermark(self.sat_id, times_ssue)
+        are_open = times_ssue >= watermark_ssue - time_distance_s
+        are_unfinished = np.isin(
+            self.cluster_id,
+            np.concatenate(
+                (self.cluster_id[are_open], cluster_state.reported_cluster_ids)
+            ),
+        )
+
+        # Report the rest, and carry all of the clusters to the next batch
+        cluster_state.carry(
+            self.get_group_keys(),
+            self.cluster_id,
+            np.union1d(
+                self.cluster_id[~are_unfinished], cluster_state.reported_cluster_ids
+            ),
+        )
+        self.mark_rows_bad(are_unfinished)
+
+    def get_group_keys(self):
+        """keys = self.get_group_keys()
+
+        OUTPUTS:
+            keys - a key identifying each group in any batch it is loaded in
+            (see chf.get_group_keys)
+        """
+        return chf.get_group_keys(
+            self.sat_id, self.group_id, self.basetime_ssue + self.time_s
+        )
+
     def mark_redundant_clusters(self, event_time_ssue):
         """markBoundaryClusters(self, event_time_ssue)
 
@@ -1354,55 +1589,32 @@ class GlmDataSet:
 
         # Mark redundant outer clusters
         are_outer_clusters = np.in1d(self.cluster_id, outer_cluster_ids)
-        self.cluster_id[are_outer_clusters] = self.BAD_CLUSTER_ID
+        self.mark_rows_bad(are_outer_clusters)
 
         # (2) inner boundary, (3) first file, and (4) second file clusters
-        cluster_ids = np.unique(self.cluster_id)
+        cluster_ids, cluster_starts_s, cluster_ends_s = (
+            self.get_cluster_segment_index().live_cluster_time_ranges(self.time_s)
+        )
 
+        # Define which file the clusters "belong" to
         file_mid_ssue = (self.files_end_ssue + self.files_start_ssue) / 2
-        first_file_cluster_ids = []
-        second_file_cluster_ids = []
-
-        for cluster_id in cluster_ids:
-            # Skip the bad cluster IDs
-            if cluster_id == self.BAD_CLUSTER_ID:
-                continue
-
-            # Index points with same cluster
-            cluster_bools = self.cluster_id == cluster_id
-
-            # Skip if no points belong to this cluster
-            if np.all(~cluster_bools):
-                continue
-
-            # Subset times belonging to same cluster
-            cluster_times_ssue = times_ssue[cluster_bools]
-
-            # Define which file the clusters "belong" to
-            if in_glm_file_latter_half(event_time_ssue):
-                # Store the start time of the cluster
-                cluster_start_ssue = np.min(cluster_times_ssue)
-                if cluster_start_ssue < file_mid_ssue + settings.CLUSTER_TIME_S:
-                    first_file_cluster_ids.append(cluster_id)
-                else:
-                    second_file_cluster_ids.append(cluster_id)
-            else:
-                # Store the start time of the cluster
-                cluster_end_ssue = np.max(cluster_times_ssue)
-                if cluster_end_ssue > file_mid_ssue - settings.CLUSTER_TIME_S:
-                    second_file_cluster_ids.append(cluster_id)
-                else:
-                    first_file_cluster_ids.append(cluster_id)
-
         if in_glm_file_latter_half(event_time_ssue):
             # Keep first file clusters
+            cluster_starts_ssue = self.basetime_ssue + cluster_starts_s
+            second_file_cluster_ids = cluster_ids[
+                ~(cluster_starts_ssue < file_mid_ssue + settings.CLUSTER_TIME_S)
+            ]
             are_redundant_clusters = np.in1d(self.cluster_id, second_file_cluster_ids)
         else:
             # Keep second file clusters
+            cluster_ends_ssue = self.basetime_ssue + cluster_ends_s
+            first_file_cluster_ids = cluster_ids[
+                ~(cluster_ends_ssue > file_mid_ssue - settings.CLUSTER_TIME_S)
+            ]
             are_redundant_clusters = np.in1d(self.cluster_id, first_file_cluster_ids)
 
         # Mark redundant clusters
-        self.cluster_id[are_redundant_clusters] = self.BAD_CLUSTER_ID
+        self.mark_rows_bad(are_redundant_clusters)
 
         # end of mark_redundant_clusters
 
@@ -1419,39 +1631,26 @@ class GlmDataSet:
             There are no explicit outputs.  The cluster_id class member
             will be updated for each data point.
         """
-        # Grab all the unique cluster ids in the data
-        cluster_ids = np.unique(self.cluster_id)
-
-        for cluster_id in cluster_ids:
-            # Skip the bad cluster IDs
-            if cluster_id == self.BAD_CLUSTER_ID:
-                continue
-
-            # Index points with same cluster
-            cluster_bools = self.cluster_id == cluster_id
-
-            # Skip if no points belong to this cluster
-            if np.all(~cluster_bools):
-                continue
-
-            # Subset times belonging to same cluster
-            times_s = self.time_s[cluster_bools]
-
-            # Compute the duration in seconds (i.e., range of time
-            # values) of the event using numpy's peak-to-peak function
-            duration_s = np.ptp(times_s)
-            debug_print(
-                f"Cluster ID {cluster_id} duration (seconds): {duration_s}", debug_mode
-            )
-
-            # Mark cluster as BAD_CLUSTER_ID if any cluster duration
-            # lasts beyond settings.CLUSTER_DURATION_LIMIT_S
-            if duration_s > settings.CLUSTER_DURATION_LIMIT_S:
-                self.cluster_id[cluster_bools] = self.BAD_CLUSTER_ID
+        # Compute the duration in seconds (i.e., range of time values) of
+        # every cluster
+        cluster_ids, cluster_starts_s, cluster_ends_s = (
+            self.get_cluster_segment_index().live_cluster_time_ranges(self.time_s)
+        )
+        durations_s = cluster_ends_s - cluster_starts_s
+        if debug_mode:
+            for cluster_id, duration_s in zip(cluster_ids, durations_s):
                 debug_print(
-                    f"Cluster ID {cluster_id} beyond duration limit.", debug_mode
+                    f"Cluster ID {cluster_id} duration (seconds): {duration_s}",
+                    debug_mode,
                 )
 
+        # Mark clusters as BAD_CLUSTER_ID if any cluster duration
+        # lasts beyond settings.CLUSTER_DURATION_LIMIT_S
+        long_cluster_ids = cluster_ids[durations_s > settings.CLUSTER_DURATION_LIMIT_S]
+        self.mark_rows_bad(np.in1d(self.cluster_id, long_cluster_ids))
+        for cluster_id in long_cluster_ids:
+            debug_print(f"Cluster ID {cluster_id} beyond duration limit.", debug_mode)
+
     def omit_large_group_size_clusters(self, cluster_ids, data_dir, debug_mode=False):
         """self.omit_large_group_size_clusters(cluster_ids)
 
@@ -1482,106 +1681,94 @@ class GlmDataSet:
         """
         num_clusters_before_filters = len(cluster_ids)
 
-        for cluster_id_ind, cluster_id in enumerate(cluster_ids):
-            # Skip the bad cluster IDs
-            if cluster_id == self.BAD_CLUSTER_ID:
-                continue
-
-            in_cluster_bools = self.cluster_id == cluster_id
-            if np.all(~in_cluster_bools):
-                continue
+        # The rows of each cluster-satellite pair of the requested clusters, one
+        # pair after another
+        index = self.get_cluster_segment_index()
+        rows, segment_inds, segment_counts = index.live_segment_series(
+            np.isin(self.cluster_id, cluster_ids)
+        )
+        segment_starts = np.cumsum(segment_counts) - segment_counts
+        row_segment_positions = np.repeat(np.arange(len(segment_inds)), segment_counts)
 
-            # Identify all sat IDs within cluster
-            sat_ids = np.unique(self.sat_id[in_cluster_bools])
+        # Use only the data which is in the upper ENERGY_PERCENT_CAP of energy
+        energy_j = self.energy_joules[rows]
+        energy_percentile_thresholds = segment_percentiles(
+            energy_j, segment_starts, ENERGY_PERCENT_CAP
+        )
+        higher_energy_bools = (
+            energy_j > energy_percentile_thresholds[row_segment_positions]
+        )
+        higher_energy_segment_positions = row_segment_positions[higher_energy_bools]
 
-            # Initialize a list for sat metrics to be combined into a cluster metric
-            sat_cluster_metrics = np.zeros(len(sat_ids))
+        # Look up the group cluster sizes for the highest energy group points
+        group_cluster_sizes = self.count_group_events(
+            self.group_id[rows[higher_energy_bools]]
+        )
 
-            for sat_id_ind, sat_id in enumerate(sat_ids):
-                # Index points with same cluster and satellite
-                in_cluster_sat_id_bools = in_cluster_bools & (self.sat_id == sat_id)
-                if np.all(~in_cluster_sat_id_bools):
-                    continue
+        # Compute the proportion of groups with more than GROUP_SIZE_MIN events
+        # for each cluster-satellite pair with higher energy points
+        num_higher_energy_groups = np.bincount(
+            higher_energy_segment_positions, minlength=len(segment_inds)
+        )
+        num_large_groups = np.bincount(
+            higher_energy_segment_positions[group_cluster_sizes > GROUP_SIZE_MIN],
+            minlength=len(segment_inds),
+        )
+        has_higher_energy = num_higher_energy_groups > 0
+        group_size_metrics = np.zeros(len(segment_inds))
+        group_size_metrics[has_higher_energy] = (
+            num_large_groups[has_higher_energy]
+            / num_higher_energy_groups[has_higher_energy]
+        )
 
-                # Use only the data which is in the upper ENERGY_PERCENT_CAP of energy
-                energy_j = self.energy_joules[in_cluster_sat_id_bools]
-                energy_percentile_threshold = np.percentile(
-                    energy_j, ENERGY_PERCENT_CAP
+        if debug_mode:
+            # Plot metric distribution
+            for segment_position in np.flatnonzero(has_higher_energy):
+                cluster_id = index.segment_cluster_ids[segment_inds[segment_position]]
+                sat_id = index.segment_sat_ids[segment_inds[segment_position]]
+                group_cluster_size_array = group_cluster_sizes[
+                    higher_energy_segment_positions == segment_position
+                ]
+                group_size_metric = group_size_metrics[segment_position]
+                pcntls = np.percentile(
+                    group_cluster_size_array, [0, 25, 50, 75, 95, 100]
                 )
-                higher_energy_bools = energy_j > energy_percentile_threshold
-
-                # Check that at least one point is included
-                if np.all(~higher_energy_bools):
-                    continue
-
-                # Subset event point indices by in_cluster_sat_id_bools and higher_energy_bools
-                high_energy_group_point_inds = np.where(in_cluster_sat_id_bools)[0][
-                    higher_energy_bools
+                clstr_mean = group_cluster_size_array.mean()
+                segment_rows = np.sort(rows[row_segment_positions == segment_position])
+                basetime = self.time_s[segment_rows][
+                    np.argmax(self.energy_joules[segment_rows])
                 ]
+                event_datetime = dth.convert_ssue_to_datetime(
+                    basetime + self.basetime_ssue
+                )
 
-                # Initialize an array for group cluster sizes for the highest energy group points
-                group_cluster_size_array = np.zeros(len(high_energy_group_point_inds))
-
-                for group_cluster_size_ind, point_ind in enumerate(
-                    high_energy_group_point_inds
-                ):
-                    group_id = self.group_id[point_ind]
-                    group_cluster_size = np.sum(self.event_parent_group_id == group_id)
-                    group_cluster_size_array[group_cluster_size_ind] = (
-                        group_cluster_size
-                    )
-
-                # Compute proportion of groups with more than GROUP_SIZE_MIN events
-                group_size_metric = np.sum(
-                    group_cluster_size_array > GROUP_SIZE_MIN
-                ) / len(group_cluster_size_array)
-
-                # Store the metric for later analysis
-                sat_cluster_metrics[sat_id_ind] = group_size_metric
-
-                if debug_mode:
-                    # Plot metric distribution
-                    pcntls = np.percentile(
-                        group_cluster_size_array, [0, 25, 50, 75, 95, 100]
-                    )
-                    clstr_mean = group_cluster_size_array.mean()
-                    basetime = self.time_s[in_cluster_sat_id_bools][
-                        np.argmax(self.energy_joules[in_cluster_sat_id_bools])
-                    ]
-                    event_datetime = dth.convert_ssue_to_datetime(
-                        basetime + self.basetime_ssue
-                    )
-
-                    fig = plt.figure()
-                    fig.suptitle(f"Cluster {cluster_id} GOES {sat_id}")
-                    plt.hist(group_cluster_size_array, range=[0, 40])
-                    plt.plot(pcntls[2], 0, "b|", label=f"Median = {pcntls[2]}")
-                    plt.plot(
-                        clstr_mean, 0, "r|", label=f"Mean = {round(clstr_mean, 1)}"
-                    )
-                    plt.plot(pcntls[5], 0, "b|", label=f"Max = {pcntls[5]}")
-                    plt.plot(
-                        0,
-                        0,
-                        "none",
-                        label=f"PropAbove5 = {round(group_size_metric, 2)}",
-                    )
-                    plt.legend()
-                    plt.xlabel("Group Cluster Size (Number of Pixels)")
-                    plt.ylabel("Counts")
-                    fig.savefig(
-                        data_dir
-                        + event_datetime.strftime("%Y%m%d%H%M%S")
-                        + f"_{cluster_id}_{sat_id}_ClusterHist.png"
-                    )
-                    plt.close()
-
-            # Combine the sat metrics into a cluster metric
-            cluster_size_metric = np.array(max(sat_cluster_metrics))
+                fig = plt.figure()
+                fig.suptitle(f"Cluster {cluster_id} GOES {sat_id}")
+                plt.hist(group_cluster_size_array, range=[0, 40])
+                plt.plot(pcntls[2], 0, "b|", label=f"Median = {pcntls[2]}")
+                plt.plot(clstr_mean, 0, "r|", label=f"Mean = {round(clstr_mean, 1)}")
+                plt.plot(pcntls[5], 0, "b|", label=f"Max = {pcntls[5]}")
+                plt.plot(
+                    0,
+                    0,
+                    "none",
+                    label=f"PropAbove5 = {round(group_size_metric, 2)}",
+                )
+                plt.legend()
+                plt.xlabel("Group Cluster Size (Number of Pixels)")
+                plt.ylabel("Counts")
+                fig.savefig(
+                    data_dir
+                    + event_datetime.strftime("%Y%m%d%H%M%S")
+                    + f"_{cluster_id}_{sat_id}_ClusterHist.png"
+                )
+                plt.close()
 
-            # Filter out clusters which fail a metric criteria
-            if cluster_size_metric > GROUP_SIZE_METRIC_THRESHOLD:
-                cluster_ids[cluster_id_ind] = self.BAD_CLUSTER_ID
+        # Filter out clusters where any satellite fails the metric criteria
+        lightning_cluster_ids = index.segment_cluster_ids[
+            segment_inds[group_size_metrics > GROUP_SIZE_METRIC_THRESHOLD]
+        ]
+        cluster_ids[np.isin(cluster_ids, lightning_cluster_ids)] = self.BAD_CLUSTER_ID
 
         cluster_ids = cluster_ids[cluster_ids != self.BAD_CLUSTER_ID]
 
@@ -1689,10 +1876,21 @@ class GlmDataSet:
         while the 17-18 are approximately zero. The threshold
         guarentees the angle between stereo satellites is at least pi/6.
         """
-        sat_pos_ecef_m = self.sat_pos_ecef_m[in_cluster_bools]
-        sat_ids = self.sat_id[in_cluster_bools]
+        # Each sat position is shared by all of the points from the same file
+        file_sat_ids = np.unique(
+            np.column_stack(
+                (self.sat_pos_index[in_cluster_bools], self.sat_id[in_cluster_bools])
+            ),
+            axis=0,
+        )
         unique_sat_pos = np.unique(
-            np.hstack((sat_ids.reshape(-1, 1), sat_pos_ecef_m)), axis=0
+            np.hstack(
+                (
+                    file_sat_ids[:, 1].reshape(-1, 1),
+                    self.sat_pos_table[file_sat_ids[:, 0]],
+                )
+            ),
+            axis=0,
         )
         unique_sat_ids = unique_sat_pos[:, 0].astype(int).tolist()
         unique_sat_pos_ecef_m = unique_sat_pos[:, 1:4]
@@ -1904,53 +2102,47 @@ class GlmDataSet:
         # computing the estimated altitude. If not found, do not change the
         # cluster_id
 
-        for time_ind1, time_val1 in enumerate(times_s[0]):
-            # Check for other times within HALF_GLM_SAMPLE_PERIOD_S
-            # TODO: Add functionality for handling ESA's LI which will have
-            # a different sampling period
-            matching_time_bools = abs(times_s[1] - time_val1) < HALF_GLM_SAMPLE_PERIOD_S
-            # If none match, move to the next highest energy time
-            if np.all(~matching_time_bools):
-                continue
-
-            # In the event of multiple time matches, pick the index for the
-            # higher energy
-            time_ind2 = np.min(np.where(matching_time_bools))
-            high_pos_ecef0m = high_pos_ecef_m[0][time_ind1]
-            low_pos_ecef0m = low_pos_ecef_m[0][time_ind1]
-            high_pos_ecef1m = high_pos_ecef_m[1][time_ind2]
-            low_pos_ecef1m = low_pos_ecef_m[1][time_ind2]
-
-            # Compute the min distance vector between two lines-of-sight
-            [_, seg0p_min, seg1p_min] = ghf.dist3d_segment_to_segment(
-                high_pos_ecef0m,
-                low_pos_ecef0m,
-                high_pos_ecef1m,
-                low_pos_ecef1m,
-            )
-            # Find the middle point of the min distance vector
-            min_dist_seg_ecef_ave = np.mean(np.stack([seg0p_min, seg1p_min]), axis=0)
-            # Store the estimated location of the stereo event
-            if store_location_estimate:
-                self.location_ecef_m[str(cluster_id)] = min_dist_seg_ecef_ave
-            # Convert the middle point to Geodetic to estimate altitude
-            (_, _, estimated_altitude) = ghf.ecef2geodetic(
-                min_dist_seg_ecef_ave[0],
-                min_dist_seg_ecef_ave[1],
-                min_dist_seg_ecef_ave[2],
-            )
-            debug_print(f"Estimated altitude: {estimated_altitude}", debug_mode)
-            # Mark the cluster_id as bad if estimated altitude below 20km
-            # Otherwise check next matching times
-            if estimated_altitude < altitude_threshold_m:
-                debug_print("Filtered out due to low alt.", debug_mode)
-                self.cluster_id[in_cluster_bools] = self.BAD_CLUSTER_ID
-                # Exit the for-loop which checks for matching times
-                break
-            # If times matched, and est alt was above
-            # altitude_threshold_m, don't mark the cluster_id for this
-            # cluster as BAD_CLUSTER_ID
-            break
+        # Check for other times within HALF_GLM_SAMPLE_PERIOD_S
+        # TODO: Add functionality for handling ESA's LI which will have
+        # a different sampling period
+        matching_time_bools = (
+            abs(times_s[1][np.newaxis, :] - times_s[0][:, np.newaxis])
+            < HALF_GLM_SAMPLE_PERIOD_S
+        )
+        # Use the highest energy time which has a match. If none match, do
+        # not change the cluster_id
+        matched_time_inds1 = np.flatnonzero(np.any(matching_time_bools, axis=1))
+        if matched_time_inds1.size == 0:
+            return
+        time_ind1 = matched_time_inds1[0]
+
+        # In the event of multiple time matches, pick the index for the
+        # higher energy
+        time_ind2 = np.argmax(matching_time_bools[time_ind1])
+
+        # Compute the min distance vector between two lines-of-sight
+        [_, seg0p_min, seg1p_min] = ghf.dist3d_segments_to_segments(
+            high_pos_ecef_m[0][[time_ind1]],
+            low_pos_ecef_m[0][[time_ind1]],
+            high_pos_ecef_m[1][[time_ind2]],
+            low_pos_ecef_m[1][[time_ind2]],
+        )
+        # Find the middle point of the min distance vector
+        min_dist_seg_ecef_ave = np.mean(np.stack([seg0p_min[0], seg1p_min[0]]), axis=0)
+        # Store the estimated location of the stereo event
+        if store_location_estimate:
+            self.location_ecef_m[get_cluster_key(cluster_id)] = min_dist_seg_ecef_ave
+        # Convert the middle point to Geodetic to estimate altitude
+        (_, _, estimated_altitude) = ghf.ecef2geodetic(
+            min_dist_seg_ecef_ave[0],
+            min_dist_seg_ecef_ave[1],
+            min_dist_seg_ecef_ave[2],
+        )
+        debug_print(f"Estimated altitude: {estimated_altitude}", debug_mode)
+        # Mark the cluster_id as bad if estimated altitude below 20km
+        if estimated_altitude < altitude_threshold_m:
+            debug_print("Filtered out due to low alt.", debug_mode)
+            self.mark_rows_bad(in_cluster_bools)
 
         # end of mark_low_atl_clusters
 
@@ -1968,79 +2160,30 @@ class GlmDataSet:
             There are no explicit outputs.  The highest_energy class member will
             be updated for each data point.
         """
-        # Grab all the cluster ids and sat ids in the data
-        cluster_ids = np.unique(self.cluster_id)
-        sat_ids = np.unique(self.sat_id)
-
-        for cluster_id in cluster_ids:
-            # Skip the bad cluster IDs
-            if cluster_id == self.BAD_CLUSTER_ID:
-                continue
-
-            for sat_id in sat_ids:
-                # Index points with same cluster and satellite
-                in_cluster_sat_id_bools = (self.cluster_id == cluster_id) & (
-                    self.sat_id == sat_id
-                )
-                if np.all(~in_cluster_sat_id_bools):
-                    continue
-
-                # Subset times and energies belonging to same cluster and sat
-                time_by_cluster_sat_s = self.time_s[in_cluster_sat_id_bools]
-                energy_by_cluster_sat_s = self.energy_joules[in_cluster_sat_id_bools]
-
-                ## Find all energies which are unique for their time and mark as highest_energy = 1
-                # Find the unique times and counts of those unique times
-                unique_times, unique_time_counts = np.unique(
-                    time_by_cluster_sat_s, return_counts=True
+        # Sort the points of the clusters (skipping the bad cluster) by cluster,
+        # satellite, time, and then highest energy first. The sort is stable,
+        # so points with the same energy keep their original order.
+        rows = np.flatnonzero(self.cluster_id != self.BAD_CLUSTER_ID)
+        rows = rows[
+            np.lexsort(
+                (
+                    -self.energy_joules[rows],
+                    self.time_s[rows],
+                    self.sat_id[rows],
+                    self.cluster_id[rows],
                 )
+            )
+        ]
 
-                # Keep all of the unique times that only appear once
-                unique_times_without_duplicates = unique_times[
-                    np.where(unique_time_counts == 1)[0]
-                ]
-
-                highest_energy_flag_inds = []
-
-                for unique_time in unique_times_without_duplicates:
-                    index_of_data_to_keep = np.where(
-                        time_by_cluster_sat_s == unique_time
-                    )[0]
-                    highest_energy_flag_inds.append(index_of_data_to_keep[0])
-
-                ## Find all energies which are duplicates for their time and mark max energy as highest_energy = 1
-                # Keep only max energy of the duplicate times
-                duplicate_times = unique_times[np.where(unique_time_counts > 1)[0]]
-
-                for duplicate_time in duplicate_times:
-                    # Find the indices of all matching duplicate times with duplicate_time
-                    identical_times_indicies = np.where(
-                        time_by_cluster_sat_s == duplicate_time
-                    )[0]
-
-                    # Find the max energy
-                    max_energy_among_indentical_times = energy_by_cluster_sat_s[
-                        identical_times_indicies
-                    ][np.argmax(energy_by_cluster_sat_s[identical_times_indicies])]
-
-                    # Store the index of the max energy for those identical times
-                    index_of_time_and_energy_to_keep = np.where(
-                        (time_by_cluster_sat_s == duplicate_time)
-                        & (energy_by_cluster_sat_s == max_energy_among_indentical_times)
-                    )[0]
-
-                    # append index_of_time_and_energy_to_keep to a master list listToKeep
-                    highest_energy_flag_inds.append(index_of_time_and_energy_to_keep[0])
-
-                highest_energy_by_cluster_sat = np.zeros(
-                    np.sum(in_cluster_sat_id_bools)
-                )
-                highest_energy_by_cluster_sat[highest_energy_flag_inds] = np.ones(
-                    len(highest_energy_flag_inds)
-                )
-                self.highest_energy[in_cluster_sat_id_bools] = (
-                    highest_energy_by_cluster_sat
-                )
+        # Mark the first point of each cluster, satellite, and time, which has
+        # the unique or highest duplicate energy
+        is_repeat = np.ones(max(len(rows) - 1, 0), dtype=bool)
+        for group_array in (self.cluster_id, self.sat_id, self.time_s):
+            sorted_values = group_array[rows]
+            is_repeat &= sorted_values[1:] == sorted_values[:-1]
+        is_first = np.ones(len(rows), dtype=bool)
+        is_first[1:] = ~is_repeat
+        self.highest_energy[rows] = is_first
 
         # end of mark_higher_energies
 
@@ -2057,58 +2200,32 @@ class GlmDataSet:
             There are no explicit outputs. The fitness class member will be
             updated for each data point.
         """
-        # grab all the cluster ids and sat ids in the data
-        cluster_ids = np.unique(self.cluster_id)
-        sat_ids = np.unique(self.sat_id)
-
-        for cluster_id in cluster_ids:
-            # skip the bad cluster
-            if cluster_id == self.BAD_CLUSTER_ID:
-                continue
-
-            for sat_id in sat_ids:
-                # get the points by the correct cluster and satellite
-                ind = np.all(
-                    [
-                        self.cluster_id == cluster_id,
-                        self.sat_id == sat_id,
-                        self.highest_energy == 1,
-                    ],
-                    axis=0,
-                )
-                if np.all(~ind):
-                    continue
-
-                # sort by time
-                time_ind = np.argsort(self.time_s[ind])
-
-                energy_filter_width = 5
-                max_valid_drop = 5
-                # loop forward through the data looking for anomalous differences
-                fitness_forward = energy_filter(
-                    self.energy_joules[ind][time_ind],
-                    0,
-                    len(time_ind) - 1,
-                    energy_filter_width,
-                    max_valid_drop,
-                )
+        # get the points (in time order) of each cluster and satellite with the
+        # highest energy at their time, skipping the bad cluster
+        rows, _, segment_counts = self.get_cluster_segment_index().live_segment_series(
+            self.highest_energy == 1
+        )
+        segment_starts = np.cumsum(segment_counts) - segment_counts
+        energies = self.energy_joules[rows]
+
+        energy_filter_width = 5
+        max_valid_drop = 5
+        # go forward through the data looking for anomalous differences
+        fitness_forward = segment_energy_filter(
+            energies, segment_starts, energy_filter_width, max_valid_drop
+        )
 
-                # loop backward through the data looking for anomalous
-                # differences
-                fitness_backward = energy_filter(
-                    self.energy_joules[ind][time_ind],
-                    len(time_ind) - 1,
-                    0,
-                    energy_filter_width,
-                    max_valid_drop,
-                )
+        # go backward through the data looking for anomalous differences
+        fitness_backward = segment_energy_filter(
+            energies,
+            segment_starts,
+            energy_filter_width,
+            max_valid_drop,
+            backward=True,
+        )
 
-                # combine the two results
-                fitness_copy = self.fitness[ind]
-                fitness_copy[time_ind] = np.max(
-                    np.array([fitness_forward, fitness_backward]), axis=0
-                )
-                self.fitness[ind] = fitness_copy
+        # combine the two results
+        self.fitness[rows] = np.maximum(fitness_forward, fitness_backward)
 
         # end of mark_bad_points
 
@@ -2190,7 +2307,7 @@ class GlmDataSet:
                     ) and GOES19_ANOMALY_TOLERANCE_DEG > abs(
                         cluster_position_geo_lon - anomaly_lat_lon_tuple[1]
                     ):
-                        self.cluster_id[in_cluster_bools] = self.BAD_CLUSTER_ID
+                        self.mark_rows_bad(in_cluster_bools)
 
         # end of mark_goes19_anomalies
 
@@ -2211,49 +2328,50 @@ class GlmDataSet:
             There are no explicit outputs. The ranks class member will be
             updated for each cluster.
         """
-        # grab all the cluster ids and sat ids in the data
-        cluster_ids = np.unique(self.cluster_id)
-        sat_ids = np.unique(self.sat_id)
+        # grab all the cluster ids in the data
+        cluster_segment_index = self.get_cluster_segment_index()
+        cluster_ids = cluster_segment_index.live_cluster_ids()
+        if cluster_segment_index.has_bad_rows():
+            cluster_ids = np.insert(cluster_ids, 0, self.BAD_CLUSTER_ID)
 
         # Initialize a 2 column ranks array, where columns are
         # cluster_ids and ranks
         self.ranks = np.array([cluster_ids, np.zeros(cluster_ids.shape)]).transpose()
 
-        # Rank using largest number of continuous points above baseline
-        for cluster_id_ind, cluster_id in enumerate(cluster_ids):
-            # skip the bad cluster
-            if cluster_id == self.BAD_CLUSTER_ID:
-                continue
-
-            for sat_id in sat_ids:
-                # get the points by the correct cluster, satellite, fitness, and highest_energy
-                ind = np.all(
-                    [
-                        self.cluster_id == cluster_id,
-                        self.sat_id == sat_id,
-                        self.highest_energy == 1,
-                        self.fitness == 1,
-                    ],
-                    axis=0,
-                )
-                # Skip sats with 0 or 1 point in cluster
-                if np.sum(ind) < 2:
-                    continue
-
-                # determine the baseline
-                sorted_e = np.sort(self.energy_joules[ind])
-                subset10 = sorted_e[range(int(np.ceil(len(sorted_e) * 0.1)))]
-                baseline = np.median(subset10)  # +subset10.std()
+        # Get the points (in time order) of each cluster and satellite with
+        # fitness and highest_energy
+        rows, segment_inds, segment_counts = cluster_segment_index.live_segment_series(
+            (self.highest_energy == 1) & (self.fitness == 1)
+        )
 
-                # sort by time
-                time_ind = np.argsort(self.time_s[ind])
+        # Skip sats with 0 or 1 point in cluster
+        rows = rows[np.repeat(segment_counts >= 2, segment_counts)]
+        segment_inds = segment_inds[segment_counts >= 2]
+        segment_counts = segment_counts[segment_counts >= 2]
+        if len(segment_inds) == 0:
+            return
+        segment_starts = np.cumsum(segment_counts) - segment_counts
+
+        # determine the baselines, from the lowest 10% of the energies
+        energies = self.energy_joules[rows]
+        baselines = segment_low_medians(energies, segment_starts, 0.1)
+
+        # determine number of continuous points above min_energy_j
+        segment_ranks = segment_continuous_above_min(
+            energies - np.repeat(baselines, segment_counts),
+            segment_starts,
+            min_energy_j,
+            0,
+        )
 
-                # determine number of continuous points above min_energy_j
-                cur_rank = continuous_above_min(
-                    self.energy_joules[ind][time_ind] - baseline, min_energy_j, 0
-                )
-                if cur_rank > self.ranks[cluster_id_ind, 1]:
-                    self.ranks[cluster_id_ind, 1] = cur_rank
+        # Rank using largest number of continuous points above baseline
+        np.maximum.at(
+            self.ranks[:, 1],
+            np.searchsorted(
+                cluster_ids, cluster_segment_index.segment_cluster_ids[segment_inds]
+            ),
+            segment_ranks,
+        )
 
         # end of rank_glm_clusters
 
@@ -2284,32 +2402,30 @@ class GlmDataSet:
             if cluster_id == self.BAD_CLUSTER_ID:
                 continue
 
-            in_cluster_bools = self.cluster_id == cluster_id
-            if np.all(~in_cluster_bools):
+            # Identify the points of each sat within cluster
+            cluster_sat_rows = self.get_cluster_sat_rows(cluster_id)
+            if not cluster_sat_rows:
                 continue
 
-            # Identify all sat IDs within cluster
-            sat_ids = np.unique(self.sat_id[in_cluster_bools])
-
             # Initialize a list for sat metrics to be combined into a cluster metric
-            sat_cluster_metrics = np.zeros(len(sat_ids))
+            sat_cluster_metrics = np.zeros(len(cluster_sat_rows))
 
-            for sat_id_ind, sat_id in enumerate(sat_ids):
+            for sat_id_ind, (_, sat_id, sat_rows) in enumerate(cluster_sat_rows):
                 # Index points with same cluster and satellite
                 # Also, only include highest_energy points with good fitness
-                in_cluster_sat_id_bools = (
-                    in_cluster_bools
-                    & (self.sat_id == sat_id)
-                    & (self.fitness == 1)
-                    & (self.highest_energy == 1)
+                in_cluster_sat_inds = np.sort(
+                    sat_rows[
+                        (self.fitness[sat_rows] == 1)
+                        & (self.highest_energy[sat_rows] == 1)
+                    ]
                 )
-                if np.all(~in_cluster_sat_id_bools):
+                if in_cluster_sat_inds.size == 0:
                     continue
 
                 # Subset times and energies belonging to same cluster and sat
-                energy_by_cluster_sats = self.energy_joules[in_cluster_sat_id_bools]
+                energy_by_cluster_sats = self.energy_joules[in_cluster_sat_inds]
                 cloud_top_lat_lon_by_cluster_sat_degs = self.cloud_top_lat_lon_deg[
-                    in_cluster_sat_id_bools
+                    in_cluster_sat_inds
                 ]
                 lat_by_cluster_sat_degs = cloud_top_lat_lon_by_cluster_sat_degs[:, 0]
                 lon_by_cluster_sat_degs = cloud_top_lat_lon_by_cluster_sat_degs[:, 1]
@@ -2348,7 +2464,7 @@ class GlmDataSet:
                 # Store the metric for later analysis
                 bolide_prob = y_hat_probs[0][1]  # Prob of bolide
                 sat_cluster_metrics[sat_id_ind] = bolide_prob
-                self.rocket_prob[str(cluster_id) + "_" + str(sat_id)] = bolide_prob
+                self.rocket_prob[get_cluster_key(cluster_id, sat_id)] = bolide_prob
 
             # Combine the sat metrics into a cluster metric
             cluster_metric = np.array(max(sat_cluster_metrics))
@@ -2391,16 +2507,16 @@ class GlmDataSet:
             (list of floats): the estimates ECEF coordinates (X, Y, Z)
             of the bolide event
         """
-        if str(cluster_id) in self.location_ecef_m:
-            location_ecef_xm = self.location_ecef_m[str(cluster_id)][0]
-            location_ecef_ym = self.location_ecef_m[str(cluster_id)][1]
-            location_ecef_zm = self.location_ecef_m[str(cluster_id)][2]
+        if get_cluster_key(cluster_id) in self.location_ecef_m:
+            location_ecef_xm = self.location_ecef_m[get_cluster_key(cluster_id)][0]
+            location_ecef_ym = self.location_ecef_m[get_cluster_key(cluster_id)][1]
+            location_ecef_zm = self.location_ecef_m[get_cluster_key(cluster_id)][2]
         else:
             # Find the indice of peak calibrated intensity
             max_pnt_ind = np.argmax(self.source_intensity_wpsr[in_cluster_bools])
 
             # Construct LOS vector for peak intensity
-            sat_pos_ecef_m = self.sat_pos_ecef_m[in_cluster_bools][max_pnt_ind]
+            sat_pos_ecef_m = self.get_sat_pos_ecef_m(in_cluster_bools)[max_pnt_ind]
             high_pos_ecef_m = self.high_pos_ecef_m[in_cluster_bools][max_pnt_ind]
 
             # Compute where LOS vector intersects cloud top height
@@ -2461,7 +2577,7 @@ class GlmDataSet:
             glm_data_set object indices qualify as being in the cluster.
         """
         # Index points with same cluster
-        in_cluster_bools = self.cluster_id == cluster_id
+        in_cluster_bools = self.get_cluster_bools(cluster_id)
 
         if np.all(~in_cluster_bools):
             return False
@@ -2493,13 +2609,9 @@ class GlmDataSet:
         # (Points must be moving between pixels)
         group_ids = self.group_id[in_cluster_bools]
 
-        group_cluster_large_enough_bools = []
-        for group_id in group_ids:
-            # Construct a vector of cluster sizes greater than 1 using the
-            # group_ids that match the event_parent_group_ids
-            group_cluster_large_enough_bools.append(
-                np.sum(self.event_parent_group_id == group_id) > 1
-            )
+        # Construct a vector of cluster sizes greater than 1 using the
+        # group_ids that match the event_parent_group_ids
+        group_cluster_large_enough_bools = self.count_group_events(group_ids) > 1
         in_cluster_bools[in_cluster_bools] = group_cluster_large_enough_bools
 
         # Further reduce point sources to be used for velocity estimates
@@ -2637,16 +2749,17 @@ class GlmDataSet:
                 continue
 
             # Associate LOS vectors which are near in time to each other
-            time_los_vectors = vhf.associate_los_vectors(
+            (least_cluster_sat_data, most_cluster_sat_data) = vhf.associate_los_vectors(
                 least_cluster_sat_data, most_cluster_sat_data
             )
+            num_associated_los = len(least_cluster_sat_data[0])
 
             # Check if enough LOS vectors exist for both stereo satellites
             # Must have at least len(beta_vec) since the linear model needs at least len(beta_vec)
-            if len(time_los_vectors) < MIN_NUM_POINTS_FOR_VEL_ESTIMATE:
+            if num_associated_los < MIN_NUM_POINTS_FOR_VEL_ESTIMATE:
                 debug_print(
                     f"\nToo few points to construct a velocity estimate. "
-                    f"Found {len(time_los_vectors)}, but need "
+                    f"Found {num_associated_los}, but need "
                     f"{MIN_NUM_POINTS_FOR_VEL_ESTIMATE}.",
                     debug_mode,
                 )
@@ -2659,7 +2772,9 @@ class GlmDataSet:
                 estimated_lons,
                 estimated_alts,
                 intersection_times,
-            ) = vhf.compute_nearest_approach_points(time_los_vectors)
+            ) = vhf.compute_nearest_approach_points(
+                least_cluster_sat_data, most_cluster_sat_data
+            )
 
             if save_pairs_plots:
                 plot_pairs(
@@ -2689,7 +2804,7 @@ class GlmDataSet:
                 continue
 
             # Store the velocity within the glm_data_set object
-            self.velocities[str(cluster_id)] = velocity_estimate_mps
+            self.velocities[get_cluster_key(cluster_id)] = velocity_estimate_mps
 
         debug_print("\nEnd estimate_velocities()", debug_mode)
 
@@ -2711,10 +2826,10 @@ class GlmDataSet:
             (list of floats): the estimated velocity components (X, Y, Z)
             of the bolide event at peak intensity
         """
-        if str(cluster_id) in self.velocities:
-            velocity_ecef_x_mps = self.velocities[str(cluster_id)][0]
-            velocity_ecef_y_mps = self.velocities[str(cluster_id)][1]
-            velocity_ecef_z_mps = self.velocities[str(cluster_id)][2]
+        if get_cluster_key(cluster_id) in self.velocities:
+            velocity_ecef_x_mps = self.velocities[get_cluster_key(cluster_id)][0]
+            velocity_ecef_y_mps = self.velocities[get_cluster_key(cluster_id)][1]
+            velocity_ecef_z_mps = self.velocities[get_cluster_key(cluster_id)][2]
         else:
             velocity_ecef_x_mps = 0.0
             velocity_ecef_y_mps = 0.0
@@ -2753,13 +2868,12 @@ class GlmDataSet:
             msg_track_proto = msg_track_pb2.MsgTrack()
             peak_time = 0
 
-            in_cluster_bools = self.cluster_id == cluster_id
-            sat_ids = np.unique(self.sat_id[in_cluster_bools])
-            for sat_id in sat_ids:
+            in_cluster_bools = self.get_cluster_bools(cluster_id)
+            cluster_sat_rows = self.get_cluster_sat_rows(cluster_id)
+            sat_ids = np.array([sat_id for _, sat_id, _ in cluster_sat_rows])
+            for _, _, sat_rows in cluster_sat_rows:
                 # find the data in the cluster (get the actual indices)
-                ind = np.array(range(self.cluster_id.size))[
-                    (in_cluster_bools) & (self.sat_id == sat_id)
-                ]
+                ind = np.sort(sat_rows)
 
                 # Save satellite level point measurement data to protobuf
                 new_glm_meas = glm_proto.glm_data.meas.add()
@@ -2777,9 +2891,10 @@ class GlmDataSet:
                 # @TODO: Add size of groups provided in GLM data here
                 new_glm_meas.cluster_size = 0
                 new_glm_meas.sat_id = int(self.sat_id[ind][max_pnt])
-                new_glm_meas.sat_pos_ecf_m.x = self.sat_pos_ecef_m[ind][max_pnt, 0]
-                new_glm_meas.sat_pos_ecf_m.y = self.sat_pos_ecef_m[ind][max_pnt, 1]
-                new_glm_meas.sat_pos_ecf_m.z = self.sat_pos_ecef_m[ind][max_pnt, 2]
+                sat_pos_ecef_m = self.get_sat_pos_ecef_m(ind)[max_pnt]
+                new_glm_meas.sat_pos_ecf_m.x = sat_pos_ecef_m[0]
+                new_glm_meas.sat_pos_ecf_m.y = sat_pos_ecef_m[1]
+                new_glm_meas.sat_pos_ecf_m.z = sat_pos_ecef_m[2]
 
                 new_glm_meas.los_near_point_ecf_m.x = self.high_pos_ecef_m[ind][
                     max_pnt, 0
@@ -2860,7 +2975,7 @@ class GlmDataSet:
             event_point_sources_dict (dict) - the event point source data for the event
         """
         # find the data in the cluster
-        in_cluster_bools = self.cluster_id == cluster_id
+        in_cluster_bools = self.get_cluster_bools(cluster_id)
 
         if sum(in_cluster_bools) == 0:
             warnings.warn("sum(in_cluster_bools) is zero!")
@@ -2881,7 +2996,7 @@ class GlmDataSet:
         approx_energy_j = self.get_total_radiated_energy(in_cluster_bools)
 
         # Group and Event Point Sources
-        ind = np.array(range(self.cluster_id.size))[in_cluster_bools]
+        ind = self.get_cluster_rows(cluster_id)
         group_point_sources_dict = {}
         event_point_sources_dict = {}
         for ii in ind:
@@ -2891,13 +3006,13 @@ class GlmDataSet:
 
             # Prep work for collecting all of the event level data
             group_id = self.group_id[ii]
-            keep_event_bool = self.event_parent_group_id == group_id
+            keep_event_inds = self.get_group_event_indices(group_id)
 
             # Collect all of the group level data
             time = self.basetime_ssue + self.time_s[ii]
             intensity_kwpsr = float(self.source_intensity_wpsr[ii]) / 1000
-            group_cluster_size = int(np.sum(keep_event_bool))
-            cluster_sat_pos_ecef_m = self.sat_pos_ecef_m[ii]
+            group_cluster_size = len(keep_event_inds)
+            cluster_sat_pos_ecef_m = self.get_sat_pos_ecef_m(ii)
             sat_ecef_x_m = cluster_sat_pos_ecef_m[0]
             sat_ecef_y_m = cluster_sat_pos_ecef_m[1]
             sat_ecef_z_m = cluster_sat_pos_ecef_m[2]
@@ -2925,10 +3040,10 @@ class GlmDataSet:
             if sat_id not in event_point_sources_dict:
                 event_point_sources_dict[sat_id] = []
 
-            event_times_s = self.basetime_ssue + self.event_time[keep_event_bool]
-            event_lats_deg = self.event_lat[keep_event_bool]
-            event_lons_deg = self.event_lon[keep_event_bool]
-            event_intensities_kwpsr = self.event_intensity_wsr[keep_event_bool] / 1000
+            event_times_s = self.basetime_ssue + self.event_time[keep_event_inds]
+            event_lats_deg = self.event_lat[keep_event_inds]
+            event_lons_deg = self.event_lon[keep_event_inds]
+            event_intensities_kwpsr = self.event_intensity_wsr[keep_event_inds] / 1000
             event_cluster_size = 1  # Since event data are single pixels
 
             # Ensure longitudinals are within -180 to 180
@@ -2943,17 +3058,17 @@ class GlmDataSet:
                 self.CLOUD_TOP_POLE_M,
             )
 
+            event_high_pos_ecefs_m, event_low_pos_ecefs_m = (
+                ghf.find_pierce_points_at_alts(
+                    cluster_sat_pos_ecef_m,
+                    event_cloud_top_pos_ecefs_m,
+                    (self.HIGH_ALTITUDE_M, self.LOW_ALTITUDE_M),
+                )
+            )
+
             for event_ind, event_intensity_kwpsr in enumerate(event_intensities_kwpsr):
-                event_high_pos_ecef_m = ghf.find_pierce_point_at_alt(
-                    cluster_sat_pos_ecef_m.reshape(1, -1),
-                    event_cloud_top_pos_ecefs_m[event_ind].reshape(1, -1),
-                    self.HIGH_ALTITUDE_M,
-                )[0]
-                event_low_pos_ecef_m = ghf.find_pierce_point_at_alt(
-                    cluster_sat_pos_ecef_m.reshape(1, -1),
-                    event_cloud_top_pos_ecefs_m[event_ind].reshape(1, -1),
-                    self.LOW_ALTITUDE_M,
-                )[0]
+                event_high_pos_ecef_m = event_high_pos_ecefs_m[event_ind]
+                event_low_pos_ecef_m = event_low_pos_ecefs_m[event_ind]
                 near_ecef_m_str = (
                     f"{{{event_high_pos_ecef_m[0]}, "
                     f"{event_high_pos_ecef_m[1]}, "
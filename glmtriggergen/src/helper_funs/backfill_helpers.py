@@ -0,0 +1,277 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+"""This file provides helpers to process historical event times in parallel
+over a pool of worker processes.
+"""
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+from joblib import load
+
+import src.helper_funs.database_helpers as dbh
+import src.helper_funs.datetime_helpers as dth
+from config import glmtriggergenconfig as settings
+from src.helper_funs.cluster_helpers import set_cluster_workers
+from src.helper_funs.file_io_helpers import (
+    cleanup_files,
+    download_glm_files,
+    load_cal_tables,
+)
+from src.helper_funs.glm_data_set_helpers import process_glm_files
+from src.helper_funs.glm_decode_helpers import set_decode_workers
+from src.helper_funs.status_helpers_queue import (
+    StatusHelperBuffer,
+    forward_status_records,
+)
+
+# Number of contiguous shards to split the events into per worker process.
+# More shards than workers keeps all workers busy when some time ranges take
+# longer to process than others.
+SHARDS_PER_WORKER = 4
+
+# State loaded once per worker process (see init_backfill_worker)
+WORKER_STATE = {}
+
+
+def shard_event_dates(event_dates, num_shards):
+    """shards = shard_event_dates(event_dates, num_shards)
+
+    Split event times into contiguous time ranges of (nearly) equal size
+
+    INPUTS:
+        event_dates - event times to process (seconds since unix epoch)
+
+        num_shards - number of shards to split the event times into
+
+    OUTPUTS:
+        shards - list of lists of sorted event times. Empty shards are dropped.
+    """
+    sorted_event_dates = sorted(event_dates)
+    num_shards = max(1, min(num_shards, len(sorted_event_dates)))
+    return [
+        shard.tolist()
+        for shard in np.array_split(np.array(sorted_event_dates), num_shards)
+        if len(shard) > 0
+    ]
+
+
+def init_backfill_worker():
+    """init_backfill_worker()
+
+    Load the calibration tables, ROCKET pipeline, and database connection once
+    for a worker process.
+    """
+    # Let the parent process handle Ctrl+C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # The backfill workers already run in parallel, so decode files and
+    # cluster serially
+    set_decode_workers(1)
+    set_cluster_workers(1)
+
+    status_buffer = StatusHelperBuffer()
+    WORKER_STATE["status_buffer"] = status_buffer
+    WORKER_STATE["l2_cal_tables_dict"] = load_cal_tables(settings.L2_CAL_TABLES_PATH)
+    WORKER_STATE["rocket_pipeline"] = load(
+        os.path.join(settings.BASE_PATH, f"rocket_model/{settings.ROCKET_MODEL_NAME}")
+    )
+    if settings.SAVE_TO_DATABASE:
+        WORKER_STATE["db_helper"] = dbh.DBHelper(status_buffer)
+    else:
+        WORKER_STATE["db_helper"] = None
+
+
+def process_event_shard(
+    shard_event_dates, guard_event_dates, data_dir, local_only, keep_netcdfs, options
+):
+    """[event_results, local_filenames, status_records] = process_event_shard(
+        shard_event_dates, guard_event_dates, data_dir, local_only, keep_netcdfs,
+        options)
+
+    Process a contiguous shard of event times in a worker process
+
+    INPUTS:
+        shard_event_dates - sorted event times to process (seconds since unix
+        epoch)
+
+        guard_event_dates - event times of neighboring shards that share files
+        with this shard. Their files are left for the parent to clean up.
+
+        data_dir - directory to store the data in once downloaded
+
+        local_only - if true, only use files already in data_dir
+
+        keep_netcdfs - if true, don't delete any files after processing
+
+        options - [do_plots, debug_mode, output_trigger_file]
+
+    OUTPUTS:
+        event_results - list of [event_ssue, num_valid_files,
+        num_good_clusters, processing_time_s] for each event time
+
+        local_filenames - files downloaded by this worker that still need to
+        be cleaned up
+
+        status_records - status and logs to forward to the parent status helper
+    """
+    status_buffer = WORKER_STATE["status_buffer"]
+    event_results = []
+    local_filenames = []
+    for ii, event_ssue in enumerate(shard_event_dates):
+        clock_time = time.time()
+        if not local_only:
+            [local_names, _] = download_glm_files(
+                event_ssue - settings.PROCESS_TIME_SIZE_S / 2,
+                event_ssue + settings.PROCESS_TIME_SIZE_S / 2,
+                data_dir,
+                status_buffer,
+            )
+            local_filenames.extend(local_names)
+
+        [num_valid_files, num_good_clusters] = process_glm_files(
+            data_dir,
+            WORKER_STATE["l2_cal_tables_dict"],
+            WORKER_STATE["rocket_pipeline"],
+            event_ssue,
+            status_buffer,
+            WORKER_STATE["db_helper"],
+            *options,
+        )
+        event_results.append(
+            [event_ssue, num_valid_files, num_good_clusters, time.time() - clock_time]
+        )
+
+        if not keep_netcdfs:
+            local_filenames = cleanup_files(
+                local_filenames,
+                list(shard_event_dates[ii + 1 :]) + list(guard_event_dates),
+            )
+
+    return [event_results, local_filenames, status_buffer.pop_records()]
+
+
+def run_parallel_backfill(setup, event_dates_que, status_helper):
+    """[event_file_dates, triggered_events] = run_parallel_backfill(
+        setup, event_dates_que, status_helper)
+
+    Process historical event times over a pool of setup.num_backfill_workers
+    worker processes. The sorted event times are split into contiguous shards
+    so each worker reuses files between neighboring event times.
+
+    INPUTS:
+        setup - named tuple of the GLM trigger generator setup (see
+        process_inputs)
+
+        event_dates_que - The times to process (seconds since unix epoch)
+
+        status_helper - a StatusHelper object for sending status and logs
+
+    OUTPUTS:
+        event_file_dates - processed event times as strings, newest first
+
+        triggered_events - number of triggers for each of event_file_dates
+    """
+    event_dates = [
+        event_date
+        for event_date in event_dates_que
+        if event_date < setup.processing_end_time
+    ]
+    shards = shard_event_dates(
+        event_dates, setup.num_backfill_workers * SHARDS_PER_WORKER
+    )
+    status_helper.send_logs(
+        [
+            (
+                "info",
+                f"Processing {len(event_dates)} events in {len(shards)} shards "
+                f"over {setup.num_backfill_workers} worker processes",
+            )
+        ]
+    )
+
+    all_event_results = []
+    leftover_filenames = []
+    mean_time = 20.0
+    options = [setup.do_plots, setup.debug_mode, setup.output_trigger_file]
+    with ProcessPoolExecutor(
+        max_workers=setup.num_backfill_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_backfill_worker,
+    ) as executor:
+        futures = []
+        for ii, shard in enumerate(shards):
+            # Neighboring shards can share a file at their boundary
+            guard_event_dates = []
+            if ii > 0:
+                guard_event_dates.append(shards[ii - 1][-1])
+            if ii < len(shards) - 1:
+                guard_event_dates.append(shards[ii + 1][0])
+            futures.append(
+                executor.submit(
+                    process_event_shard,
+                    shard,
+                    guard_event_dates,
+                    setup.data_dir,
+                    setup.local_only,
+                    setup.keep_netcdfs,
+                    options,
+                )
+            )
+
+        for future in as_completed(futures):
+            [event_results, local_filenames, status_records] = future.result()
+            forward_status_records(status_records, status_helper)
+            leftover_filenames.extend(local_filenames)
+            all_event_results.extend(event_results)
+
+            current_time = datetime.utcnow().strftime("%Y/%m/%d %H:%M:%S")
+            for event_ssue, num_valid_files, num_good_clusters, time_s in sorted(
+                event_results
+            ):
+                mean_time = (19 * mean_time + time_s) / 20
+                print(
+                    f"{dth.convert_ssue_to_string(event_ssue)}",
+                    f"{num_valid_files:6d} {time_s:8.2f} {mean_time:8.2f}",
+                    f"{num_good_clusters:10d} {current_time} ",
+                    f"{len(event_dates) - len(all_event_results):6d}",
+                )
+            status_helper.send_status(
+                [
+                    ("Queued Batches", f"{len(event_dates) - len(all_event_results)}"),
+                ]
+            )
+
+    # Clean up the files left at the shard boundaries
+    if not setup.keep_netcdfs:
+        cleanup_files(sorted(set(leftover_filenames)), [])
+
+    # Match the newest first order of the serial processing loop
+    all_event_results.sort(reverse=True)
+    event_file_dates = [
+        dth.convert_ssue_to_string(event_results[0])
+        for event_results in all_event_results
+    ]
+    triggered_events = [event_results[2] for event_results in all_event_results]
+
+    return [event_file_dates, triggered_events]
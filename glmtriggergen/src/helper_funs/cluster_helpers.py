@@ -0,0 +1,926 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+"""This file provides the clustering engine used by GlmDataSet.cluster_glm_data.
+Groups are bucketed into a (time, lat, lon) grid so candidate pairs are only
+searched for in neighboring cells, and clusters are merged with a disjoint set.
+StreamingClusterState carries the clusters of one batch into the next, so
+consecutive batches can be clustered incrementally. Large batches can be split
+into longitude tiles that are searched for pairs in parallel worker processes.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import src.helper_funs.geo_helpers as ghf
+from config import glmtriggergenconfig as settings
+
+# Grid cells are made slightly wider than the search windows, so rounding can
+# never push a pair inside a window more than one cell apart
+GRID_CELL_PADDING = 1.01
+# The max number of candidate pairs to expand at once while searching the grid
+MAX_BLOCK_PAIRS = 2**20
+
+# Executor used to search tiles for pairs in parallel, created on first use
+CLUSTER_EXECUTOR_STATE = {
+    "executor": None,
+    "num_workers": settings.CLUSTER_WORKERS,
+}
+
+
+class DisjointSet:
+    """DisjointSet
+
+    A union-find structure over the row indices 0..size-1, using path halving
+    and union by size. Each set also carries a name (a cluster ID), which is
+    0 until one is assigned.
+    """
+
+    def __init__(self, size) -> None:
+        """__init__(self, size) -> None
+
+        INPUTS:
+            size - the number of rows
+        """
+        self.parents = list(range(size))
+        self.sizes = [1] * size
+        self.names = [0] * size
+
+    def find(self, row):
+        """root = find(row)
+
+        OUTPUTS:
+            root - the representative row of the set containing row
+        """
+        parents = self.parents
+        while parents[row] != row:
+            parents[row] = parents[parents[row]]
+            row = parents[row]
+        return row
+
+    def union(self, root_a, root_b):
+        """root = union(root_a, root_b)
+
+        Merge two sets, keeping the name of the set of root_a
+
+        INPUTS:
+            root_a, root_b - the representative rows of two different sets
+
+        OUTPUTS:
+            root - the representative row of the merged set
+        """
+        name = self.names[root_a]
+        if self.sizes[root_a] < self.sizes[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parents[root_b] = root_a
+        self.sizes[root_a] += self.sizes[root_b]
+        self.names[root_a] = name
+        return root_a
+
+
+def get_grid_cells(values, cell_width):
+    """cells = get_grid_cells(values, cell_width)
+
+    INPUTS:
+        values - the coordinate of each row
+
+        cell_width - the width of the grid cells. Any width wider than the
+        search window keeps the search exact, so a zero width window uses
+        cells of width 1.
+
+    OUTPUTS:
+        cells - the grid cell of each row, starting from 0
+    """
+    if not cell_width > 0:
+        cell_width = 1.0
+    cells = np.floor(values / cell_width).astype(np.int64)
+    return cells - np.min(cells)
+
+
+def find_window_pairs(
+    time_s,
+    lat_deg,
+    lon_deg,
+    time_distance_s,
+    rough_lat_deg,
+    rough_lon_distance_m,
+    dlat_dist_m,
+    visit_order=None,
+    are_searched=None,
+):
+    """for block_rows, current_inds, window_inds in find_window_pairs(time_s,
+    lat_deg, lon_deg, time_distance_s, rough_lat_deg, rough_lon_distance_m,
+    dlat_dist_m, visit_order=None, are_searched=None)
+
+    Find every pair of rows where the window row is within time_distance_s
+    after the current row and within a rough lat-lon rectangle around it.
+    The rectangle is +/- rough_lat_deg in latitude and +/- the longitude
+    spanning rough_lon_distance_m at the current row's latitude.
+
+    The pairs are generated for one block of current rows at a time, each
+    with at most about MAX_BLOCK_PAIRS candidate pairs, so memory does not
+    grow with the total number of pairs.
+
+    INPUTS:
+        time_s, lat_deg, lon_deg - the time and cloud top position of each
+        row. Rows with non-finite values are never paired.
+
+        time_distance_s - the time window (in secs) after the current row
+
+        rough_lat_deg - the half width (in degrees) of the latitude window
+
+        rough_lon_distance_m - the half width (in meters) of the longitude
+        window
+
+        dlat_dist_m - the distance (in meters) of a degree of latitude
+
+        visit_order - the current rows, in the order to generate their pairs
+        (defaults to all rows in index order)
+
+        are_searched - whether the pairs of each current row are searched for.
+        Rows that are not searched are still yielded in their blocks, without
+        pairs (defaults to all rows).
+
+    YIELDS:
+        block_rows - the current rows of the block, in visit order
+
+        current_inds, window_inds - the row indices of each pair of the block,
+        sorted by the visit order of the current row and then by window row
+    """
+    num_rows = len(time_s)
+    if visit_order is None:
+        visit_order = np.arange(num_rows)
+    if are_searched is None:
+        are_searched = np.ones(num_rows, dtype=bool)
+    visit_ranks = np.empty(num_rows, dtype=np.intp)
+    visit_ranks[visit_order] = np.arange(len(visit_order))
+    no_pairs = np.array([], dtype=np.intp)
+
+    rough_lon_deg = rough_lon_distance_m / (np.cos(np.radians(lat_deg)) * dlat_dist_m)
+    are_valid = (
+        np.isfinite(time_s)
+        & np.isfinite(lat_deg)
+        & np.isfinite(lon_deg)
+        & np.isfinite(rough_lon_deg)
+    )
+    valid_rows = np.flatnonzero(are_valid)
+    if valid_rows.size == 0:
+        if len(visit_order) > 0:
+            yield visit_order, no_pairs, no_pairs
+        return
+    valid_inds = np.full(num_rows, -1, dtype=np.intp)
+    valid_inds[valid_rows] = np.arange(valid_rows.size)
+    valid_time_s = time_s[valid_rows]
+    valid_lat_deg = lat_deg[valid_rows]
+    valid_lon_deg = lon_deg[valid_rows]
+    valid_rough_lon_deg = rough_lon_deg[valid_rows]
+
+    # Bucket the rows into grid cells at least as wide as the windows, so the
+    # window rows of a current row are in the same or the next time cell, and
+    # in the neighboring lat and lon cells. Lat and lon cells are padded by
+    # one so neighboring cells never wrap around into another row of cells.
+    time_cells = get_grid_cells(valid_time_s, time_distance_s * GRID_CELL_PADDING)
+    lat_cells = 1 + get_grid_cells(valid_lat_deg, rough_lat_deg * GRID_CELL_PADDING)
+    lon_cells = 1 + get_grid_cells(
+        valid_lon_deg, np.max(valid_rough_lon_deg) * GRID_CELL_PADDING
+    )
+    num_lat_cells = np.max(lat_cells) + 2
+    num_lon_cells = np.max(lon_cells) + 2
+    cell_keys = (time_cells * num_lat_cells + lat_cells) * num_lon_cells + lon_cells
+    key_order = np.argsort(cell_keys, kind="stable")
+    sorted_cell_keys = cell_keys[key_order]
+    key_offsets = [
+        (time_offset * num_lat_cells + lat_offset) * num_lon_cells + lon_offset
+        for time_offset in (0, 1)
+        for lat_offset in (-1, 0, 1)
+        for lon_offset in (-1, 0, 1)
+    ]
+
+    def get_neighbor_ranges(block_valid_inds, key_offset):
+        neighbor_keys = cell_keys[block_valid_inds] + key_offset
+        starts = np.searchsorted(sorted_cell_keys, neighbor_keys, "left")
+        ends = np.searchsorted(sorted_cell_keys, neighbor_keys, "right")
+        return starts, ends - starts
+
+    # The number of candidate pairs of each current row, used to split the
+    # current rows into blocks
+    are_visit_candidates = are_searched[visit_order] & are_valid[visit_order]
+    candidate_counts = np.zeros(len(visit_order), dtype=np.int64)
+    visit_valid_inds = valid_inds[visit_order[are_visit_candidates]]
+    for key_offset in key_offsets:
+        candidate_counts[are_visit_candidates] += get_neighbor_ranges(
+            visit_valid_inds, key_offset
+        )[1]
+    count_ends = np.cumsum(candidate_counts)
+
+    block_start = 0
+    while block_start < len(visit_order):
+        block_end = max(
+            np.searchsorted(
+                count_ends,
+                count_ends[block_start]
+                - candidate_counts[block_start]
+                + MAX_BLOCK_PAIRS,
+                "right",
+            ),
+            block_start + 1,
+        )
+        block_rows = visit_order[block_start:block_end]
+        block_valid_inds = valid_inds[
+            block_rows[are_visit_candidates[block_start:block_end]]
+        ]
+        block_start = block_end
+
+        current_inds_list = [no_pairs]
+        window_inds_list = [no_pairs]
+        for key_offset in key_offsets:
+            starts, counts = get_neighbor_ranges(block_valid_inds, key_offset)
+            num_pairs = np.sum(counts)
+            if num_pairs == 0:
+                continue
+            current_valid_inds = np.repeat(block_valid_inds, counts)
+            pair_offsets = np.arange(num_pairs) - np.repeat(
+                np.cumsum(counts) - counts, counts
+            )
+            window_valid_inds = key_order[np.repeat(starts, counts) + pair_offsets]
+
+            # Keep the pairs within the time, lat, and lon windows
+            current_time_s = valid_time_s[current_valid_inds]
+            window_time_s = valid_time_s[window_valid_inds]
+            current_lat_deg = valid_lat_deg[current_valid_inds]
+            window_lat_deg = valid_lat_deg[window_valid_inds]
+            current_lon_deg = valid_lon_deg[current_valid_inds]
+            window_lon_deg = valid_lon_deg[window_valid_inds]
+            current_rough_lon_deg = valid_rough_lon_deg[current_valid_inds]
+            in_window_bools = (
+                (current_valid_inds != window_valid_inds)
+                & (current_time_s <= window_time_s)
+                & (window_time_s <= current_time_s + time_distance_s)
+                & (current_lat_deg - rough_lat_deg <= window_lat_deg)
+                & (window_lat_deg <= current_lat_deg + rough_lat_deg)
+                & (current_lon_deg - current_rough_lon_deg <= window_lon_deg)
+                & (window_lon_deg <= current_lon_deg + current_rough_lon_deg)
+            )
+            current_inds_list.append(valid_rows[current_valid_inds[in_window_bools]])
+            window_inds_list.append(valid_rows[window_valid_inds[in_window_bools]])
+
+        current_inds = np.concatenate(current_inds_list)
+        window_inds = np.concatenate(window_inds_list)
+        pair_order = np.lexsort((window_inds, visit_ranks[current_inds]))
+        yield block_rows, current_inds[pair_order], window_inds[pair_order]
+
+
+def find_close_pairs(
+    time_s,
+    lat_deg,
+    lon_deg,
+    low_pos_ecef_m,
+    high_pos_ecef_m,
+    time_distance_s,
+    cluster_distance_m,
+    rough_lat_deg,
+    rough_lon_distance_m,
+    dlat_dist_m,
+    visit_order=None,
+    are_searched=None,
+    skip_pairs=None,
+):
+    """for block_rows, current_inds, window_inds in find_close_pairs(time_s,
+    lat_deg, lon_deg, low_pos_ecef_m, high_pos_ecef_m, time_distance_s,
+    cluster_distance_m, rough_lat_deg, rough_lon_distance_m, dlat_dist_m,
+    visit_order=None, are_searched=None, skip_pairs=None)
+
+    Find the pairs of rows in each other's windows (see find_window_pairs)
+    whose lines-of-sight are within cluster_distance_m, one block of current
+    rows at a time
+
+    INPUTS:
+        low_pos_ecef_m, high_pos_ecef_m - the ends of the line-of-sight of
+        each row
+
+        cluster_distance_m - the max distance (in meters) between the
+        lines-of-sight of a pair
+
+        skip_pairs - a function called with the current_inds and window_inds
+        of each block, returning whether each pair can be dropped before its
+        distance is computed (defaults to keeping every pair). It is called
+        after the previous block has been consumed.
+
+        See find_window_pairs for the other inputs.
+
+    YIELDS:
+        block_rows, current_inds, window_inds - the current rows of the block
+        and its close pairs (see find_window_pairs)
+    """
+    for block_rows, current_inds, window_inds in find_window_pairs(
+        time_s,
+        lat_deg,
+        lon_deg,
+        time_distance_s,
+        rough_lat_deg,
+        rough_lon_distance_m,
+        dlat_dist_m,
+        visit_order=visit_order,
+        are_searched=are_searched,
+    ):
+        if skip_pairs is not None and current_inds.size > 0:
+            are_kept = ~skip_pairs(current_inds, window_inds)
+            current_inds = current_inds[are_kept]
+            window_inds = window_inds[are_kept]
+        closest_distances, _, _ = ghf.dist3d_segments_to_segments(
+            low_pos_ecef_m[window_inds],
+            high_pos_ecef_m[window_inds],
+            low_pos_ecef_m[current_inds],
+            high_pos_ecef_m[current_inds],
+        )
+        are_close_bools = ~(closest_distances > cluster_distance_m)
+        yield block_rows, current_inds[are_close_bools], window_inds[are_close_bools]
+
+
+def cluster_close_pairs(
+    merger,
+    time_s,
+    lat_deg,
+    lon_deg,
+    low_pos_ecef_m,
+    high_pos_ecef_m,
+    visit_order,
+    time_distance_s,
+    cluster_distance_m,
+    rough_lat_deg,
+    rough_lon_distance_m,
+    dlat_dist_m,
+    are_searched=None,
+    are_carried=None,
+):
+    """current_inds, window_inds = cluster_close_pairs(merger, time_s, lat_deg,
+    lon_deg, low_pos_ecef_m, high_pos_ecef_m, visit_order, time_distance_s,
+    cluster_distance_m, rough_lat_deg, rough_lon_distance_m, dlat_dist_m,
+    are_searched=None, are_carried=None)
+
+    Visit the rows in visit_order, merging the close pairs (see
+    find_close_pairs) of each block of current rows with merger before the
+    next block is searched. Pairs whose rows are already in the same cluster,
+    and pairs of two carried rows, are dropped before their distances are
+    computed, so a dense storm cell only costs distances until it is joined.
+
+    INPUTS:
+        merger - the ClusterMerger holding the clusters
+
+        visit_order - the row indices in the order to visit them
+
+        are_searched - whether the pairs of each row are searched for
+        (defaults to all rows)
+
+        are_carried - whether each row was carried from the previous batch
+        (defaults to none)
+
+        See find_close_pairs for the other inputs.
+
+    OUTPUTS:
+        current_inds, window_inds - the pairs that joined two clusters, in the
+        order they were merged
+    """
+    if are_carried is None:
+        are_carried = np.zeros(len(time_s), dtype=bool)
+
+    def skip_pairs(current_inds, window_inds):
+        return (are_carried[current_inds] & are_carried[window_inds]) | (
+            merger.are_joined(current_inds, window_inds)
+        )
+
+    current_inds_list = [np.array([], dtype=np.intp)]
+    window_inds_list = [np.array([], dtype=np.intp)]
+    for block_rows, current_inds, window_inds in find_close_pairs(
+        time_s,
+        lat_deg,
+        lon_deg,
+        low_pos_ecef_m,
+        high_pos_ecef_m,
+        time_distance_s,
+        cluster_distance_m,
+        rough_lat_deg,
+        rough_lon_distance_m,
+        dlat_dist_m,
+        visit_order=visit_order,
+        are_searched=are_searched,
+        skip_pairs=skip_pairs,
+    ):
+        are_joining = merger.merge(block_rows, current_inds, window_inds)
+        current_inds_list.append(current_inds[are_joining])
+        window_inds_list.append(window_inds[are_joining])
+    return np.concatenate(current_inds_list), np.concatenate(window_inds_list)
+
+
+def find_tile_forest_pairs(
+    time_s,
+    lat_deg,
+    lon_deg,
+    low_pos_ecef_m,
+    high_pos_ecef_m,
+    are_core,
+    are_carried,
+    visit_ranks,
+    time_distance_s,
+    cluster_distance_m,
+    rough_lat_deg,
+    rough_lon_distance_m,
+    dlat_dist_m,
+):
+    """current_inds, window_inds = find_tile_forest_pairs(time_s, lat_deg,
+    lon_deg, low_pos_ecef_m, high_pos_ecef_m, are_core, are_carried,
+    visit_ranks, time_distance_s, cluster_distance_m, rough_lat_deg,
+    rough_lon_distance_m, dlat_dist_m)
+
+    Cluster the close pairs (see cluster_close_pairs) of the rows in the core
+    of a tile, and keep only the pairs that joined two of the tile's
+    clusters. Pairs are visited in the order merge_clusters visits them, so
+    the dropped pairs could not have merged anything there either.
+
+    INPUTS:
+        are_core - whether each row is in the core of the tile, rather than
+        its halo. Only pairs with a current row in the core are kept.
+
+        are_carried - whether each row was carried from the previous batch.
+        Pairs of two carried rows are dropped.
+
+        visit_ranks - the position of each row in the order the rows are
+        visited by merge_clusters
+
+        See find_close_pairs for the other inputs.
+
+    OUTPUTS:
+        current_inds, window_inds - the row indices of the kept pairs
+    """
+    core_rows = np.flatnonzero(are_core)
+    return cluster_close_pairs(
+        ClusterMerger(np.zeros(len(time_s), dtype=np.int64)),
+        time_s,
+        lat_deg,
+        lon_deg,
+        low_pos_ecef_m,
+        high_pos_ecef_m,
+        core_rows[np.argsort(visit_ranks[core_rows], kind="stable")],
+        time_distance_s,
+        cluster_distance_m,
+        rough_lat_deg,
+        rough_lon_distance_m,
+        dlat_dist_m,
+        are_searched=are_core,
+        are_carried=are_carried,
+    )
+
+
+def get_lon_tiles(lon_deg, halo_deg, num_tiles):
+    """tiles = get_lon_tiles(lon_deg, halo_deg, num_tiles)
+
+    Split the rows into longitude tiles holding about the same number of
+    rows, each with a halo of the rows within halo_deg of the tile
+
+    INPUTS:
+        lon_deg - the longitude of each row
+
+        halo_deg - the width (in degrees) of the halos
+
+        num_tiles - the number of tiles
+
+    OUTPUTS:
+        tiles - a list of (tile_rows, are_core) pairs, the rows in each tile
+        and whether each of them is in its core
+    """
+    edges = np.quantile(lon_deg, np.linspace(0, 1, num_tiles + 1)[1:-1])
+    core_tiles = np.searchsorted(edges, lon_deg, "right")
+    edges = np.concatenate(([-np.inf], edges, [np.inf]))
+    tiles = []
+    for tile in range(num_tiles):
+        tile_rows = np.flatnonzero(
+            (edges[tile] - halo_deg <= lon_deg)
+            & (lon_deg <= edges[tile + 1] + halo_deg)
+        )
+        if tile_rows.size > 0:
+            tiles.append((tile_rows, core_tiles[tile_rows] == tile))
+    return tiles
+
+
+def find_merge_pairs_in_tiles(
+    executor,
+    num_tiles,
+    time_s,
+    lat_deg,
+    lon_deg,
+    low_pos_ecef_m,
+    high_pos_ecef_m,
+    sorted_time_indices,
+    time_distance_s,
+    cluster_distance_m,
+    rough_lat_deg,
+    rough_lon_distance_m,
+    dlat_dist_m,
+    are_carried=None,
+    last_index=None,
+):
+    """current_inds, window_inds = find_merge_pairs_in_tiles(executor,
+    num_tiles, time_s, lat_deg, lon_deg, low_pos_ecef_m, high_pos_ecef_m,
+    sorted_time_indices, time_distance_s, cluster_distance_m, rough_lat_deg,
+    rough_lon_distance_m, dlat_dist_m, are_carried=None, last_index=None)
+
+    Split the rows into longitude tiles, and find the pairs to merge in each
+    tile in parallel (see find_tile_forest_pairs). The halos are as wide as
+    the widest longitude window, so each tile holds every pair of its core
+    rows. Merging the returned pairs gives the same cluster IDs as merging
+    all of the close pairs.
+
+    INPUTS:
+        executor - the executor running the tiles
+
+        num_tiles - the number of tiles
+
+        sorted_time_indices - the row indices in the order merge_clusters
+        will visit them
+
+        are_carried - whether each row was carried from the previous batch
+        (defaults to none)
+
+        last_index - a row whose pairs are skipped (defaults to none)
+
+        See find_close_pairs for the other inputs.
+
+    OUTPUTS:
+        current_inds, window_inds - the row indices of the pairs to merge,
+        sorted by current row and then window row
+    """
+    num_rows = len(time_s)
+    if are_carried is None:
+        are_carried = np.zeros(num_rows, dtype=bool)
+    visit_ranks = np.empty(num_rows, dtype=np.intp)
+    visit_ranks[sorted_time_indices] = np.arange(num_rows)
+
+    # The halos cover the widest longitude window of any row
+    rough_lon_deg = rough_lon_distance_m / (np.cos(np.radians(lat_deg)) * dlat_dist_m)
+    are_valid = (
+        np.isfinite(time_s)
+        & np.isfinite(lat_deg)
+        & np.isfinite(lon_deg)
+        & np.isfinite(rough_lon_deg)
+    )
+    if not np.any(are_valid):
+        return np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+    halo_deg = np.max(rough_lon_deg[are_valid])
+    valid_rows = np.flatnonzero(are_valid)
+    valid_are_core = np.ones(len(valid_rows), dtype=bool)
+    if last_index is not None:
+        valid_are_core[valid_rows == last_index] = False
+
+    futures = []
+    for tile_valid_inds, are_core in get_lon_tiles(
+        lon_deg[valid_rows], halo_deg, num_tiles
+    ):
+        tile_rows = valid_rows[tile_valid_inds]
+        are_core = are_core & valid_are_core[tile_valid_inds]
+        if not np.any(are_core):
+            continue
+        future = executor.submit(
+            find_tile_forest_pairs,
+            time_s[tile_rows],
+            lat_deg[tile_rows],
+            lon_deg[tile_rows],
+            low_pos_ecef_m[tile_rows],
+            high_pos_ecef_m[tile_rows],
+            are_core,
+            are_carried[tile_rows],
+            visit_ranks[tile_rows],
+            time_distance_s,
+            cluster_distance_m,
+            rough_lat_deg,
+            rough_lon_distance_m,
+            dlat_dist_m,
+        )
+        futures.append((tile_rows, future))
+
+    current_inds_list = [np.array([], dtype=np.intp)]
+    window_inds_list = [np.array([], dtype=np.intp)]
+    for tile_rows, future in futures:
+        tile_current_inds, tile_window_inds = future.result()
+        current_inds_list.append(tile_rows[tile_current_inds])
+        window_inds_list.append(tile_rows[tile_window_inds])
+    current_inds = np.concatenate(current_inds_list)
+    window_inds = np.concatenate(window_inds_list)
+    pair_order = np.lexsort((window_inds, current_inds))
+    return current_inds[pair_order], window_inds[pair_order]
+
+
+def get_cluster_executor():
+    """executor = get_cluster_executor()
+
+    OUTPUTS:
+        executor - the executor used to search tiles for pairs in parallel,
+        or None if batches are clustered serially
+    """
+    if CLUSTER_EXECUTOR_STATE["num_workers"] <= 1:
+        return None
+    if CLUSTER_EXECUTOR_STATE["executor"] is None:
+        # Spawn the workers since the parent process runs threads
+        CLUSTER_EXECUTOR_STATE["executor"] = ProcessPoolExecutor(
+            max_workers=CLUSTER_EXECUTOR_STATE["num_workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return CLUSTER_EXECUTOR_STATE["executor"]
+
+
+def set_cluster_workers(num_workers):
+    """set_cluster_workers(num_workers)
+
+    Change the number of workers used to search tiles for pairs in parallel.
+    Any running executor is shut down.
+
+    INPUTS:
+        num_workers - number of cluster workers (1 clusters serially)
+    """
+    if CLUSTER_EXECUTOR_STATE["executor"] is not None:
+        CLUSTER_EXECUTOR_STATE["executor"].shutdown()
+        CLUSTER_EXECUTOR_STATE["executor"] = None
+    CLUSTER_EXECUTOR_STATE["num_workers"] = num_workers
+
+
+class ClusterMerger:
+    """ClusterMerger
+
+    Visits rows in time order, giving each row without a cluster a new
+    cluster ID, and merging the clusters of its paired window rows into its
+    cluster. A merged cluster takes the cluster ID of the current row, so the
+    cluster IDs match relabeling the rows of the merged clusters one pair at
+    a time. The rows can be visited over several calls to merge, one block
+    at a time.
+    """
+
+    def __init__(self, cluster_id, num_clusters=None) -> None:
+        """__init__(self, cluster_id, num_clusters=None) -> None
+
+        INPUTS:
+            cluster_id - the current cluster ID of each row (0 for no
+            cluster). Rows sharing a cluster ID start in the same cluster.
+
+            num_clusters - the number of cluster IDs already in use, so new
+            clusters are numbered after it (defaults to the max cluster ID)
+        """
+        self.cluster_id = cluster_id
+        num_rows = len(cluster_id)
+        self.disjoint_set = DisjointSet(num_rows)
+
+        # Rows which already share a cluster ID start in the same set
+        first_rows = {}
+        for row in np.flatnonzero(cluster_id != 0).tolist():
+            row_cluster_id = cluster_id[row].item()
+            if row_cluster_id in first_rows:
+                self.disjoint_set.union(
+                    self.disjoint_set.find(first_rows[row_cluster_id]), row
+                )
+            else:
+                first_rows[row_cluster_id] = row
+                self.disjoint_set.names[row] = row_cluster_id
+        if num_clusters is None:
+            num_clusters = int(np.max(cluster_id)) if num_rows > 0 else 0
+        self.num_clusters = num_clusters
+
+    def are_joined(self, current_inds, window_inds):
+        """are_joined = are_joined(current_inds, window_inds)
+
+        OUTPUTS:
+            are_joined - whether the rows of each pair are already in the
+            same cluster
+        """
+        rows = np.unique(np.concatenate((current_inds, window_inds)))
+        find = self.disjoint_set.find
+        roots = np.array([find(row) for row in rows.tolist()], dtype=np.intp)
+        return (
+            roots[np.searchsorted(rows, current_inds)]
+            == roots[np.searchsorted(rows, window_inds)]
+        )
+
+    def merge(self, visit_rows, current_inds, window_inds):
+        """are_joining = merge(visit_rows, current_inds, window_inds)
+
+        INPUTS:
+            visit_rows - the next rows to visit, in order
+
+            current_inds, window_inds - the pairs of rows to cluster together.
+            The pairs of each current row are contiguous, and merged in order.
+
+        OUTPUTS:
+            are_joining - whether each pair joined two different clusters
+        """
+        pair_rows, pair_starts, pair_counts = np.unique(
+            current_inds, return_index=True, return_counts=True
+        )
+        pair_ranges = dict(
+            zip(
+                pair_rows.tolist(),
+                zip(pair_starts.tolist(), (pair_starts + pair_counts).tolist()),
+            )
+        )
+        window_inds = window_inds.tolist()
+        are_joining = np.zeros(len(window_inds), dtype=bool)
+
+        disjoint_set = self.disjoint_set
+        find = disjoint_set.find
+        names = disjoint_set.names
+        for current_index in visit_rows.tolist():
+            current_root = find(current_index)
+            if names[current_root] == 0:
+                self.num_clusters += 1
+                names[current_root] = self.num_clusters
+            if current_index not in pair_ranges:
+                continue
+
+            pair_start, pair_end = pair_ranges[current_index]
+            for pair_ind in range(pair_start, pair_end):
+                window_root = find(window_inds[pair_ind])
+                if window_root == current_root:
+                    continue
+                current_root = disjoint_set.union(current_root, window_root)
+                are_joining[pair_ind] = True
+        return are_joining
+
+    def get_cluster_id(self):
+        """cluster_id = get_cluster_id()
+
+        OUTPUTS:
+            cluster_id - the cluster ID of each row
+        """
+        find = self.disjoint_set.find
+        names = self.disjoint_set.names
+        return np.array(
+            [names[find(row)] for row in range(len(self.cluster_id))],
+            dtype=self.cluster_id.dtype,
+        )
+
+
+def merge_clusters(
+    cluster_id,
+    sorted_time_indices,
+    current_inds,
+    window_inds,
+    last_index=None,
+    num_clusters=None,
+):
+    """cluster_id = merge_clusters(cluster_id, sorted_time_indices,
+    current_inds, window_inds, last_index=None, num_clusters=None)
+
+    Visit the rows in time order, merging the given pairs (see
+    ClusterMerger)
+
+    INPUTS:
+        cluster_id - the current cluster ID of each row (0 for no cluster).
+        Rows sharing a cluster ID start in the same cluster.
+
+        sorted_time_indices - the row indices in the order to visit them
+
+        current_inds, window_inds - the pairs of rows to cluster together,
+        sorted by current row
+
+        last_index - a row whose pairs are skipped, which still gets a
+        cluster ID (defaults to none)
+
+        num_clusters - the number of cluster IDs already in use, so new
+        clusters are numbered after it (defaults to the max cluster ID)
+
+    OUTPUTS:
+        cluster_id - the new cluster ID of each row
+    """
+    if last_index is not None:
+        are_kept = current_inds != last_index
+        current_inds = current_inds[are_kept]
+        window_inds = window_inds[are_kept]
+    merger = ClusterMerger(cluster_id, num_clusters)
+    merger.merge(sorted_time_indices, current_inds, window_inds)
+    return merger.get_cluster_id()
+
+
+def get_group_keys(sat_id, group_id, times_ssue):
+    """keys = get_group_keys(sat_id, group_id, times_ssue)
+
+    INPUTS:
+        sat_id, group_id - the satellite and GLM group ID of each row
+
+        times_ssue - the time of each row (seconds since unix epoch)
+
+    OUTPUTS:
+        keys - a key identifying each group in any batch it is loaded in. The
+        times are rounded to milliseconds, so they do not depend on the
+        basetime of the batch.
+    """
+    keys = np.empty((len(sat_id), 2), dtype=np.int64)
+    keys[:, 0] = (np.asarray(sat_id, dtype=np.int64) << 32) | np.asarray(
+        group_id, dtype=np.int64
+    )
+    keys[:, 1] = np.round(np.asarray(times_ssue) * 1e3)
+    return keys.view(np.dtype((np.void, keys.itemsize * 2))).ravel()
+
+
+class StreamingClusterState:
+    """StreamingClusterState
+
+    The clusters of the previous batch, carried into the next one. In
+    continuous mode consecutive batches share a file of data, so the groups
+    the batches share keep their cluster IDs, and only the newly arrived
+    groups need to be clustered. The clusters already reported are tracked,
+    so each cluster is only reported once.
+    """
+
+    def __init__(self) -> None:
+        """__init__(self) -> None"""
+        # the keys (see get_group_keys) and cluster IDs of the groups of the
+        # previous batch, sorted by key
+        self.keys = get_group_keys([], [], [])
+        self.cluster_id = np.array([], dtype=np.int64)
+        # the cluster IDs of the previous batch run from 1 to num_clusters
+        self.num_clusters = 0
+        # the cluster IDs of the previous batch that were already reported
+        self.reported_cluster_ids = np.array([], dtype=np.int64)
+        # the latest group time (in secs since unix epoch) of each satellite
+        # in the previous batch, keyed by satellite ID
+        self.sat_end_times_ssue = {}
+
+    def update_watermark(self, sat_id, times_ssue):
+        """watermark_ssue = update_watermark(sat_id, times_ssue)
+
+        Track the latest group time of each satellite. The data of the
+        satellites can arrive at different times, so the batch is only
+        complete up to the earliest of these, the watermark. Satellites
+        without groups in the current batch are no longer tracked.
+
+        INPUTS:
+            sat_id, times_ssue - the satellite and time (in secs since unix
+            epoch) of each group of the current batch
+
+        OUTPUTS:
+            watermark_ssue - the earliest of the latest group times of the
+            satellites
+        """
+        sat_ids, sat_inds = np.unique(sat_id, return_inverse=True)
+        sat_end_times_ssue = np.full(len(sat_ids), -np.inf)
+        np.maximum.at(sat_end_times_ssue, sat_inds.reshape(-1), times_ssue)
+        self.sat_end_times_ssue = {
+            sat: max(end_time_ssue, self.sat_end_times_ssue.get(sat, -np.inf))
+            for sat, end_time_ssue in zip(sat_ids.tolist(), sat_end_times_ssue.tolist())
+        }
+        return min(self.sat_end_times_ssue.values())
+
+    def find_carried_rows(self, keys):
+        """carried_cluster_id = find_carried_rows(keys)
+
+        INPUTS:
+            keys - the keys of the groups of the current batch
+
+        OUTPUTS:
+            carried_cluster_id - the cluster ID each group had in the previous
+            batch, or 0 if the group is newly arrived
+        """
+        carried_cluster_id = np.zeros(len(keys), dtype=np.int64)
+        if self.keys.size == 0:
+            return carried_cluster_id
+        carried_inds = np.minimum(np.searchsorted(self.keys, keys), self.keys.size - 1)
+        are_carried = self.keys[carried_inds] == keys
+        carried_cluster_id[are_carried] = self.cluster_id[carried_inds[are_carried]]
+        return carried_cluster_id
+
+    def carry(self, keys, cluster_id, reported_cluster_ids):
+        """carry(keys, cluster_id, reported_cluster_ids)
+
+        Keep the clusters of the current batch for the next one. The cluster
+        IDs are renumbered from 1, so they do not grow from batch to batch.
+
+        INPUTS:
+            keys - the keys of the groups of the current batch
+
+            cluster_id - the cluster ID of each group (all greater than 0)
+
+            reported_cluster_ids - the cluster IDs that have been reported
+        """
+        key_order = np.argsort(keys, kind="stable")
+        self.keys = keys[key_order]
+        cluster_ids, self.cluster_id = np.unique(
+            np.asarray(cluster_id, dtype=np.int64)[key_order], return_inverse=True
+        )
+        self.cluster_id = self.cluster_id.reshape(-1) + 1
+        self.num_clusters = len(cluster_ids)
+        self.reported_cluster_ids = (
+            np.flatnonzero(np.isin(cluster_ids, reported_cluster_ids)) + 1
+        )
@@ -17,8 +17,14 @@
 # under the License.
 #################################################################################################
 
+import bisect
 import glob
 import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 
 import numpy as np
@@ -29,7 +35,8 @@ import src.helper_funs.datetime_helpers as dth
 import src.helper_funs.gcloud_helpers as ghf
 import src.helper_funs.geo_helpers as geohf
 from config import glmtriggergenconfig as settings
-from src.helper_funs.util_helpers import in_glm_file_latter_half
+from src.helper_funs.glm_decode_helpers import NETCDF_LOCK
+from src.helper_funs.util_helpers import get_cluster_key, in_glm_file_latter_half
 
 
 def write_trigger_data(good_cluster_ids, glmdata, data_dir):
@@ -51,32 +58,29 @@ def write_trigger_data(good_cluster_ids, glmdata, data_dir):
         if cluster_id == glmdata.BAD_CLUSTER_ID:
             continue
 
-        in_cluster_id_bools = glmdata.cluster_id == cluster_id
-        unique_sat_ids = np.unique(glmdata.sat_id[in_cluster_id_bools])
-
-        for sat_id in unique_sat_ids:
+        for _, sat_id, sat_rows in glmdata.get_cluster_sat_rows(cluster_id):
             # Index points with same cluster and satellite
             # Also, only include highest_energy points with good fitness
-            in_cluster_sat_id_bools = (
-                in_cluster_id_bools
-                & (glmdata.sat_id == sat_id)
-                & (glmdata.fitness == 1)
-                & (glmdata.highest_energy == 1)
+            in_cluster_sat_inds = np.sort(
+                sat_rows[
+                    (glmdata.fitness[sat_rows] == 1)
+                    & (glmdata.highest_energy[sat_rows] == 1)
+                ]
             )
-            if np.all(~in_cluster_sat_id_bools):
+            if in_cluster_sat_inds.size == 0:
                 continue
 
             # Subset times and energies belonging to same cluster and sat
-            energy_by_cluster_sats = glmdata.energy_joules[in_cluster_sat_id_bools]
+            energy_by_cluster_sats = glmdata.energy_joules[in_cluster_sat_inds]
             cloud_top_lat_lon_by_cluster_sat_degs = glmdata.cloud_top_lat_lon_deg[
-                in_cluster_sat_id_bools
+                in_cluster_sat_inds
             ]
             lat_by_cluster_sat_degs = cloud_top_lat_lon_by_cluster_sat_degs[:, 0]
             lon_by_cluster_sat_degs = cloud_top_lat_lon_by_cluster_sat_degs[:, 1]
 
             # Identify a basetime
-            basetime = glmdata.time_s[in_cluster_sat_id_bools][
-                np.argmax(glmdata.source_intensity_wpsr[in_cluster_sat_id_bools])
+            basetime = glmdata.time_s[in_cluster_sat_inds][
+                np.argmax(glmdata.source_intensity_wpsr[in_cluster_sat_inds])
             ]
             event_datetime = dth.convert_ssue_to_datetime(
                 basetime + glmdata.basetime_ssue
@@ -91,7 +95,7 @@ def write_trigger_data(good_cluster_ids, glmdata, data_dir):
             )
             filename = (
                 f'{event_datetime.strftime("%Y%m%d%H%M%S")}_'
-                f"{cluster_id}_{sat_id}_energy_lat_lon_array.npy"
+                f"{get_cluster_key(cluster_id, sat_id)}_energy_lat_lon_array.npy"
             )
             np.save(
                 data_dir + filename,
@@ -99,6 +103,34 @@ def write_trigger_data(good_cluster_ids, glmdata, data_dir):
             )
 
 
+def write_event_trigger_array(data_dir, event_file_dates, triggered_events):
+    """write_event_trigger_array(data_dir, event_file_dates, triggered_events)
+
+    Concatenate the processed event times and their number of triggers and
+    save them as event_trigger_array.csv in data_dir
+
+    Args:
+        data_dir (string): The path to the data directory to write to
+        event_file_dates (list): Processed event times as strings
+        triggered_events (list): Number of triggers for each event time
+    """
+    event_trigger_array = np.concatenate(
+        (
+            np.array(event_file_dates).reshape(-1, 1),
+            np.array(triggered_events).reshape(-1, 1).astype("str"),
+        ),
+        axis=1,
+    )
+    np.savetxt(
+        data_dir + "event_trigger_array.csv",
+        event_trigger_array,
+        delimiter=",",
+        header="EventDateTime,Triggers",
+        comments="",
+        fmt="%s",
+    )
+
+
 def load_cal_tables(path_to_cal_tables):
     """load_cal_tables(self, path_to_cal_tables)
 
@@ -120,10 +152,11 @@ def load_cal_tables(path_to_cal_tables):
     file_paths = sorted(file_paths)
     l2_cal_tables_dict = dict.fromkeys(file_paths)
     for cal_tables_file_path in l2_cal_tables_dict:
-        nc_data = Dataset(cal_tables_file_path, "r")
-        pixel_to_lon_array = load_nc_lons(nc_data)
-        pixel_to_lat_array = nc_data.variables["pixel_lat"][:, :]
-        lookup_table = nc_data.variables["LUT"][:, :]
+        with NETCDF_LOCK:
+            nc_data = Dataset(cal_tables_file_path, "r")
+            pixel_to_lon_array = load_nc_lons(nc_data)
+            pixel_to_lat_array = nc_data.variables["pixel_lat"][:, :]
+            lookup_table = nc_data.variables["LUT"][:, :]
         l2_cal_tables_dict[cal_tables_file_path] = [
             pixel_to_lon_array,
             pixel_to_lat_array,
@@ -230,8 +263,9 @@ def download_glm_files(start_time_ssue, end_time_ssue, data_dir, status_helper):
         start_time_ssue, end_time_ssue
     )
 
-    # figure out which files we don't already have and download them
-    local_filenames = []
+    # figure out which files we don't already have
+    files_to_download = []
+    existing_filenames = []
     for file in filenames:
         # get the local name
         file_end_ind = file.rfind("/")
@@ -239,19 +273,140 @@ def download_glm_files(start_time_ssue, end_time_ssue, data_dir, status_helper):
 
         # if it already exists, continue
         if os.path.isfile(data_dir + local_name):
+            existing_filenames.append(data_dir + local_name)
             continue
 
-        # if it doesn't exist, download it and add it to the list
-        success = ghf.save_gcloud_files_to_dir(data_dir, file)
+        files_to_download.append(file)
+
+    # download the missing files concurrently and add them to the list
+    download_results = download_gcloud_files_concurrently(data_dir, files_to_download)
+    local_filenames = []
+    failed_files = []
+    for file, success, download_time_s in download_results:
         if success:
-            status_helper.send_logs([("debug", f"Successfully downloaded file {file}")])
+            status_helper.send_logs(
+                [
+                    (
+                        "debug",
+                        f"Successfully downloaded file {file} in "
+                        f"{download_time_s:.2f} s",
+                    )
+                ]
+            )
+            local_filenames.append(data_dir + file[file.rfind("/") + 1 :])
         else:
-            raise ValueError(f"Failed to download file {file}")
-        local_filenames.append(data_dir + local_name)
+            failed_files.append(file)
+
+    # Make sure all of the window's files can be found by the file index
+    get_glm_file_index(data_dir).add(existing_filenames + local_filenames)
+
+    if download_results:
+        status_helper.send_status(
+            [
+                (
+                    "Download Time (Slowest)",
+                    f"{max(result[2] for result in download_results):.2f} s",
+                )
+            ]
+        )
+    if failed_files:
+        raise ValueError(f"Failed to download file {failed_files[0]}")
 
     return [local_filenames, got_all]
 
 
+def download_gcloud_files_concurrently(
+    data_dir,
+    gcloud_filenames,
+    max_workers=settings.DOWNLOAD_MAX_WORKERS,
+    max_workers_per_sat=settings.DOWNLOAD_MAX_WORKERS_PER_SAT,
+):
+    """download_results = download_gcloud_files_concurrently(data_dir,
+                                                             gcloud_filenames,
+                                                             max_workers,
+                                                             max_workers_per_sat)
+
+    Downloads GLM files from Google cloud to data_dir using a bounded pool of
+    threads. The number of simultaneous downloads from any one satellite is
+    also limited so a single slow bucket can't hold up the whole pool. Files
+    are handed to the pool taking turns between the satellites below their
+    limit, so a worker never waits on a satellite's limit while files of
+    other satellites are queued.
+
+    INPUTS:
+        data_dir - directory to store the data in once downloaded (must end
+        in /)
+
+        gcloud_filenames - list of files stored on the Google cloud services to
+        download
+
+        max_workers - max number of files to download at once
+
+        max_workers_per_sat - max number of files to download at once from a
+        single satellite
+
+    OUTPUTS:
+        download_results - list of (gcloud_filename, success, download_time_s)
+        tuples in the same order as gcloud_filenames
+    """
+    if not gcloud_filenames:
+        return []
+
+    # queue of the indices of the files still to download from each satellite
+    sat_queues = OrderedDict()
+    for ind, file in enumerate(gcloud_filenames):
+        sat_queues.setdefault(get_glm_file_meta(file)[2], deque()).append(ind)
+    max_workers_per_sat = max(1, max_workers_per_sat)
+    num_sat_downloads = dict.fromkeys(sat_queues, 0)
+
+    def download_file(file):
+        start_time_s = time.time()
+        success = ghf.save_gcloud_files_to_dir(data_dir, file)
+        return (file, success, time.time() - start_time_s)
+
+    num_workers = max(
+        1,
+        min(
+            max_workers,
+            sum(
+                min(max_workers_per_sat, len(sat_queue))
+                for sat_queue in sat_queues.values()
+            ),
+        ),
+    )
+    download_results = [None] * len(gcloud_filenames)
+    running = {}
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        while sat_queues or running:
+            # Fill the free workers, taking turns between the satellites
+            # below their limit
+            ready_sat_ids = deque(
+                sat_id
+                for sat_id in sat_queues
+                if num_sat_downloads[sat_id] < max_workers_per_sat
+            )
+            while ready_sat_ids and (len(running) < num_workers):
+                sat_id = ready_sat_ids.popleft()
+                ind = sat_queues[sat_id].popleft()
+                num_sat_downloads[sat_id] += 1
+                future = executor.submit(download_file, gcloud_filenames[ind])
+                running[future] = (sat_id, ind)
+                if not sat_queues[sat_id]:
+                    del sat_queues[sat_id]
+                    continue
+                sat_queues.move_to_end(sat_id)
+                if num_sat_downloads[sat_id] < max_workers_per_sat:
+                    ready_sat_ids.append(sat_id)
+
+            done_futures, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done_futures:
+                sat_id, ind = running.pop(future)
+                num_sat_downloads[sat_id] -= 1
+                download_results[ind] = future.result()
+
+    return download_results
+
+
 def cleanup_files(local_filenames, event_dates_deque):
     """local_filenames = cleanup_files(local_filenames, event_dates_deque)
 
@@ -270,30 +425,18 @@ def cleanup_files(local_filenames, event_dates_deque):
         needed files
     """
     # loop through the list of files
+    deleted_files = []
     for ii, file in enumerate(local_filenames):
         # get the file times
         start_ssue, end_ssue, _ = get_glm_file_meta(file)
 
-        keep_file_list = []
-        for event_date in event_dates_deque:
-            # Check if the event date is in the first or second half of a file
-            in_latter_half_of_file = in_glm_file_latter_half(event_date)
-            if in_latter_half_of_file:
-                keep_file = (
-                    start_ssue - (settings.PROCESS_INTERVAL_S / 2) <= event_date
-                ) and (end_ssue > event_date)
-                keep_file_list.append(keep_file)
-            else:
-                keep_file = (start_ssue <= event_date) and (
-                    end_ssue + (settings.PROCESS_INTERVAL_S / 2) > event_date
-                )
-                keep_file_list.append(keep_file)
         # Check if the end of the file comes before the time_to_process_ssue
         # If so, try to remove it
-        if not any(keep_file_list):
+        if not is_file_needed(start_ssue, end_ssue, event_dates_deque):
             try:
                 os.remove(file)
                 local_filenames[ii] = None
+                deleted_files.append(file)
             except PermissionError:
                 # let it pass if it can't delete, it will try again
                 if len(file) > 18:  # grab only the filename and not it's path
@@ -309,6 +452,363 @@ def cleanup_files(local_filenames, event_dates_deque):
                         + " Will retry on next pass.{c.RESET}"
                     )
 
+    # Deleted files are no longer available to process
+    remove_from_glm_file_indexes(deleted_files)
     local_filenames = [file for file in local_filenames if file is not None]
 
     return local_filenames
+
+
+def is_file_needed(start_ssue, end_ssue, event_dates_deque):
+    """is_file_needed(start_ssue, end_ssue, event_dates_deque)
+
+    Check if a GLM file is needed to process any of the event dates. A file is
+    needed if it is within a half of a file's length to an event_date.
+
+    INPUTS:
+        start_ssue - start time of the file in seconds since unix epoch
+
+        end_ssue - end time of the file in seconds since unix epoch
+
+        event_dates_deque - The next times to process (seconds since unix epoch).
+
+    OUTPUTS:
+        file_needed - True if any of the event dates needs the file
+    """
+    for event_date in event_dates_deque:
+        # Check if the event date is in the first or second half of a file
+        in_latter_half_of_file = in_glm_file_latter_half(event_date)
+        if in_latter_half_of_file:
+            keep_file = (
+                start_ssue - (settings.PROCESS_INTERVAL_S / 2) <= event_date
+            ) and (end_ssue > event_date)
+        else:
+            keep_file = (start_ssue <= event_date) and (
+                end_ssue + (settings.PROCESS_INTERVAL_S / 2) > event_date
+            )
+        if keep_file:
+            return True
+
+    return False
+
+
+# Name of the log file the local GLM file index keeps in a data directory
+FILE_INDEX_LOG_NAME = ".glm_file_index.log"
+
+# Local GLM file indexes by absolute data directory (see get_glm_file_index)
+GLM_FILE_INDEXES = {}
+GLM_FILE_INDEXES_LOCK = threading.Lock()
+
+
+class GlmFileIndex:
+    """GlmFileIndex
+
+    A sorted index of the GLM files in a data directory keyed by
+    (start_ssue, end_ssue, sat_id). Files are added as they are downloaded and
+    removed as they are deleted. Window queries are answered with a bisect.
+    The directory is searched again (see sync) when the index is created, and
+    before a query when the directory or the log has changed other than by
+    the index itself (e.g., files written by another process or by hand).
+    Files added to sub directories by hand are only found by rescan.
+
+    Changes are appended to a log file in the data directory, which is
+    replayed to restore the index after a restart. Several processes can share
+    the log, since each change is appended with a single write and the log is
+    always checked against the directory when it is replayed.
+    """
+
+    def __init__(self, data_dir) -> None:
+        """__init__(self, data_dir) -> None
+
+        INPUTS:
+            data_dir - directory holding the GLM files (must end in /)
+        """
+        self.data_dir = data_dir
+        self.log_path = data_dir + FILE_INDEX_LOG_NAME
+        self.lock = threading.RLock()
+
+        # sorted list of (start_ssue, end_ssue, sat_id, file_path)
+        self.entries = []
+        # file_path -> entry
+        self.files = {}
+        # longest time span of any indexed file, which bounds window queries
+        self.max_file_length_s = 0.0
+        # modification time of data_dir and size of the log after the index
+        # last searched or changed them
+        self.dir_mtime_ns = None
+        self.log_size = None
+
+        if os.path.isfile(self.log_path):
+            self.replay_log()
+            self.sync()
+        else:
+            self.rescan()
+
+    def file_paths(self):
+        """file_paths()
+
+        OUTPUTS:
+            file_paths - all indexed files, sorted by start time
+        """
+        with self.lock:
+            return [entry[3] for entry in self.entries]
+
+    def query(self, start_time_ssue, end_time_ssue):
+        """file_paths = query(start_time_ssue, end_time_ssue)
+
+        Find the indexed files overlapping a time window. A file overlaps if
+        start_time_ssue < file end and end_time_ssue >= file start. The data
+        directory is searched again first if it has changed outside of the
+        index. Deleted files are dropped.
+
+        INPUTS:
+            start_time_ssue - start time of the window in seconds since unix
+            epoch
+
+            end_time_ssue - end time of the window in seconds since unix epoch
+
+        OUTPUTS:
+            file_paths - overlapping files sorted by start time
+        """
+        if (self.get_dir_mtime_ns() != self.dir_mtime_ns) or (
+            self.get_log_size() != self.log_size
+        ):
+            self.sync()
+        file_paths = self.find_window(start_time_ssue, end_time_ssue)
+        missing_paths = [path for path in file_paths if not os.path.isfile(path)]
+        if missing_paths:
+            self.remove(missing_paths)
+            file_paths = [path for path in file_paths if path not in missing_paths]
+
+        return file_paths
+
+    def find_window(self, start_time_ssue, end_time_ssue):
+        """file_paths = find_window(start_time_ssue, end_time_ssue)
+
+        Find the indexed files overlapping a time window (see query), without
+        checking the data directory
+
+        OUTPUTS:
+            file_paths - overlapping files sorted by start time
+        """
+        with self.lock:
+            first_ind = bisect.bisect_left(
+                self.entries,
+                start_time_ssue - self.max_file_length_s,
+                key=lambda entry: entry[0],
+            )
+            last_ind = bisect.bisect_right(
+                self.entries, end_time_ssue, key=lambda entry: entry[0]
+            )
+            return [
+                entry[3]
+                for entry in self.entries[first_ind:last_ind]
+                if start_time_ssue < entry[1]
+            ]
+
+    def add(self, file_paths):
+        """add(file_paths)
+
+        Add GLM files to the index (files already indexed are skipped)
+
+        INPUTS:
+            file_paths - list of GLM files (including paths)
+        """
+        log_lines = []
+        with self.lock:
+            for file_path in file_paths:
+                if file_path in self.files:
+                    continue
+                entry = (*get_glm_file_meta(file_path), file_path)
+                self.insert_entry(entry)
+                log_lines.append(
+                    f"+\t{entry[0]}\t{entry[1]}\t{entry[2]}\t{file_path}\n"
+                )
+            self.append_to_log(log_lines)
+
+    def remove(self, file_paths):
+        """remove(file_paths)
+
+        Remove GLM files from the index (files not indexed are skipped)
+
+        INPUTS:
+            file_paths - list of GLM files (including paths)
+        """
+        log_lines = []
+        with self.lock:
+            for file_path in file_paths:
+                entry = self.files.pop(file_path, None)
+                if entry is None:
+                    continue
+                del self.entries[bisect.bisect_left(self.entries, entry)]
+                log_lines.append(f"-\t{file_path}\n")
+            self.append_to_log(log_lines)
+
+    def rescan(self):
+        """rescan()
+
+        Rebuild the index by searching the data directory for GLM files
+        """
+        file_paths = glob.glob(self.data_dir + "**/*.nc", recursive=True)
+        with self.lock:
+            self.entries = []
+            self.files = {}
+            self.max_file_length_s = 0.0
+            for file_path in file_paths:
+                self.insert_entry((*get_glm_file_meta(file_path), file_path))
+            self.write_log()
+
+    def sync(self):
+        """sync()
+
+        Bring the index up to date by searching the data directory, adding
+        the GLM files created and removing those deleted outside of the index
+        """
+        file_paths = set(glob.glob(self.data_dir + "**/*.nc", recursive=True))
+        with self.lock:
+            indexed_paths = set(self.files)
+            self.remove(sorted(indexed_paths - file_paths))
+            self.add(sorted(file_paths - indexed_paths))
+            self.mark_synced()
+
+    def mark_synced(self):
+        """mark_synced()
+
+        Record the modification time of the data directory and the size of
+        the log, after the index has searched or changed them, so that only
+        later changes made outside of the index trigger a sync
+        """
+        with self.lock:
+            self.dir_mtime_ns = self.get_dir_mtime_ns()
+            self.log_size = self.get_log_size()
+
+    def get_dir_mtime_ns(self):
+        """get_dir_mtime_ns()
+
+        OUTPUTS:
+            dir_mtime_ns - modification time of data_dir in nanoseconds, or
+            None if it does not exist
+        """
+        try:
+            return os.stat(self.data_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def get_log_size(self):
+        """get_log_size()
+
+        OUTPUTS:
+            log_size - size of the log file in bytes, or None if it does not
+            exist
+        """
+        try:
+            return os.stat(self.log_path).st_size
+        except OSError:
+            return None
+
+    def insert_entry(self, entry):
+        """insert_entry(entry)
+
+        Insert a (start_ssue, end_ssue, sat_id, file_path) entry in sort order
+        """
+        bisect.insort(self.entries, entry)
+        self.files[entry[3]] = entry
+        self.max_file_length_s = max(self.max_file_length_s, entry[1] - entry[0])
+
+    def replay_log(self):
+        """replay_log()
+
+        Restore the index from its log file. The log is compacted once it
+        holds many more changes than indexed files.
+        """
+        num_lines = 0
+        with open(self.log_path, "r", encoding="utf-8") as log_file:
+            for line in log_file:
+                num_lines += 1
+                fields = line.rstrip("\n").split("\t")
+                if fields[0] == "+" and len(fields) == 5:
+                    entry = (
+                        float(fields[1]),
+                        float(fields[2]),
+                        int(fields[3]),
+                        fields[4],
+                    )
+                    if entry[3] not in self.files:
+                        self.insert_entry(entry)
+                elif fields[0] == "-" and len(fields) == 2:
+                    entry = self.files.pop(fields[1], None)
+                    if entry is not None:
+                        del self.entries[bisect.bisect_left(self.entries, entry)]
+
+        if num_lines > 2 * len(self.entries) + 1000:
+            self.write_log()
+
+    def write_log(self):
+        """write_log()
+
+        Replace the log file with one line per indexed file
+        """
+        temp_path = f"{self.log_path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as log_file:
+                log_file.writelines(
+                    f"+\t{entry[0]}\t{entry[1]}\t{entry[2]}\t{entry[3]}\n"
+                    for entry in self.entries
+                )
+            os.replace(temp_path, self.log_path)
+        except OSError as err:
+            print(f"{c.YELLOW}Could not write the GLM file index: {err}{c.RESET}")
+        self.mark_synced()
+
+    def append_to_log(self, log_lines):
+        """append_to_log(log_lines)
+
+        Append changes to the log file with a single write, so the changes of
+        processes sharing the log are never interleaved
+        """
+        if not log_lines:
+            return
+        try:
+            log_fd = os.open(
+                self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666
+            )
+            try:
+                os.write(log_fd, "".join(log_lines).encode("utf-8"))
+            finally:
+                os.close(log_fd)
+        except OSError as err:
+            print(f"{c.YELLOW}Could not update the GLM file index: {err}{c.RESET}")
+        self.mark_synced()
+
+
+def get_glm_file_index(data_dir):
+    """get_glm_file_index(data_dir)
+
+    Get the shared index of the GLM files in a data directory, creating it
+    the first time the directory is used.
+
+    INPUTS:
+        data_dir - directory holding the GLM files (must end in /)
+
+    OUTPUTS:
+        glm_file_index - the GlmFileIndex of data_dir
+    """
+    with GLM_FILE_INDEXES_LOCK:
+        index_key = os.path.abspath(data_dir)
+        if index_key not in GLM_FILE_INDEXES:
+            GLM_FILE_INDEXES[index_key] = GlmFileIndex(data_dir)
+        return GLM_FILE_INDEXES[index_key]
+
+
+def remove_from_glm_file_indexes(file_paths):
+    """remove_from_glm_file_indexes(file_paths)
+
+    Remove deleted GLM files from every index that holds them
+
+    INPUTS:
+        file_paths - list of deleted GLM files (including paths)
+    """
+    with GLM_FILE_INDEXES_LOCK:
+        glm_file_indexes = list(GLM_FILE_INDEXES.values())
+    for glm_file_index in glm_file_indexes:
+        glm_file_index.remove(file_paths)
@@ -17,16 +17,26 @@
 # under the License.
 #################################################################################################
 
+import bisect
+import json
+import os
 import subprocess
+import threading
+import time
 import warnings
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
 import src.helper_funs.datetime_helpers as dth
 from config import glmtriggergenconfig as settings
+from src.helper_funs.storage_backends import get_storage_backend
 
 # How long (in seconds) we expect GLM netCDF files to be
 GLM_FILE_LENGTH_S = 20
 
+# Backend used for all listing and fetching of gcloud files
+BACKEND = get_storage_backend(settings.STORAGE_BACKEND, settings.LOCAL_STORAGE_ROOT)
+
 
 def construct_file_dir_and_name(sat_id, year, doy, hour, minute=-1, second=-1):
     """construct_file_dir_and_name(sat_id, year, doy, hour, minute=-1, second=-1)
@@ -183,23 +193,275 @@ def get_file_list_from_gcloud(sat_id, year, doy, hour, minute=-1, second=-1):
     """
     path = construct_file_dir_and_name(sat_id, year, doy, hour, minute, second)
 
-    # use gsutil to get the directories available
-    # If a directory is requested that doesn't exist, it will throw an error: subprocess.CalledProcessError
-    output = subprocess.run(
-        [settings.GS_UTIL, "ls", path],
-        check=False,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        universal_newlines=True,
+    # A directory is listed by its contents, a file name by the files starting
+    # with it
+    if path.endswith("*"):
+        files = BACKEND.list_prefix(path[:-1])
+    else:
+        files = BACKEND.list_prefix(path + "/")
+    if not files:
+        warnings.warn(f"GOES {sat_id} did not have gcloud data available for {path}")
+
+    return files
+
+
+def get_hour_start_ssue(year, doy, hour):
+    """get_hour_start_ssue(year, doy, hour)
+
+    Args:
+        year (int): year of the hour
+        doy (int): day of year of the hour
+        hour (int): hour of the day
+
+    Returns:
+        float: start of the hour in seconds since unix epoch
+    """
+    return (
+        datetime(int(year), 1, 1)
+        + timedelta(days=int(doy) - 1, hours=int(hour))
+        - dth.EPOCH
+    ).total_seconds()
+
+
+def get_file_start_ssue(filename):
+    """get_file_start_ssue(filename)
+
+    Parse the start time of a GLM file from its name. Only the whole seconds
+    of the start time are used, matching the wildcards built by
+    construct_file_dir_and_name.
+
+    Args:
+        filename (string): name or gcloud path of a GLM file
+
+    Returns:
+        float: start time of the file in seconds since unix epoch
+    """
+    start_ind = filename.rfind("_s") + 2
+    start_datetime = datetime.strptime(
+        filename[start_ind : start_ind + 13], "%Y%j%H%M%S"
     )
-    if output.stderr:
-        warnings.warn(
-            f"GOES {sat_id} did not have gcloud data available. GS_UTIL ERR: {output.stderr}"
+    return (start_datetime - dth.EPOCH).total_seconds()
+
+
+class GcloudListingCache:
+    """GcloudListingCache class
+
+    A cache of gcloud GLM hour directory listings keyed by
+    (sat_id, year, doy, hour). Each hour directory is listed once and kept as
+    a sorted index of file start times so that window queries are answered
+    with a bisect instead of a new gcloud listing.
+
+    Listings fetched more than settle_time_s after their hour ended are
+    complete and never expire. Other listings (or any empty listing) are
+    refetched once they are older than current_hour_ttl_s, so files uploaded
+    late are still found. Complete listings can optionally be appended to a
+    json lines file so restarts begin warm.
+    """
+
+    def __init__(
+        self, current_hour_ttl_s, settle_time_s, cache_file="", max_hours=1024
+    ):
+        self.current_hour_ttl_s = current_hour_ttl_s
+        self.settle_time_s = settle_time_s
+        self.cache_file = cache_file
+        self.max_hours = max_hours
+
+        # (sat_id, year, doy, hour) -> [fetch_time_ssue, start_times_ssue, files]
+        self.listings = OrderedDict()
+        self.loaded_cache_file = False
+        self.lock = threading.Lock()
+
+    def get_file_list(self, sat_id, year, doy, hour, minute=-1, second=-1):
+        """get_file_list(sat_id, year, doy, hour, minute=-1, second=-1)
+
+        Same inputs and outputs as get_file_list_from_gcloud, but answered from
+        the cached hour listing.
+
+        Args:
+            sat_id (int): id of the satellite to use (either 16 || 17 || 18)
+            year (int): year folder to look in
+            doy (int): day of year folder to look in
+            hour (int): hour folder to look in
+            minute (int, optional): If included, restricts files to a
+            particular minute. Defaults to -1.
+            second (int, optional): If included, must be either 0, 20, or 40
+            and will restrict search to a single file. Defaults to -1.
+
+        Returns:
+            list: A list of files
+        """
+        [start_times_ssue, files] = self.get_hour_listing(sat_id, year, doy, hour)
+
+        # Find the window of start times the gcloud wildcard would match
+        window_start_ssue = get_hour_start_ssue(year, doy, hour)
+        window_length_s = 3600
+        if 0 <= minute < 60:
+            window_start_ssue += 60 * minute
+            window_length_s = 60
+            if second in [0, 20, 40]:
+                window_start_ssue += second
+                window_length_s = 1
+
+        first_ind = bisect.bisect_left(start_times_ssue, window_start_ssue)
+        last_ind = bisect.bisect_left(
+            start_times_ssue, window_start_ssue + window_length_s
         )
+        return files[first_ind:last_ind]
 
-    # split into an actual list removing things that aren't a file
-    files = [ii for ii in output.stdout.split("\n") if ii != ""]
-    return files
+    def get_hour_listing(self, sat_id, year, doy, hour):
+        """[start_times_ssue, files] = get_hour_listing(sat_id, year, doy, hour)
+
+        Get the sorted listing of an hour directory, fetching it from gcloud
+        if it isn't cached or has expired.
+
+        Args:
+            sat_id (int): id of the satellite to use
+            year (int): year folder to look in
+            doy (int): day of year folder to look in
+            hour (int): hour folder to look in
+
+        Returns:
+            list: [start_times_ssue, files]
+                    start_times_ssue (list): sorted file start times in seconds
+                    since unix epoch
+                    files (list): gcloud files in the same order
+        """
+        key = (int(sat_id), int(year), int(doy), int(hour))
+        with self.lock:
+            if not self.loaded_cache_file:
+                self.load()
+            listing = self.listings.get(key)
+            if listing is not None and not self.is_expired(key, listing):
+                self.listings.move_to_end(key)
+                return listing[1:]
+
+        fetch_time_ssue = time.time()
+        files = get_file_list_from_gcloud(sat_id, year, doy, hour)
+        files_by_start = sorted((get_file_start_ssue(file), file) for file in files)
+        listing = [
+            fetch_time_ssue,
+            [start_ssue for start_ssue, _ in files_by_start],
+            [file for _, file in files_by_start],
+        ]
+
+        with self.lock:
+            self.listings[key] = listing
+            self.listings.move_to_end(key)
+            while len(self.listings) > self.max_hours:
+                self.listings.popitem(last=False)
+            if self.is_complete(key, listing):
+                self.save(key, listing)
+
+        return listing[1:]
+
+    def is_complete(self, key, listing):
+        """is_complete(key, listing)
+
+        A listing is complete when it isn't empty and it was fetched at least
+        settle_time_s after its hour ended.
+        """
+        hour_end_ssue = get_hour_start_ssue(*key[1:]) + 3600
+        return bool(listing[2]) and (listing[0] >= hour_end_ssue + self.settle_time_s)
+
+    def is_expired(self, key, listing):
+        """is_expired(key, listing)
+
+        Complete listings never expire, others expire after current_hour_ttl_s.
+        """
+        if self.is_complete(key, listing):
+            return False
+        return time.time() - listing[0] > self.current_hour_ttl_s
+
+    def load(self):
+        """load()
+
+        Load the latest max_hours complete listings persisted in the cache file
+        (if any). A file holding more listings than that is rewritten with only
+        the listings kept.
+        """
+        self.loaded_cache_file = True
+        if not self.cache_file or not os.path.isfile(self.cache_file):
+            return
+
+        num_lines = 0
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as cache_file:
+                for line in cache_file:
+                    num_lines += 1
+                    try:
+                        [key_string, listing] = json.loads(line)
+                        key = tuple(int(val) for val in key_string.split("_"))
+                    except ValueError:
+                        # Skip lines cut short by an interrupted save
+                        continue
+                    self.listings[key] = listing
+                    self.listings.move_to_end(key)
+                    if len(self.listings) > self.max_hours:
+                        self.listings.popitem(last=False)
+        except OSError as err:
+            warnings.warn(f"Could not load gcloud listing cache: {err}")
+            return
+
+        if num_lines > len(self.listings):
+            self.compact()
+
+    def save(self, key, listing):
+        """save(key, listing)
+
+        Append a complete listing to the cache file (if one is set) with a
+        single write, so the listings saved by processes sharing the file are
+        never interleaved.
+        """
+        if not self.cache_file:
+            return
+
+        try:
+            cache_fd = os.open(
+                self.cache_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666
+            )
+            try:
+                os.write(cache_fd, get_listing_line(key, listing).encode("utf-8"))
+            finally:
+                os.close(cache_fd)
+        except OSError as err:
+            warnings.warn(f"Could not save gcloud listing cache: {err}")
+
+    def compact(self):
+        """compact()
+
+        Rewrite the cache file with only the listings currently held.
+        """
+        temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as cache_file:
+                for key, listing in self.listings.items():
+                    cache_file.write(get_listing_line(key, listing))
+            os.replace(temp_file, self.cache_file)
+        except OSError as err:
+            warnings.warn(f"Could not save gcloud listing cache: {err}")
+
+
+def get_listing_line(key, listing):
+    """get_listing_line(key, listing)
+
+    Args:
+        key (tuple): (sat_id, year, doy, hour) of the listing
+        listing (list): [fetch_time_ssue, start_times_ssue, files]
+
+    Returns:
+        string: json line saving the listing in a cache file
+    """
+    return json.dumps(["_".join(str(val) for val in key), listing]) + "\n"
+
+
+# Shared listing cache used by all window queries. Files can still be uploaded
+# while missing data is held for, so only listings fetched after MAX_HOLD_TIME
+# are final.
+LISTING_CACHE = GcloudListingCache(
+    settings.GCLOUD_LISTING_TTL_S,
+    settings.MAX_HOLD_TIME,
+    settings.GCLOUD_LISTING_CACHE_FILE,
+)
 
 
 def get_latest_list_from_gcloud(history):
@@ -360,7 +622,7 @@ def get_list_for_specific_window(start_time_ssue, end_time_ssue):
         for sat_id in sat_ids:
             # pull the data
             try:
-                files = get_file_list_from_gcloud(
+                files = LISTING_CACHE.get_file_list(
                     sat_id, year, doy, hour, minute, second
                 )
                 if len(files) > 1:
@@ -405,16 +667,8 @@ def save_gcloud_files_to_dir(data_path, filenames):
 
     num_failed = 0
     for file in filenames:
-        try:
-            subprocess.run(
-                [settings.GS_UTIL, "cp", file, data_path[:-1]],
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-            )
-        except subprocess.CalledProcessError:
-            print(file + " failed to download!")
+        local_path = data_path + file[file.rfind("/") + 1 :]
+        if not BACKEND.fetch_to_path(file, local_path):
             num_failed += 1
 
     # display the number of failed files
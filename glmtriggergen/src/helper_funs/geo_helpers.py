@@ -173,50 +173,83 @@ def find_pierce_point_at_alt(sat_pos_ecef_m, look_point_ecef_m, desired_alt_m):
     if sat_pos_ecef_m.shape != look_point_ecef_m.shape:
         raise ValueError("sat_pos and lookPoint must have the same length")
 
-    # Get inflated semi-major and semi-minor axes
-    infl_major_axis_m = GRS80_SEMIMAJOR_AXIS_M + desired_alt_m
-    infl_minor_axis_m = GRS80_SEMIMINOR_AXIS_M + desired_alt_m
-    a2overb2 = infl_major_axis_m**2 / infl_minor_axis_m**2
-
-    # create a direction vector
-    dir_vec = look_point_ecef_m - sat_pos_ecef_m
-    dir_vec_norm = dir_vec / (
-        np.tile(np.linalg.norm(dir_vec, axis=1), [3, 1]).transpose()
-    )
+    return find_pierce_points_at_alts(
+        sat_pos_ecef_m, look_point_ecef_m, [desired_alt_m]
+    )[0]
 
-    # calculate pierce point for all vectors
-    a1 = (
-        dir_vec_norm[:, 0] ** 2
-        + dir_vec_norm[:, 1] ** 2
-        + a2overb2 * dir_vec_norm[:, 2] ** 2
-    )
-    a2 = 2 * (
+
+def find_pierce_points_at_alts(
+    sat_pos_ecef_m, look_point_ecef_m, desired_alts_m, out=None, dtype=np.float64
+):
+    """pierce_points_ecef_m = find_pierce_points_at_alts(sat_pos_ecef_m,
+    look_point_ecef_m, desired_alts_m, out=None, dtype=np.float64)
+
+    Find the pierce points of lines-of-sight at several altitudes. The look
+    directions are normalized once, and the terms of the quadratic shared by
+    all altitudes are computed once.
+
+    This uses the GRS80 ellipsoid as the base earth model.
+
+    Args:
+        sat_pos_ecef_m (array): Nx3 vector of satellite positions, or a
+        single (1x3) satellite position for all look points
+        look_point_ecef_m (array): Nx3 vector of the point at which the
+        satellite is looking (could be a unit vector but does not have to be)
+        desired_alts_m (list): altitudes in meters at which to find the
+        pierce points
+        out (list, optional): Preallocated Nx3 arrays (one per altitude) to
+        write the pierce points to. Defaults to new arrays.
+        dtype (numpy dtype, optional): The dtype of new output arrays, e.g.
+        np.float32 to halve their size. The quadratic is always solved in
+        float64, since its terms cancel to far below float32 precision.
+        Defaults to np.float64.
+
+    Returns:
+        list: The ECEF positions (Nx3) where the lines-of-sight pierce each
+        desired altitude above the Earth's surface. If no intersection is
+        made, returns 0's for that point.
+    """
+    sat_pos_ecef_m = np.broadcast_to(sat_pos_ecef_m, look_point_ecef_m.shape)
+    if out is None:
+        out = [np.empty(look_point_ecef_m.shape, dtype) for _ in desired_alts_m]
+
+    # create a normalized direction vector
+    dir_vec_norm = look_point_ecef_m - sat_pos_ecef_m
+    dir_vec_norm /= np.sqrt(
+        dir_vec_norm[:, 0] ** 2 + dir_vec_norm[:, 1] ** 2 + dir_vec_norm[:, 2] ** 2
+    )[:, np.newaxis]
+
+    # the terms of the quadratic which do not depend on the altitude
+    dir_xy2 = dir_vec_norm[:, 0] ** 2 + dir_vec_norm[:, 1] ** 2
+    dir_z2 = dir_vec_norm[:, 2] ** 2
+    sat_dir_xy = (
         sat_pos_ecef_m[:, 0] * dir_vec_norm[:, 0]
         + sat_pos_ecef_m[:, 1] * dir_vec_norm[:, 1]
-        + a2overb2 * sat_pos_ecef_m[:, 2] * dir_vec_norm[:, 2]
-    )
-    a3 = (
-        sat_pos_ecef_m[:, 0] ** 2
-        + sat_pos_ecef_m[:, 1] ** 2
-        + a2overb2 * sat_pos_ecef_m[:, 2] ** 2
-        - infl_major_axis_m**2
     )
-    a4 = a2**2 - 4 * a1 * a3
-    t2 = (-a2 - np.sqrt(a4)) / (2 * a1)
-
-    # find valid pierce points and record the location
-    pierce_point_ecef_m = np.zeros(dir_vec.shape)
-    ind = np.any([a4 >= 0, a1 != 0, t2 > 0], axis=0)
-    if any(ind):
-        pierce_point_ecef_m[ind, :] = np.array(
-            [
-                sat_pos_ecef_m[ind, 0] + t2[ind] * dir_vec_norm[ind, 0],
-                sat_pos_ecef_m[ind, 1] + t2[ind] * dir_vec_norm[ind, 1],
-                sat_pos_ecef_m[ind, 2] + t2[ind] * dir_vec_norm[ind, 2],
-            ]
-        ).transpose()
+    sat_xy2 = sat_pos_ecef_m[:, 0] ** 2 + sat_pos_ecef_m[:, 1] ** 2
+    sat_z2 = sat_pos_ecef_m[:, 2] ** 2
+
+    for desired_alt_m, pierce_point_ecef_m in zip(desired_alts_m, out):
+        # Get inflated semi-major and semi-minor axes
+        infl_major_axis_m = GRS80_SEMIMAJOR_AXIS_M + desired_alt_m
+        infl_minor_axis_m = GRS80_SEMIMINOR_AXIS_M + desired_alt_m
+        a2overb2 = infl_major_axis_m**2 / infl_minor_axis_m**2
+
+        # calculate pierce point for all vectors
+        a1 = dir_xy2 + a2overb2 * dir_z2
+        a2 = 2 * (sat_dir_xy + a2overb2 * sat_pos_ecef_m[:, 2] * dir_vec_norm[:, 2])
+        a3 = sat_xy2 + a2overb2 * sat_z2 - infl_major_axis_m**2
+        a4 = a2**2 - 4 * a1 * a3
+        t2 = (-a2 - np.sqrt(a4)) / (2 * a1)
+
+        # find valid pierce points and record the location
+        pierce_point_ecef_m[:] = 0
+        ind = (a4 >= 0) | (a1 != 0) | (t2 > 0)
+        pierce_point_ecef_m[ind] = (
+            sat_pos_ecef_m[ind] + t2[ind, np.newaxis] * dir_vec_norm[ind]
+        )
 
-    return pierce_point_ecef_m
+    return out
 
 
 def dist3d_segment_to_segment(seg1p0, seg1p1, seg2p0, seg2p1):
@@ -319,6 +352,97 @@ def dist3d_segment_to_segment(seg1p0, seg1p1, seg2p0, seg2p1):
     return [closest_distance_m, seg1p, seg2p]
 
 
+def dist3d_segments_to_segments(seg1p0, seg1p1, seg2p0, seg2p1, out=None):
+    """[closest_distances_m, seg1ps, seg2ps] = dist3d_segments_to_segments(
+    seg1p0, seg1p1, seg2p0, seg2p1, out=None)
+
+    Compute the closest distances between N pairs of finite 3D line
+    segments. This is the array version of dist3d_segment_to_segment, where
+    each branch is evaluated for all pairs and selected with masks. The
+    results match dist3d_segment_to_segment up to floating point rounding.
+
+    Args:
+        seg1p0 (array): start points of the first segments (Nx3)
+        seg1p1 (array): end points of the first segments (Nx3)
+        seg2p0 (array): start points of the second segments (Nx3)
+        seg2p1 (array): end points of the second segments (Nx3)
+        out (tuple, optional): Preallocated (N,), (Nx3), and (Nx3) arrays
+        to write the outputs to. Defaults to new arrays.
+
+    Returns:
+        list: A list including the closest distances in meters (N), along
+        with the points along the two segments where the closest distances
+        occur (Nx3 each).
+    """
+    u = seg1p1 - seg1p0
+    v = seg2p1 - seg2p0
+    w = seg1p0 - seg2p0
+    u0, u1, u2 = u[:, 0], u[:, 1], u[:, 2]
+    v0, v1, v2 = v[:, 0], v[:, 1], v[:, 2]
+    w0, w1, w2 = w[:, 0], w[:, 1], w[:, 2]
+    a = u0**2 + u1**2 + u2**2
+    b = u0 * v0 + u1 * v1 + u2 * v2
+    c = v0**2 + v1**2 + v2**2
+    d = u0 * w0 + u1 * w1 + u2 * w2
+    e = v0 * w0 + v1 * w1 + v2 * w2
+    dd = a * c - b * b  # always >= 0
+
+    # compute the line parameters of the two closest points
+    are_parallel = dd < EPSILON  # the lines are almost parallel
+    s_n = np.where(are_parallel, 0.0, b * e - c * d)
+    s_d = np.where(are_parallel, 1.0, dd)
+    t_n = np.where(are_parallel, e, a * e - b * d)
+    t_d = np.where(are_parallel, c, dd)
+    # sc < 0 => the s=0 edge is visible
+    s_below = ~are_parallel & (s_n < 0.0)
+    # sc > 1  => the s=1 edge is visible
+    s_above = ~are_parallel & ~(s_n < 0.0) & (s_n > s_d)
+    s_n = np.where(s_below, 0.0, np.where(s_above, s_d, s_n))
+    t_n = np.where(s_below, e, np.where(s_above, e + b, t_n))
+    t_d = np.where(s_below | s_above, c, t_d)
+
+    # tc < 0 => the t=0 edge is visible, recompute sc for this edge
+    t_below = t_n < 0.0
+    # tc > 1  => the t=1 edge is visible, recompute sc for this edge
+    t_above = ~t_below & (t_n > t_d)
+    s_n_below = -d
+    s_n_above = -d + b
+    s_n_edge = np.where(t_below, s_n_below, s_n_above)
+    s_edge_below = s_n_edge < 0.0
+    s_edge_above = ~s_edge_below & (s_n_edge > a)
+    s_edge_within = (t_below | t_above) & ~s_edge_below & ~s_edge_above
+    s_n = np.where(
+        t_below | t_above,
+        np.where(s_edge_below, 0.0, np.where(s_edge_above, s_d, s_n_edge)),
+        s_n,
+    )
+    s_d = np.where(s_edge_within, a, s_d)
+    t_n = np.where(t_below, 0.0, np.where(t_above, t_d, t_n))
+
+    # finally do the division to get sc and tc
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sc = np.where(np.abs(s_n) < EPSILON, 0.0, s_n / s_d)
+        tc = np.where(np.abs(t_n) < EPSILON, 0.0, t_n / t_d)
+
+    # get the difference of the two closest points
+    sc = sc[:, np.newaxis]
+    tc = tc[:, np.newaxis]
+    d_p = w + (sc * u) - (tc * v)  # =  S1(sc) - S2(tc)
+
+    # calculate the return parameters
+    if out is None:
+        out = (
+            np.empty(len(d_p)),
+            np.empty(seg1p0.shape),
+            np.empty(seg2p0.shape),
+        )
+    closest_distances_m, seg1ps, seg2ps = out
+    np.sqrt(d_p[:, 0] ** 2 + d_p[:, 1] ** 2 + d_p[:, 2] ** 2, out=closest_distances_m)
+    np.add(seg1p0, sc * u, out=seg1ps)
+    np.add(seg2p0, tc * v, out=seg2ps)
+    return [closest_distances_m, seg1ps, seg2ps]
+
+
 def wrap_longitudes(lon_array, upper_discontinuity):
     """wrap_longitudes(lon_array, upper_discontinuity)
 
@@ -17,6 +17,8 @@
 # under the License.
 #################################################################################################
 
+import time
+
 import numpy as np
 
 import src.glm_data_set as gds
@@ -24,114 +26,348 @@ from config import glmtriggergenconfig as settings
 from src.helper_funs.file_io_helpers import write_trigger_data
 from src.helper_funs.plotting_helpers import plot_clusters
 
+# The inputs of process_glm_files, available to every stage
+PROCESS_ARGUMENTS = (
+    "data_dir",
+    "l2_cal_tables_dict",
+    "rocket_pipeline",
+    "time_to_process_ssue",
+    "status_helper",
+    "db_helper",
+    "do_plots",
+    "debug_mode",
+    "output_trigger_file",
+    "cluster_state",
+)
+
+
+class ProcessStage:
+    """ProcessStage
+
+    A stage of process_glm_files. A stage reads its inputs from, and writes
+    its outputs to, the dictionary holding the state of the batch.
+    """
 
-def process_glm_files(
-    data_dir,
-    l2_cal_tables_dict,
-    rocket_pipeline,
-    time_to_process_ssue,
-    status_helper,
-    db_helper,
-    do_plots=False,
-    debug_mode=False,
-    output_trigger_file=False,
-):
-    """process_glm_files(local_filenames, db_helper)
+    def __init__(self, name, function, inputs, outputs, required) -> None:
+        """ProcessStage.__init__(self, name, function, inputs, outputs, required)
 
-    Process the GLM files that fall within the appropriate window as specified
-    by processing time
+        Args:
+            name (string): The name of the stage in settings.PROCESS_STAGES
+            function (function): Runs the stage on the batch dictionary
+            inputs (tuple): The batch keys the stage reads
+            outputs (tuple): The batch keys the stage writes
+            required (bool): Whether the stage must be in
+            settings.PROCESS_STAGES, or can be disabled
+        """
+        self.name = name
+        self.function = function
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.required = required
 
-    INPUTS:
-        data_dir - path to directory containing the files available to process
-        for the event
 
-        l2_cal_tables_dict - A dictionary where the keys are the file
-        paths to the .nc calibration table files, and the entries are
-        three element lists containing the calibration table arrays.
+# The registered stages of process_glm_files, by name
+PROCESS_STAGE_REGISTRY = {}
 
-        time_to_process_ssue - The time to process (seconds since unix epoch).
 
-        status_helper - a StatusHelper object used to publish logs
+def process_stage(name, inputs=(), outputs=(), required=False):
+    """process_stage(name, inputs=(), outputs=(), required=False)
 
-        db_helper - database helper object used to publish results (see
-        src.database_module for class info)
+    Decorator registering a function as a stage of process_glm_files (see
+    ProcessStage).
 
-        do_plots - If true, plots the resulting good clusters and near misses.
-        Defaults to false.
+    Args:
+        name (string): The name of the stage in settings.PROCESS_STAGES
+        inputs (tuple, optional): The batch keys the stage reads
+        outputs (tuple, optional): The batch keys the stage writes
+        required (bool, optional): Whether the stage cannot be disabled.
+        Defaults to False.
 
-        debug_mode - Turn on additional output for troubleshooting the GLM
-        trigger generator
+    Returns:
+        register (function): Registers and returns the decorated function
+    """
 
-        output_trigger_file - if true, save a .csv file of trigger times and
-            number of triggers to data_dir. Defaults to false.
+    def register(function):
+        PROCESS_STAGE_REGISTRY[name] = ProcessStage(
+            name, function, inputs, outputs, required
+        )
+        return function
 
-    OUTPUTS:
-        num_valid_files - number of files used in the processing of the event
+    return register
 
-        num_good_clusters - number of good clusters found (i.e. events)
-    """
-    # Create a glm data set object to use for processing
-    glmdata = gds.GlmDataSet(status_helper)
 
-    # Load the applicable GLM data into the class
-    num_valid_files = glmdata.load_glm_data_at_time(
-        data_dir,
-        time_to_process_ssue - settings.PROCESS_TIME_SIZE_S / 2,
-        time_to_process_ssue + settings.PROCESS_TIME_SIZE_S / 2,
-    )
-    if num_valid_files == 0:
-        return [0, 0]
+def get_process_stages(stage_names):
+    """get_process_stages(stage_names)
 
-    # Cluster and rank the data
-    glmdata.cluster_glm_data(settings.CLUSTER_DISTANCE_M, settings.CLUSTER_TIME_S)
-    status_helper.send_logs(
-        [("debug", f"{glmdata.count_clusters(update_self=True)} clusters created")]
-    )
+    Look up the stages to run, in order, and check that every required stage
+    is included and that every stage comes after the stages producing its
+    inputs.
+
+    Args:
+        stage_names (list): The names of the stages to run, in order
+
+    Raises:
+        ValueError: If a stage is unknown, repeated, or missing, or if its
+        inputs are not produced before it runs
 
-    # Mark and filter redundant clusters
-    glmdata.mark_redundant_clusters(time_to_process_ssue)
+    Returns:
+        stages (list): The ProcessStage of each name
+    """
+    unknown_names = [name for name in stage_names if name not in PROCESS_STAGE_REGISTRY]
+    if unknown_names:
+        raise ValueError(f"Unknown process stages: {unknown_names}")
+    if len(set(stage_names)) < len(stage_names):
+        raise ValueError(f"Repeated process stages: {stage_names}")
+    missing_names = [
+        name
+        for name, stage in PROCESS_STAGE_REGISTRY.items()
+        if stage.required and name not in stage_names
+    ]
+    if missing_names:
+        raise ValueError(f"Required process stages are missing: {missing_names}")
+
+    stages = [PROCESS_STAGE_REGISTRY[name] for name in stage_names]
+    available_keys = set(PROCESS_ARGUMENTS)
+    for stage in stages:
+        missing_keys = [key for key in stage.inputs if key not in available_keys]
+        if missing_keys:
+            raise ValueError(
+                f"Process stage {stage.name} needs {missing_keys}, which no "
+                "earlier stage produces"
+            )
+        available_keys.update(stage.outputs)
+    return stages
+
+
+def send_filtered_clusters_log(batch, reason):
+    """send_filtered_clusters_log(batch, reason)
+
+    Recount the clusters left after a filter, and log how many were removed.
+
+    Args:
+        batch (dict): The state of the batch
+        reason (string): Why the clusters were filtered
+    """
+    glmdata = batch["glmdata"]
+    num_clusters = glmdata.num_clusters
+    batch["num_candidates"] = glmdata.count_clusters(update_self=True)
     debug_message = (
-        f"{glmdata.num_clusters - glmdata.count_clusters(update_self=True)} "
-        f"redundant clusters filtered ({glmdata.num_clusters} remain)"
+        f"{num_clusters - glmdata.num_clusters} {reason} "
+        f"({glmdata.num_clusters} remain)"
     )
-    status_helper.send_logs([("debug", debug_message)])
+    batch["status_helper"].send_logs([("debug", debug_message)])
+
 
-    # Mark and filter events with long durations
-    glmdata.mark_long_durations(debug_mode=debug_mode)
+def compact_batch(batch, are_ranked):
+    """compact_batch(batch, are_ranked)
+
+    Compact the GlmDataSet of the batch to its candidate clusters once they
+    hold less than settings.COMPACT_LIVE_FRACTION of its groups (see
+    GlmDataSet.compact_to_clusters).
+
+    Args:
+        batch (dict): The state of the batch
+        are_ranked (bool): Whether the candidates are the good cluster IDs
+        of the ranked clusters, rather than all of the live clusters
+    """
+    glmdata = batch["glmdata"]
+    if are_ranked:
+        cluster_ids = batch["good_cluster_ids"]
+        candidate_rows = np.isin(glmdata.cluster_id, cluster_ids)
+    else:
+        cluster_ids = glmdata.get_cluster_segment_index().live_cluster_ids()
+        candidate_rows = glmdata.cluster_id != glmdata.BAD_CLUSTER_ID
+    num_candidate_groups = np.count_nonzero(candidate_rows)
+    if num_candidate_groups >= settings.COMPACT_LIVE_FRACTION * candidate_rows.size:
+        return
+
+    num_groups, num_events = glmdata.compact_to_clusters(cluster_ids)
     debug_message = (
-        f"{glmdata.num_clusters - glmdata.count_clusters(update_self=True)} "
-        f"clusters filtered for duration too long ({glmdata.num_clusters} remain)"
+        f"Compacted to {glmdata.time_s.size} of {num_groups} groups and "
+        f"{glmdata.event_parent_group_id.size} of {num_events} events"
     )
-    status_helper.send_logs([("debug", debug_message)])
+    batch["status_helper"].send_logs([("debug", debug_message)])
 
-    # Mark and filter stereo events with low altitudes
-    glmdata.mark_low_altitude_stereo_events(debug_mode=debug_mode)
-    debug_message = (
-        f"{glmdata.num_clusters - glmdata.count_clusters(update_self=True)} "
-        f"clusters filtered for altitude too low ({glmdata.num_clusters} remain)"
+
+@process_stage(
+    "load",
+    inputs=("data_dir", "time_to_process_ssue", "status_helper"),
+    outputs=("glmdata", "num_valid_files"),
+    required=True,
+)
+def load_stage(batch):
+    """load_stage(batch)
+
+    Load the applicable GLM data into a new GlmDataSet
+    """
+    # Create a glm data set object to use for processing
+    glmdata = gds.GlmDataSet(batch["status_helper"])
+    batch["glmdata"] = glmdata
+
+    # Load the applicable GLM data into the class
+    batch["num_valid_files"] = glmdata.load_glm_data_at_time(
+        batch["data_dir"],
+        batch["time_to_process_ssue"] - settings.PROCESS_TIME_SIZE_S / 2,
+        batch["time_to_process_ssue"] + settings.PROCESS_TIME_SIZE_S / 2,
     )
-    status_helper.send_logs([("debug", debug_message)])
+    if batch["num_valid_files"] == 0:
+        batch["num_candidates"] = 0
 
-    # Mark specific duplicate energy or erratic point sources
-    glmdata.mark_higher_energies()
-    glmdata.mark_bad_points()
 
-    # Omit triggers from GOES-19 anomaly region
-    glmdata.mark_goes19_anomalies()
+@process_stage("shed_load", inputs=("glmdata",))
+def shed_load_stage(batch):
+    """shed_load_stage(batch)
 
-    # Rank the clusters depending on a continuous above min energy metric
+    If the batch is too large to process in time, shed the groups least
+    likely to belong to events
+    """
+    glmdata = batch["glmdata"]
+    if 0 < settings.MAX_GROUPS_PER_BATCH < glmdata.time_s.size:
+        num_groups = glmdata.time_s.size
+        shed_counts = glmdata.shed_load(
+            settings.MAX_GROUPS_PER_BATCH, settings.MIN_ENERGY_LVL_J
+        )
+        warning_message = (
+            f"{num_groups} groups exceeds max number of groups per batch. Shed "
+            + ", ".join(f"{num_shed} for {reason}" for reason, num_shed in shed_counts)
+            + f" ({glmdata.time_s.size} remain)"
+        )
+        batch["status_helper"].send_logs([("warning", warning_message)])
+
+
+@process_stage(
+    "cluster",
+    inputs=("glmdata", "cluster_state"),
+    outputs=("clusters",),
+    required=True,
+)
+def cluster_stage(batch):
+    """cluster_stage(batch)
+
+    Cluster the data
+    """
+    glmdata = batch["glmdata"]
+    glmdata.cluster_glm_data(
+        settings.CLUSTER_DISTANCE_M, settings.CLUSTER_TIME_S, batch["cluster_state"]
+    )
+    batch["num_candidates"] = glmdata.count_clusters(update_self=True)
+    batch["status_helper"].send_logs(
+        [("debug", f"{glmdata.num_clusters} clusters created")]
+    )
+
+
+@process_stage(
+    "mark_redundant_clusters",
+    inputs=("clusters", "time_to_process_ssue", "cluster_state"),
+    required=True,
+)
+def mark_redundant_clusters_stage(batch):
+    """mark_redundant_clusters_stage(batch)
+
+    Mark and filter redundant clusters. When streaming, these are the
+    clusters still open at the end of the batch or already reported.
+    """
+    if batch["cluster_state"] is None:
+        batch["glmdata"].mark_redundant_clusters(batch["time_to_process_ssue"])
+    else:
+        batch["glmdata"].mark_streamed_clusters(
+            batch["cluster_state"], settings.CLUSTER_TIME_S
+        )
+    send_filtered_clusters_log(batch, "redundant clusters filtered")
+
+
+@process_stage("mark_long_durations", inputs=("clusters", "debug_mode"))
+def mark_long_durations_stage(batch):
+    """mark_long_durations_stage(batch)
+
+    Mark and filter events with long durations
+    """
+    batch["glmdata"].mark_long_durations(debug_mode=batch["debug_mode"])
+    send_filtered_clusters_log(batch, "clusters filtered for duration too long")
+
+
+@process_stage("mark_low_altitude_stereo_events", inputs=("clusters", "debug_mode"))
+def mark_low_altitude_stereo_events_stage(batch):
+    """mark_low_altitude_stereo_events_stage(batch)
+
+    Mark and filter stereo events with low altitudes
+    """
+    batch["glmdata"].mark_low_altitude_stereo_events(debug_mode=batch["debug_mode"])
+    send_filtered_clusters_log(batch, "clusters filtered for altitude too low")
+
+
+@process_stage(
+    "mark_higher_energies",
+    inputs=("clusters",),
+    outputs=("highest_energy",),
+    required=True,
+)
+def mark_higher_energies_stage(batch):
+    """mark_higher_energies_stage(batch)
+
+    Mark the highest of the duplicate energies
+    """
+    batch["glmdata"].mark_higher_energies()
+
+
+@process_stage("mark_bad_points", inputs=("highest_energy",), outputs=("fitness",))
+def mark_bad_points_stage(batch):
+    """mark_bad_points_stage(batch)
+
+    Mark erratic point sources
+    """
+    batch["glmdata"].mark_bad_points()
+
+
+@process_stage("mark_goes19_anomalies", inputs=("clusters",))
+def mark_goes19_anomalies_stage(batch):
+    """mark_goes19_anomalies_stage(batch)
+
+    Omit triggers from GOES-19 anomaly region
+    """
+    batch["glmdata"].mark_goes19_anomalies()
+    batch["num_candidates"] = batch["glmdata"].count_clusters()
+
+
+@process_stage(
+    "rank",
+    inputs=("highest_energy",),
+    outputs=("ranks", "good_cluster_ranks", "good_cluster_ids"),
+    required=True,
+)
+def rank_stage(batch):
+    """rank_stage(batch)
+
+    Rank the clusters depending on a continuous above min energy metric, and
+    mark clusters as likely events depending on rank
+    """
+    glmdata = batch["glmdata"]
     glmdata.rank_glm_clusters(settings.MIN_ENERGY_LVL_J)
 
-    # Mark clusters as likely events depending on rank
     good_cluster_ranks = glmdata.ranks[glmdata.ranks[:, 1] >= settings.VALID_RANK]
-    good_cluster_ids = good_cluster_ranks[:, 0]
+    batch["good_cluster_ranks"] = good_cluster_ranks
+    batch["good_cluster_ids"] = good_cluster_ranks[:, 0]
+    batch["num_candidates"] = len(batch["good_cluster_ids"])
     debug_message = (
-        f"{glmdata.num_clusters - len(good_cluster_ids)} clusters filtered "
-        f"by cluster threshold ({len(good_cluster_ids)} remain)"
+        f"{glmdata.num_clusters - batch['num_candidates']} clusters filtered "
+        f"by cluster threshold ({batch['num_candidates']} remain)"
     )
-    status_helper.send_logs([("debug", debug_message)])
+    batch["status_helper"].send_logs([("debug", debug_message)])
 
-    # Remove any weak clusters which have abnormally large group cluster sizes
+
+@process_stage(
+    "omit_large_group_size_clusters",
+    inputs=("good_cluster_ranks", "good_cluster_ids", "data_dir", "debug_mode"),
+    outputs=("good_cluster_ids",),
+)
+def omit_large_group_size_clusters_stage(batch):
+    """omit_large_group_size_clusters_stage(batch)
+
+    Remove any weak clusters which have abnormally large group cluster sizes
+    """
+    good_cluster_ranks = batch["good_cluster_ranks"][
+        np.isin(batch["good_cluster_ranks"][:, 0], batch["good_cluster_ids"])
+    ]
     strong_cluster_ranks = good_cluster_ranks[
         good_cluster_ranks[:, 1] >= settings.STRONG_SIGNAL_RANK_THRESHOLD
     ]
@@ -141,39 +377,84 @@ def process_glm_files(
     weak_good_cluster_ids = weak_cluster_ranks[:, 0]
     num_weak_clusters = len(weak_good_cluster_ids)
     debug_message = (
-        f"{len(good_cluster_ids)} clusters separated into {num_weak_clusters} "
-        f"weak and {len(good_cluster_ids) - num_weak_clusters} strong clusters"
+        f"{len(good_cluster_ranks)} clusters separated into {num_weak_clusters} "
+        f"weak and {len(good_cluster_ranks) - num_weak_clusters} strong clusters"
     )
-    status_helper.send_logs([("debug", debug_message)])
+    batch["status_helper"].send_logs([("debug", debug_message)])
     if num_weak_clusters:
-        weak_good_cluster_ids = glmdata.omit_large_group_size_clusters(
-            weak_good_cluster_ids, data_dir, debug_mode
+        weak_good_cluster_ids = batch["glmdata"].omit_large_group_size_clusters(
+            weak_good_cluster_ids, batch["data_dir"], batch["debug_mode"]
         )
 
-    good_cluster_ids = np.concatenate(
+    batch["good_cluster_ids"] = np.concatenate(
         (strong_cluster_ranks[:, 0], weak_good_cluster_ids)
     )
+    batch["num_candidates"] = len(batch["good_cluster_ids"])
+
 
-    # Remove any clusters which look too much like historic false-positives
-    good_cluster_ids = glmdata.rocket_filter(good_cluster_ids, rocket_pipeline)
+@process_stage(
+    "rocket_filter",
+    inputs=("good_cluster_ids", "rocket_pipeline"),
+    outputs=("good_cluster_ids", "rocket_probs"),
+)
+def rocket_filter_stage(batch):
+    """rocket_filter_stage(batch)
+
+    Remove any clusters which look too much like historic false-positives
+    """
+    batch["good_cluster_ids"] = batch["glmdata"].rocket_filter(
+        batch["good_cluster_ids"], batch["rocket_pipeline"]
+    )
+    batch["num_candidates"] = len(batch["good_cluster_ids"])
 
-    # Limit the number of triggers to less than MAX_NUM_TRIGGERS
-    if len(good_cluster_ids) >= settings.MAX_NUM_TRIGGERS:
+
+@process_stage(
+    "limit_triggers",
+    inputs=("good_cluster_ids",),
+    outputs=("good_cluster_ids",),
+    required=True,
+)
+def limit_triggers_stage(batch):
+    """limit_triggers_stage(batch)
+
+    Limit the number of triggers to less than MAX_NUM_TRIGGERS
+    """
+    if len(batch["good_cluster_ids"]) >= settings.MAX_NUM_TRIGGERS:
         debug_message = (
-            f"{len(good_cluster_ids)} clusters exceeds max number of "
+            f"{len(batch['good_cluster_ids'])} clusters exceeds max number of "
             f"triggering clusters. Omitted all (0 remain)"
         )
-        status_helper.send_logs([("debug", debug_message)])
-        good_cluster_ranks = np.ndarray(shape=(0, 2))
-        good_cluster_ids = good_cluster_ranks[:, 0]
+        batch["status_helper"].send_logs([("debug", debug_message)])
+        batch["good_cluster_ids"] = np.array([])
+        batch["num_candidates"] = 0
+
+
+@process_stage(
+    "estimate_velocities",
+    inputs=("good_cluster_ids", "data_dir", "debug_mode", "do_plots"),
+    outputs=("velocities",),
+)
+def estimate_velocities_stage(batch):
+    """estimate_velocities_stage(batch)
 
-    # For stereo events, estimate a velocity vector
-    glmdata.estimate_velocities(
-        good_cluster_ids, data_dir, debug_mode, save_pairs_plots=do_plots
+    For stereo events, estimate a velocity vector
+    """
+    batch["glmdata"].estimate_velocities(
+        batch["good_cluster_ids"],
+        batch["data_dir"],
+        batch["debug_mode"],
+        save_pairs_plots=batch["do_plots"],
     )
 
-    # Before computing source intensities, prune the event level data to
-    # only those events which belong to groups in the triggering clusters
+
+@process_stage("prune_event_data", inputs=("good_cluster_ids",))
+def prune_event_data_stage(batch):
+    """prune_event_data_stage(batch)
+
+    Before computing source intensities, prune the event level data to
+    only those events which belong to groups in the triggering clusters
+    """
+    glmdata = batch["glmdata"]
     (
         glmdata.event_time,
         glmdata.event_lat,
@@ -181,38 +462,206 @@ def process_glm_files(
         glmdata.event_energy,
         glmdata.event_intensity_wsr,
         glmdata.event_parent_group_id,
-    ) = glmdata.prune_event_data_by_group_id(good_cluster_ids)
+    ) = glmdata.prune_event_data_by_group_id(batch["good_cluster_ids"])
+
+
+@process_stage(
+    "compute_source_intensities",
+    inputs=("good_cluster_ids", "l2_cal_tables_dict", "debug_mode"),
+    outputs=("source_intensities",),
+    required=True,
+)
+def compute_source_intensities_stage(batch):
+    """compute_source_intensities_stage(batch)
 
-    # Compute self.source_intensity_wpsr (W/sr) from the event energies
-    glmdata.compute_source_intensities(
-        l2_cal_tables_dict,
-        good_cluster_ids,
-        debug_mode,
+    Compute self.source_intensity_wpsr (W/sr) from the event energies
+    """
+    batch["glmdata"].compute_source_intensities(
+        batch["l2_cal_tables_dict"],
+        batch["good_cluster_ids"],
+        batch["debug_mode"],
     )
 
-    # Write trigger data to files
-    if output_trigger_file:
-        write_trigger_data(good_cluster_ids, glmdata, data_dir)
 
-    # Make plots if requested.
-    if do_plots:
+@process_stage(
+    "write_trigger_data",
+    inputs=(
+        "good_cluster_ids",
+        "source_intensities",
+        "data_dir",
+        "output_trigger_file",
+    ),
+)
+def write_trigger_data_stage(batch):
+    """write_trigger_data_stage(batch)
+
+    Write trigger data to files
+    """
+    if batch["output_trigger_file"]:
+        write_trigger_data(
+            batch["good_cluster_ids"], batch["glmdata"], batch["data_dir"]
+        )
+
+
+@process_stage(
+    "plot_clusters",
+    inputs=(
+        "ranks",
+        "good_cluster_ids",
+        "source_intensities",
+        "rocket_probs",
+        "data_dir",
+        "debug_mode",
+        "do_plots",
+    ),
+)
+def plot_clusters_stage(batch):
+    """plot_clusters_stage(batch)
+
+    Make plots if requested
+    """
+    if batch["do_plots"]:
+        glmdata = batch["glmdata"]
         good_cluster_id_ranks = glmdata.ranks[
-            np.in1d(glmdata.ranks[:, 0], good_cluster_ids)
+            np.in1d(glmdata.ranks[:, 0], batch["good_cluster_ids"])
         ]
 
         plot_clusters(
             glmdata,
             good_cluster_id_ranks,
-            data_dir,
-            debug_mode,
+            batch["data_dir"],
+            batch["debug_mode"],
             use_intensities=True,
         )
 
-    # Save results to database and publish
+
+@process_stage(
+    "publish",
+    inputs=("good_cluster_ids", "source_intensities", "db_helper"),
+    required=True,
+)
+def publish_stage(batch):
+    """publish_stage(batch)
+
+    Save results to database and publish
+    """
+    db_helper = batch["db_helper"]
+    good_cluster_ids = batch["good_cluster_ids"]
     if (db_helper is not None) and (len(good_cluster_ids) > 0):
-        event_ids = db_helper.record_event(glmdata, good_cluster_ids)
-        glmdata.publish_cluster_over_zmq(
+        event_ids = db_helper.record_event(batch["glmdata"], good_cluster_ids)
+        batch["glmdata"].publish_cluster_over_zmq(
             db_helper.socket, settings.TRIGGER_TOPIC, good_cluster_ids, event_ids
         )
 
-    return [num_valid_files, len(good_cluster_ids)]
+
+def process_glm_files(
+    data_dir,
+    l2_cal_tables_dict,
+    rocket_pipeline,
+    time_to_process_ssue,
+    status_helper,
+    db_helper,
+    do_plots=False,
+    debug_mode=False,
+    output_trigger_file=False,
+    cluster_state=None,
+):
+    """process_glm_files(local_filenames, db_helper)
+
+    Process the GLM files that fall within the appropriate window as specified
+    by processing time
+
+    INPUTS:
+        data_dir - path to directory containing the files available to process
+        for the event
+
+        l2_cal_tables_dict - A dictionary where the keys are the file
+        paths to the .nc calibration table files, and the entries are
+        three element lists containing the calibration table arrays.
+
+        time_to_process_ssue - The time to process (seconds since unix epoch).
+
+        status_helper - a StatusHelper object used to publish logs
+
+        db_helper - database helper object used to publish results (see
+        src.database_module for class info)
+
+        do_plots - If true, plots the resulting good clusters and near misses.
+        Defaults to false.
+
+        debug_mode - Turn on additional output for troubleshooting the GLM
+        trigger generator
+
+        output_trigger_file - if true, save a .csv file of trigger times and
+            number of triggers to data_dir. Defaults to false.
+
+        cluster_state - a StreamingClusterState carrying the clusters from the
+            previous batch, used to cluster consecutive batches incrementally
+            (see settings.STREAMING_CLUSTERING). Defaults to None, i.e. each
+            batch is clustered from scratch.
+
+    The batch runs through the stages in settings.PROCESS_STAGES (see
+    PROCESS_STAGE_REGISTRY), and stops as soon as no candidate clusters remain.
+    Once the candidate clusters hold a small part of the data, the data is
+    compacted to them (see settings.COMPACT_LIVE_FRACTION).
+
+    OUTPUTS:
+        num_valid_files - number of files used in the processing of the event
+
+        num_good_clusters - number of good clusters found (i.e. events)
+    """
+    stages = get_process_stages(settings.PROCESS_STAGES)
+    batch = {
+        "data_dir": data_dir,
+        "l2_cal_tables_dict": l2_cal_tables_dict,
+        "rocket_pipeline": rocket_pipeline,
+        "time_to_process_ssue": time_to_process_ssue,
+        "status_helper": status_helper,
+        "db_helper": db_helper,
+        "do_plots": do_plots,
+        "debug_mode": debug_mode,
+        "output_trigger_file": output_trigger_file,
+        "cluster_state": cluster_state,
+        "num_valid_files": 0,
+        "good_cluster_ids": np.array([]),
+    }
+
+    # Run the stages in order, timing each one
+    stage_times_s = []
+    produced_keys = set()
+    checked_candidates = None
+    for stage_ind, stage in enumerate(stages):
+        start_time_s = time.perf_counter()
+        stage.function(batch)
+        produced_keys.update(stage.outputs)
+
+        # When the candidate clusters change, compact the data to them if they
+        # only hold a small fraction of it
+        candidates = (batch.get("num_candidates"), "good_cluster_ids" in produced_keys)
+        if (
+            settings.COMPACT_LIVE_FRACTION > 0
+            and "clusters" in produced_keys
+            and candidates[0]
+            and candidates != checked_candidates
+        ):
+            compact_batch(batch, candidates[1])
+            checked_candidates = candidates
+        stage_times_s.append((stage.name, time.perf_counter() - start_time_s))
+
+        # Skip the remaining stages once there is nothing left to trigger on
+        if batch.get("num_candidates", 1) == 0:
+            num_skipped_stages = len(stages) - stage_ind - 1
+            if num_skipped_stages:
+                debug_message = (
+                    f"No candidate clusters remain after {stage.name}, skipped "
+                    f"{num_skipped_stages} stages"
+                )
+                status_helper.send_logs([("debug", debug_message)])
+            break
+
+    debug_message = "Stage times (s): " + ", ".join(
+        f"{name} {stage_time_s:.3f}" for name, stage_time_s in stage_times_s
+    )
+    status_helper.send_logs([("debug", debug_message)])
+
+    return [batch["num_valid_files"], len(batch["good_cluster_ids"])]
@@ -0,0 +1,387 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+"""This file provides decoding of GLM netCDF files into blocks of per-file
+arrays, and an in-memory cache of the decoded blocks. Consecutive batches
+share files, so each file only has to be read and renavigated once. The files
+of a batch that are not cached are decoded in parallel.
+"""
+
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+from netCDF4 import Dataset
+
+import src.helper_funs.datetime_helpers as dth
+import src.helper_funs.geo_helpers as ghf
+from config import glmtriggergenconfig as settings
+
+# Time offsets in the L2 data changed from milliseconds to seconds on Dec 4th, 2018
+MILLISECOND_TIME_OFFSETS_END = datetime(2018, 12, 4, 0, 0, 0)
+
+# Executor used to decode files in parallel, created on first use. Files are
+# decoded serially unless set_decode_workers is called (see DECODE_WORKERS).
+DECODE_EXECUTOR_STATE = {
+    "executor": None,
+    "num_workers": 1,
+    "lock": threading.Lock(),
+}
+
+# The netCDF4 and HDF5 libraries cannot open files from several threads at
+# once, so files are only opened while holding this lock
+NETCDF_LOCK = threading.Lock()
+
+
+def extract_event_energy(nc_obj):
+    """event_energies = extract_event_energy(nc_obj)
+
+    Ground processing results in L2 netCDF files where the
+    event_energy variable has a fill value of -1 for missing data.
+    However, since the _Unsigned flag is set to true for this
+    otherwise (signed) int16 variable, the fill value is converted
+    into 65535 (2 ** 16 - 1) when netCDF4 loads the .nc files into
+    memory.
+
+    While not all reasons are currently (March 2023) known for what
+    causes missing events (pixel energies) in the L2 data,
+    converting the missing values into maximum recordable event
+    energies (in Joules) gets us closest to the event energies
+    present in the L0 data.
+
+    The maximum recordable event energy is estimated by multiplying
+    the event_energy scale_factor to the maximum recordable event
+    integer and then adding the event_energy add_offset.
+
+    Args:
+        nc_obj (Dataset): A Dataset object created by the netCDF4
+        python library for a given .nc file.
+
+    Returns:
+        event_energies (numpy array): An array of event energies.
+    """
+
+    # Extract the event_energy variable from the netCDF object
+    nc_event_energy_obj = nc_obj.variables["event_energy"]
+    event_energies = np.array(nc_event_energy_obj[:])
+    event_energies_mask = nc_event_energy_obj[:].mask
+
+    # If at least one value is missing in the event_energies,
+    # replace all of the original FillValues in the event_energies
+    # with a new FillValue
+    if not isinstance(event_energies_mask, np.bool_):
+        # Store the scale_factor and add_offset for the event_energy variable
+        event_energy_scale_factor = nc_event_energy_obj.scale_factor
+        event_energy_add_offset = nc_event_energy_obj.add_offset
+
+        # Determine if the event_energy variable is stored as an unsigned value
+        event_energy_is_unsigned = nc_event_energy_obj._Unsigned.lower()[0] == "t"
+
+        # Determine if the data type of the event_energy variable is a numpy signed int
+        event_energy_base_type_is_signed_int = nc_event_energy_obj.dtype.kind == "i"
+
+        # Extract the maximum possible value for the event_energy dtype
+        event_energy_type_max_value = np.iinfo(nc_event_energy_obj.dtype).max
+
+        # If the event_energy base type is a signed int and the
+        # event_energy _Unsigned flag is true, double the base type
+        # max possible value and add one
+        if event_energy_base_type_is_signed_int and event_energy_is_unsigned:
+            event_energy_type_max_value = 2 * event_energy_type_max_value + 1
+
+        # Create a new fill value by multiplying the event_energy
+        # scale_factor to the maximum recordable event integer and
+        # then adding the event_energy add_offset
+        new_event_energy_fill_value = (
+            event_energy_type_max_value * event_energy_scale_factor
+            + event_energy_add_offset
+        )
+
+        event_energies[event_energies_mask] = new_event_energy_fill_value
+
+    return event_energies
+
+
+def decode_glm_file(file_path, cloud_top_alts_m, pierce_alts_m):
+    """block = decode_glm_file(file_path, cloud_top_alts_m, pierce_alts_m)
+
+    Read a GLM file and renavigate its groups. Times are kept relative to the
+    basetime of the file itself, so the block does not depend on the other
+    files in a batch.
+
+    INPUTS:
+        file_path - GLM file to decode (path and filename)
+
+        cloud_top_alts_m - (equator, pole) heights in meters of the cloud top
+        layer used by the L2 GLM data processing
+
+        pierce_alts_m - (high, low) altitudes in meters at which to find the
+        pierce points of each group's line-of-sight
+
+    OUTPUTS:
+        block - dictionary of the decoded file data. The scalars basetime,
+        sat_pos_ecef_m and yaw_flip_flag apply to every group in the file.
+    """
+    with NETCDF_LOCK, Dataset(file_path, "r") as nc_data:
+        # grab the basetime
+        basetime = datetime(2000, 1, 1, 12, 0, 0) + timedelta(
+            seconds=float(nc_data.variables["product_time"][:])
+        )
+        if basetime < MILLISECOND_TIME_OFFSETS_END:
+            time_offset_scale = 0.001
+        else:
+            time_offset_scale = 1.0
+
+        # grab satellite position
+        sat_pos = ghf.adjusted_lat_lon_to_ecef(
+            np.array(
+                [
+                    nc_data.variables["nominal_satellite_subpoint_lat"][:],
+                    nc_data.variables["nominal_satellite_subpoint_lon"][:],
+                    nc_data.variables["nominal_satellite_height"][:].data * 1e3,
+                ]
+            )
+        )
+
+        # the event (or GLM pixel) time, location, energy, and parent group ID
+        block = {
+            "basetime": basetime,
+            "event_time_s": np.ma.getdata(
+                time_offset_scale
+                * np.float64(nc_data.variables["event_time_offset"][:])
+            ),
+            "event_lat": np.ma.getdata(nc_data.variables["event_lat"][:]),
+            "event_lon": np.ma.getdata(nc_data.variables["event_lon"][:]),
+            "event_energy": extract_event_energy(nc_data),
+            "event_parent_group_id": np.ma.getdata(
+                nc_data.variables["event_parent_group_id"][:]
+            ),
+        }
+
+        # the group information
+        block["time_s"] = np.atleast_1d(
+            np.ma.getdata(
+                time_offset_scale
+                * np.float64(nc_data.variables["group_time_offset"][:])
+            )
+        )
+        block["cloud_top_lat_lon_deg"] = np.vstack(
+            (
+                np.ma.getdata(nc_data.variables["group_lat"][:]),
+                np.ma.getdata(nc_data.variables["group_lon"][:]),
+            )
+        ).transpose()
+        block["energy_joules"] = np.ma.getdata(nc_data.variables["group_energy"][:])
+        block["quality_flag"] = np.ma.getdata(
+            nc_data.variables["group_quality_flag"][:]
+        )
+        block["group_id"] = np.ma.getdata(nc_data.variables["group_id"][:])
+        block["yaw_flip_flag"] = np.ma.getdata(
+            nc_data.variables["yaw_flip_flag"][:]
+        ).tolist()
+        block["sat_pos_ecef_m"] = sat_pos
+
+    # find where each group's line-of-sight pierces the high and low altitudes
+    ecef_pos = ghf.adjusted_lat_lon_to_ecef(
+        block["cloud_top_lat_lon_deg"], cloud_top_alts_m[0], cloud_top_alts_m[1]
+    )
+    block["high_pos_ecef_m"], block["low_pos_ecef_m"] = ghf.find_pierce_points_at_alts(
+        sat_pos, ecef_pos, pierce_alts_m
+    )
+
+    return block
+
+
+def get_decode_executor():
+    """executor = get_decode_executor()
+
+    OUTPUTS:
+        executor - the executor used to decode files in parallel, or None if
+        files are decoded serially
+    """
+    with DECODE_EXECUTOR_STATE["lock"]:
+        if DECODE_EXECUTOR_STATE["num_workers"] <= 1:
+            return None
+        if DECODE_EXECUTOR_STATE["executor"] is None:
+            # Spawn the workers since the parent process runs threads
+            DECODE_EXECUTOR_STATE["executor"] = ProcessPoolExecutor(
+                max_workers=DECODE_EXECUTOR_STATE["num_workers"],
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return DECODE_EXECUTOR_STATE["executor"]
+
+
+def set_decode_workers(num_workers):
+    """set_decode_workers(num_workers)
+
+    Change the number of worker processes used to decode files in parallel.
+    Any running executor is shut down. The workers are spawned, so scripts
+    using more than one must only run from a __main__ guard.
+
+    INPUTS:
+        num_workers - number of decode workers (1 decodes serially)
+    """
+    with DECODE_EXECUTOR_STATE["lock"]:
+        if DECODE_EXECUTOR_STATE["executor"] is not None:
+            DECODE_EXECUTOR_STATE["executor"].shutdown()
+            DECODE_EXECUTOR_STATE["executor"] = None
+        DECODE_EXECUTOR_STATE["num_workers"] = num_workers
+
+
+def get_block_basetime_ssue(block):
+    """basetime_ssue = get_block_basetime_ssue(block)
+
+    OUTPUTS:
+        basetime_ssue - basetime of a decoded file in seconds since unix epoch
+    """
+    return (block["basetime"] - dth.EPOCH).total_seconds()
+
+
+def get_block_nbytes(block):
+    """nbytes = get_block_nbytes(block)
+
+    OUTPUTS:
+        nbytes - bytes held by the arrays of a decoded file
+    """
+    return sum(
+        value.nbytes for value in block.values() if isinstance(value, np.ndarray)
+    )
+
+
+class DecodedFileCache:
+    """DecodedFileCache
+
+    A least recently used cache of decoded GLM files held in memory, limited
+    to max_bytes of arrays. Blocks are keyed by the file path, and are decoded
+    again if the file on disk has changed. The cached blocks must not be
+    modified by callers.
+    """
+
+    def __init__(self, max_bytes) -> None:
+        """__init__(self, max_bytes) -> None
+
+        INPUTS:
+            max_bytes - max bytes of decoded arrays to hold (0 turns off the
+            cache)
+        """
+        self.max_bytes = max_bytes
+        # file_path -> (file_key, block, nbytes) in least to most recently
+        # used order
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, file_path, cloud_top_alts_m, pierce_alts_m):
+        """block = get(file_path, cloud_top_alts_m, pierce_alts_m)
+
+        Get the decoded data for a GLM file, decoding it if it is not cached.
+        See decode_glm_file for the inputs and outputs.
+        """
+        return self.get_many([file_path], cloud_top_alts_m, pierce_alts_m)[0]
+
+    def get_many(self, file_paths, cloud_top_alts_m, pierce_alts_m):
+        """blocks = get_many(file_paths, cloud_top_alts_m, pierce_alts_m)
+
+        Get the decoded data for several GLM files. The files that are not
+        cached are decoded in parallel when more than one decode worker is
+        configured. See decode_glm_file for the inputs.
+
+        OUTPUTS:
+            blocks - decoded data for each file, in the order of file_paths
+        """
+        file_keys = []
+        for file_path in file_paths:
+            file_stat = os.stat(file_path)
+            file_keys.append(
+                (
+                    file_stat.st_mtime_ns,
+                    file_stat.st_size,
+                    tuple(cloud_top_alts_m),
+                    tuple(pierce_alts_m),
+                )
+            )
+
+        blocks = [None] * len(file_paths)
+        with self.lock:
+            for ind, file_path in enumerate(file_paths):
+                entry = self.entries.get(file_path)
+                if entry is not None and entry[0] == file_keys[ind]:
+                    self.entries.move_to_end(file_path)
+                    blocks[ind] = entry[1]
+        missing_inds = [ind for ind, block in enumerate(blocks) if block is None]
+
+        executor = get_decode_executor()
+        if executor is not None and len(missing_inds) > 1:
+            futures = [
+                executor.submit(
+                    decode_glm_file, file_paths[ind], cloud_top_alts_m, pierce_alts_m
+                )
+                for ind in missing_inds
+            ]
+            for ind, future in zip(missing_inds, futures):
+                blocks[ind] = future.result()
+        else:
+            for ind in missing_inds:
+                blocks[ind] = decode_glm_file(
+                    file_paths[ind], cloud_top_alts_m, pierce_alts_m
+                )
+
+        for ind in missing_inds:
+            self.put(file_paths[ind], file_keys[ind], blocks[ind])
+        return blocks
+
+    def put(self, file_path, file_key, block):
+        """put(file_path, file_key, block)
+
+        Add a decoded file to the cache, evicting the least recently used files
+        beyond max_bytes. Blocks larger than max_bytes are not cached.
+        """
+        nbytes = get_block_nbytes(block)
+        with self.lock:
+            self.discard(file_path)
+            if nbytes > self.max_bytes:
+                return
+            self.entries[file_path] = (file_key, block, nbytes)
+            self.total_bytes += nbytes
+            while self.total_bytes > self.max_bytes:
+                self.discard(next(iter(self.entries)))
+
+    def discard(self, file_path):
+        """discard(file_path)
+
+        Remove a file from the cache if it is held (the lock must be held)
+        """
+        entry = self.entries.pop(file_path, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def clear(self):
+        """clear()
+
+        Remove all files from the cache
+        """
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+
+DECODED_FILE_CACHE = DecodedFileCache(settings.DECODED_FILE_CACHE_MAX_BYTES)
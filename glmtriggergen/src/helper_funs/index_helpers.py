@@ -0,0 +1,290 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+"""This file provides indexes over the GLM data set arrays, which replace full
+array scans when looking up the rows that belong to a group or cluster.
+"""
+
+import numpy as np
+
+
+class GroupEventIndex:
+    """GroupEventIndex
+
+    A compressed (CSR style) index from group IDs to the events (pixels)
+    whose parent group ID matches. The events are stably sorted by their
+    parent group ID once, after which the events of any group are a slice of
+    the sorted order. Within a group, the events keep their original order.
+    """
+
+    def __init__(self, event_parent_group_id) -> None:
+        """__init__(self, event_parent_group_id) -> None
+
+        INPUTS:
+            event_parent_group_id - the parent group ID of each event
+        """
+        # The array the index was built from, used to tell if it is stale
+        self.event_parent_group_id = event_parent_group_id
+        self.event_order = np.argsort(event_parent_group_id, kind="stable")
+        self.group_ids, self.group_starts, group_counts = np.unique(
+            event_parent_group_id[self.event_order],
+            return_index=True,
+            return_counts=True,
+        )
+        self.group_ends = self.group_starts + group_counts
+
+    def is_built_from(self, event_parent_group_id):
+        """is_built_from(event_parent_group_id)
+
+        OUTPUTS:
+            True if the index was built from this event_parent_group_id array
+        """
+        return self.event_parent_group_id is event_parent_group_id
+
+    def event_indices(self, group_id):
+        """event_inds = event_indices(group_id)
+
+        INPUTS:
+            group_id - the group ID to look up
+
+        OUTPUTS:
+            event_inds - sorted indices of the events belonging to the group
+        """
+        group_ind = np.searchsorted(self.group_ids, group_id)
+        if group_ind == len(self.group_ids) or self.group_ids[group_ind] != group_id:
+            return np.array([], dtype=self.event_order.dtype)
+        return self.event_order[
+            self.group_starts[group_ind] : self.group_ends[group_ind]
+        ]
+
+    def event_counts(self, group_ids):
+        """counts = event_counts(group_ids)
+
+        INPUTS:
+            group_ids - array of group IDs to look up
+
+        OUTPUTS:
+            counts - the number of events belonging to each group
+        """
+        group_ids = np.asarray(group_ids)
+        group_inds = np.searchsorted(self.group_ids, group_ids)
+        in_range_bools = group_inds < len(self.group_ids)
+        found_bools = in_range_bools.copy()
+        found_bools[in_range_bools] = (
+            self.group_ids[group_inds[in_range_bools]] == group_ids[in_range_bools]
+        )
+        counts = np.zeros(group_ids.shape, dtype=np.int64)
+        counts[found_bools] = (
+            self.group_ends[group_inds[found_bools]]
+            - self.group_starts[group_inds[found_bools]]
+        )
+        return counts
+
+
+class ClusterSegmentIndex:
+    """ClusterSegmentIndex
+
+    An index of the group level rows sorted by (cluster_id, sat_id, time_s).
+    The rows of each (cluster, satellite) pair form a contiguous segment of
+    the sorted order, in time order (ties keep their original order), and the
+    segments of each cluster are contiguous and sorted by satellite.
+
+    Segments are marked dead when their rows are marked as the bad cluster,
+    so the index stays in sync without being rebuilt (see mark_rows_bad).
+    """
+
+    def __init__(self, cluster_id, sat_id, time_s, bad_cluster_id) -> None:
+        """__init__(self, cluster_id, sat_id, time_s, bad_cluster_id) -> None
+
+        INPUTS:
+            cluster_id - the cluster ID of each row
+
+            sat_id - the satellite ID of each row
+
+            time_s - the time of each row
+
+            bad_cluster_id - the cluster ID of rows that are not in a cluster
+        """
+        # The array the index was built from, used to tell if it is stale
+        self.cluster_id = cluster_id
+        self.row_order = np.lexsort((time_s, sat_id, cluster_id))
+        sorted_cluster_ids = cluster_id[self.row_order]
+        sorted_sat_ids = sat_id[self.row_order]
+
+        # Split the sorted rows into (cluster, satellite) segments
+        num_rows = len(self.row_order)
+        is_segment_start = np.ones(num_rows, dtype=bool)
+        is_segment_start[1:] = (sorted_cluster_ids[1:] != sorted_cluster_ids[:-1]) | (
+            sorted_sat_ids[1:] != sorted_sat_ids[:-1]
+        )
+        self.segment_starts = np.flatnonzero(is_segment_start)
+        self.segment_ends = np.append(self.segment_starts[1:], num_rows)
+        self.segment_cluster_ids = sorted_cluster_ids[self.segment_starts]
+        self.segment_sat_ids = sorted_sat_ids[self.segment_starts]
+        self.segment_is_live = self.segment_cluster_ids != bad_cluster_id
+        self.row_segments = np.empty(num_rows, dtype=np.intp)
+        self.row_segments[self.row_order] = np.cumsum(is_segment_start) - 1
+
+        # The segments of each cluster
+        self.cluster_ids, self.cluster_segment_starts = np.unique(
+            self.segment_cluster_ids, return_index=True
+        )
+        self.cluster_segment_ends = np.append(
+            self.cluster_segment_starts[1:], len(self.segment_starts)
+        )
+
+    def is_built_from(self, cluster_id):
+        """is_built_from(cluster_id)
+
+        OUTPUTS:
+            True if the index was built from this cluster_id array
+        """
+        return self.cluster_id is cluster_id
+
+    def live_segments(self, cluster_id=None):
+        """segment_inds = live_segments(cluster_id=None)
+
+        INPUTS:
+            cluster_id - only return the segments of this cluster. Defaults to
+            the segments of all clusters.
+
+        OUTPUTS:
+            segment_inds - the live segments, sorted by cluster and satellite
+        """
+        if cluster_id is None:
+            return np.flatnonzero(self.segment_is_live)
+        cluster_ind = np.searchsorted(self.cluster_ids, cluster_id)
+        if (
+            cluster_ind == len(self.cluster_ids)
+            or self.cluster_ids[cluster_ind] != cluster_id
+        ):
+            return np.array([], dtype=np.intp)
+        segment_inds = np.arange(
+            self.cluster_segment_starts[cluster_ind],
+            self.cluster_segment_ends[cluster_ind],
+        )
+        return segment_inds[self.segment_is_live[segment_inds]]
+
+    def segment_rows(self, segment_ind):
+        """rows = segment_rows(segment_ind)
+
+        OUTPUTS:
+            rows - the rows of a segment in time order
+        """
+        return self.row_order[
+            self.segment_starts[segment_ind] : self.segment_ends[segment_ind]
+        ]
+
+    def live_segment_series(self, row_bools):
+        """rows, segment_inds, segment_counts = live_segment_series(row_bools)
+
+        INPUTS:
+            row_bools - booleans which are True for the rows to include
+
+        OUTPUTS:
+            rows - the included rows of all live segments, one segment after
+            another, with the rows of each segment in time order
+
+            segment_inds - the segments with included rows, in the order of
+            rows
+
+            segment_counts - the number of included rows of each segment
+        """
+        rows = self.row_order[
+            self.segment_is_live[self.row_segments[self.row_order]]
+            & row_bools[self.row_order]
+        ]
+        segment_inds, segment_counts = np.unique(
+            self.row_segments[rows], return_counts=True
+        )
+        return rows, segment_inds, segment_counts
+
+    def live_cluster_ids(self):
+        """cluster_ids = live_cluster_ids()
+
+        OUTPUTS:
+            cluster_ids - sorted IDs of the clusters with live segments
+        """
+        return np.unique(self.segment_cluster_ids[self.segment_is_live])
+
+    def live_cluster_time_ranges(self, time_s):
+        """cluster_ids, start_times, end_times = live_cluster_time_ranges(time_s)
+
+        INPUTS:
+            time_s - the time of each row (as used to build the index)
+
+        OUTPUTS:
+            cluster_ids - sorted IDs of the clusters with live segments
+
+            start_times, end_times - the first and last time of the live
+            segments of each cluster
+        """
+        segment_inds = self.live_segments()
+        cluster_ids, cluster_starts = np.unique(
+            self.segment_cluster_ids[segment_inds], return_index=True
+        )
+        if len(cluster_ids) == 0:
+            return cluster_ids, time_s[:0], time_s[:0]
+
+        # The segments are in time order, so their first and last rows hold
+        # their first and last times
+        segment_start_times = time_s[self.row_order[self.segment_starts[segment_inds]]]
+        segment_end_times = time_s[self.row_order[self.segment_ends[segment_inds] - 1]]
+        return (
+            cluster_ids,
+            np.minimum.reduceat(segment_start_times, cluster_starts),
+            np.maximum.reduceat(segment_end_times, cluster_starts),
+        )
+
+    def has_bad_rows(self):
+        """has_bad_rows()
+
+        OUTPUTS:
+            True if any rows belong to the bad cluster
+        """
+        return not np.all(self.segment_is_live)
+
+    def mark_rows_bad(self, rows):
+        """index_in_sync = mark_rows_bad(rows)
+
+        Mark the segments of rows that have been marked as the bad cluster as
+        dead. Only whole segments can be marked.
+
+        INPUTS:
+            rows - indices (or boolean mask) of the rows marked as the bad
+            cluster
+
+        OUTPUTS:
+            index_in_sync - False if rows only covered part of a segment, in
+            which case the index must be rebuilt
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        if len(rows) == 0:
+            return True
+        segment_inds, segment_row_counts = np.unique(
+            self.row_segments[rows], return_counts=True
+        )
+        if np.any(
+            segment_row_counts
+            != self.segment_ends[segment_inds] - self.segment_starts[segment_inds]
+        ):
+            return False
+        self.segment_is_live[segment_inds] = False
+        return True
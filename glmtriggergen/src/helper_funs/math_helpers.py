@@ -19,6 +19,14 @@
 
 import numpy as np
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional, segmented filters fall back to NumPy
+    njit = None
+
+# The min running average of point differences used by energy_filter
+ENERGY_FILTER_MIN_DIFF = 1e-15
+
 
 def comb(n, k):
     """comb(n, k)
@@ -130,7 +138,10 @@ def energy_filter(energy_array, first_pnt, last_pnt, filter_width, max_valid_dro
             last_checked = point_ind
             # average last few points (also ensure a minimum check of 1e-15)
             last_diff = max(
-                [((filter_width - 1) * last_diff + delta_energy) / filter_width, 1e-15]
+                [
+                    ((filter_width - 1) * last_diff + delta_energy) / filter_width,
+                    ENERGY_FILTER_MIN_DIFF,
+                ]
             )
 
     return fitness  # end of energy_filter
@@ -171,3 +182,318 @@ def continuous_above_min(energy_array, energy_threshold, max_mistakes):
             cur_num = 0
 
     return max_num
+
+
+def segment_continuous_above_min(
+    energy_array, segment_starts, energy_threshold, max_mistakes
+):
+    """max_nums = segment_continuous_above_min(energy_array, segment_starts,
+    energy_threshold, max_mistakes)
+
+    Compute continuous_above_min for each contiguous segment of energy_array
+    at once. In continuous_above_min the mistake count only goes back to 0
+    when the continuous set restarts, so the set restarts at every
+    (max_mistakes + 2)th point below the threshold of a segment.
+
+    INPUTS:
+        energy_array - numpy array containing the vectors to evaluate, one
+        after another (each is assumed to be temporally sorted)
+
+        segment_starts - the sorted indices of energy_array where each
+        (nonempty) segment starts
+
+        energy_threshold - the energy threshold level
+
+        max_mistakes - the number of points that can drop below the threshold
+        before the current continuous set is marked as done
+
+    OUTPUTS:
+        max_nums - the number of points in the largest continuous set found
+        in each segment
+    """
+    is_segment_start = np.zeros(len(energy_array), dtype=bool)
+    is_segment_start[segment_starts] = True
+    segment_inds = np.cumsum(is_segment_start) - 1
+
+    # Number the points below the threshold within each segment
+    are_above = energy_array > energy_threshold
+    below_counts = np.cumsum(~are_above)
+    below_nums = (
+        below_counts - (below_counts - ~are_above)[segment_starts][segment_inds]
+    )
+    are_restarts = ~are_above & (below_nums % (max_mistakes + 2) == 0)
+
+    # Count the points above the threshold in each continuous set, and take
+    # the largest set of each segment
+    set_starts = np.flatnonzero(is_segment_start | are_restarts)
+    set_counts = np.add.reduceat(are_above.astype(np.intp), set_starts)
+    return np.maximum.reduceat(set_counts, np.searchsorted(set_starts, segment_starts))
+
+
+def segment_low_medians(value_array, segment_starts, fraction):
+    """medians = segment_low_medians(value_array, segment_starts, fraction)
+
+    Compute the median of the lowest ceil(fraction * n) values of each
+    contiguous segment of value_array, where n is the length of the segment
+
+    INPUTS:
+        value_array - numpy array containing the segments, one after another
+
+        segment_starts - the sorted indices of value_array where each
+        (nonempty) segment starts
+
+        fraction - the fraction of the values of each segment to use
+
+    OUTPUTS:
+        medians - the median of the low values of each segment
+    """
+    segment_counts = np.diff(np.append(segment_starts, len(value_array)))
+    segment_inds = np.repeat(np.arange(len(segment_starts)), segment_counts)
+    sorted_values = value_array[np.lexsort((value_array, segment_inds))]
+
+    # The middle value, or the mean of the two middle values, of the lowest
+    # values of each segment
+    low_counts = np.ceil(segment_counts * fraction).astype(np.intp)
+    upper_middles = sorted_values[segment_starts + low_counts // 2]
+    lower_middles = sorted_values[segment_starts + (low_counts - 1) // 2]
+    return np.where(
+        low_counts % 2 == 1, upper_middles, (lower_middles + upper_middles) / 2
+    )
+
+
+def segment_percentiles(value_array, segment_starts, percent):
+    """percentiles = segment_percentiles(value_array, segment_starts, percent)
+
+    Compute the percentile of each contiguous segment of value_array, matching
+    np.percentile with its default linear interpolation
+
+    INPUTS:
+        value_array - numpy array containing the segments, one after another
+
+        segment_starts - the sorted indices of value_array where each
+        (nonempty) segment starts
+
+        percent - the percentile to compute, between 0 and 100
+
+    OUTPUTS:
+        percentiles - the percentile of each segment
+    """
+    segment_counts = np.diff(np.append(segment_starts, len(value_array)))
+    segment_inds = np.repeat(np.arange(len(segment_starts)), segment_counts)
+    sorted_values = value_array[np.lexsort((value_array, segment_inds))]
+
+    # The fractional index of the percentile in each sorted segment, and the
+    # values on either side of it, computed in the precision of the values
+    if value_array.dtype.kind == "f":
+        quantile = np.true_divide(percent, value_array.dtype.type(100))
+    else:
+        quantile = np.true_divide(percent, 100)
+    virtual_inds = (segment_counts - 1).astype(quantile.dtype) * quantile
+    lower_inds = np.floor(virtual_inds)
+    weights = virtual_inds - lower_inds
+    lower_inds = lower_inds.astype(np.intp)
+    upper_inds = np.minimum(lower_inds + 1, segment_counts - 1)
+    lower_values = sorted_values[segment_starts + lower_inds]
+    upper_values = sorted_values[segment_starts + upper_inds]
+
+    # Interpolate from the nearer side, as np.percentile does
+    value_diffs = upper_values - lower_values
+    return np.where(
+        weights >= 0.5,
+        upper_values - value_diffs * (1 - weights),
+        lower_values + value_diffs * weights,
+    )
+
+
+def energy_filter_segments_loop(
+    energy_array, segment_starts, segment_ends, filter_width, max_valid_drop, fitness
+):
+    """energy_filter_segments_loop(energy_array, segment_starts, segment_ends,
+    filter_width, max_valid_drop, fitness)
+
+    Run energy_filter forward over each segment of energy_array, writing 0 to
+    fitness for the invalid points. This loop is JIT compiled when numba is
+    available (see segment_energy_filter).
+
+    energy_filter mixes numpy scalars of the energy dtype with Python floats,
+    so the running average is kept as a float64 and rounded to the energy
+    dtype wherever energy_filter combines it with an energy. This gives the
+    same fitness for float32 energies.
+
+    INPUTS:
+        energy_array - numpy array containing the segments, one after another
+
+        segment_starts, segment_ends - the start and end (exclusive) of each
+        segment
+
+        filter_width, max_valid_drop - see energy_filter
+
+        fitness - numpy array the same size as energy_array, set to 1 for
+        every point of the segments
+    """
+    # scalars of the energy dtype
+    dtype_scalars = np.empty(3, energy_array.dtype)
+    dtype_scalars[0] = filter_width
+    dtype_scalars[1] = ENERGY_FILTER_MIN_DIFF
+    dtype_filter_width = dtype_scalars[0]
+    dtype_min_diff = dtype_scalars[1]
+
+    for segment_ind in range(len(segment_starts)):
+        first_pnt = segment_starts[segment_ind]
+        end_pnt = segment_ends[segment_ind]
+        if end_pnt - first_pnt < 2:
+            continue
+
+        # get an initial estimate of energy difference
+        window_end = min(end_pnt, first_pnt + filter_width)
+        last_diff = float(
+            energy_array[first_pnt:window_end].max()
+            - energy_array[first_pnt:window_end].min()
+        )
+
+        # loop through the data looking for anomalous differences
+        last_checked = first_pnt
+        for point_ind in range(first_pnt + 1, end_pnt):
+            delta_energy = energy_array[point_ind] - energy_array[last_checked]
+            dtype_scalars[2] = max_valid_drop * last_diff
+            if delta_energy < 0 and -delta_energy > dtype_scalars[2]:
+                fitness[point_ind] = 0
+                # if we haven't found a valid pnt for an entire filter_width,
+                # start over
+                if point_ind - last_checked > filter_width:
+                    last_diff *= 2
+            else:
+                last_checked = point_ind
+                dtype_scalars[2] = (filter_width - 1) * last_diff
+                new_diff = (dtype_scalars[2] + abs(delta_energy)) / dtype_filter_width
+                if dtype_min_diff > new_diff:
+                    last_diff = ENERGY_FILTER_MIN_DIFF
+                else:
+                    last_diff = float(new_diff)
+
+
+if njit is not None:
+    energy_filter_segments_jit = njit(energy_filter_segments_loop)
+else:
+    energy_filter_segments_jit = None
+
+
+def energy_filter_segments_numpy(
+    energy_array, segment_starts, segment_ends, filter_width, max_valid_drop, fitness
+):
+    """energy_filter_segments_numpy(energy_array, segment_starts, segment_ends,
+    filter_width, max_valid_drop, fitness)
+
+    The NumPy version of energy_filter_segments_loop, which steps through all
+    of the segments at once, one point at a time. See
+    energy_filter_segments_loop for the inputs.
+    """
+    dtype = energy_array.dtype.type
+    segment_counts = segment_ends - segment_starts
+    segment_inds = np.flatnonzero(segment_counts >= 2)
+    first_pnts = segment_starts[segment_inds]
+    segment_counts = segment_counts[segment_inds]
+
+    # get an initial estimate of energy difference
+    window_counts = np.minimum(segment_counts, filter_width)
+    window_inds = np.repeat(first_pnts, window_counts) + (
+        np.arange(np.sum(window_counts))
+        - np.repeat(np.cumsum(window_counts) - window_counts, window_counts)
+    )
+    window_starts = np.cumsum(window_counts) - window_counts
+    window_energies = energy_array[window_inds]
+    last_diffs = (
+        np.maximum.reduceat(window_energies, window_starts)
+        - np.minimum.reduceat(window_energies, window_starts)
+    ).astype(np.float64)
+
+    # loop through the data looking for anomalous differences
+    last_checked = first_pnts.copy()
+    for point_offset in range(1, np.max(segment_counts, initial=0)):
+        active = np.flatnonzero(segment_counts > point_offset)
+        point_inds = first_pnts[active] + point_offset
+        cur_last_checked = last_checked[active]
+        cur_last_diffs = last_diffs[active]
+        delta_energies = energy_array[point_inds] - energy_array[cur_last_checked]
+        are_bad = (delta_energies < 0) & (
+            -delta_energies > (max_valid_drop * cur_last_diffs).astype(dtype)
+        )
+
+        # flag the bad points, restarting if we haven't found a valid pnt for
+        # an entire filter_width
+        fitness[point_inds[are_bad]] = 0
+        are_restarts = are_bad & (point_inds - cur_last_checked > filter_width)
+        cur_last_diffs[are_restarts] *= 2
+
+        # average the last few points of the good points
+        are_good = ~are_bad
+        new_diffs = (
+            ((filter_width - 1) * cur_last_diffs[are_good]).astype(dtype)
+            + np.abs(delta_energies[are_good])
+        ) / dtype(filter_width)
+        cur_last_diffs[are_good] = np.where(
+            dtype(ENERGY_FILTER_MIN_DIFF) > new_diffs,
+            ENERGY_FILTER_MIN_DIFF,
+            new_diffs,
+        )
+        cur_last_checked[are_good] = point_inds[are_good]
+        last_diffs[active] = cur_last_diffs
+        last_checked[active] = cur_last_checked
+
+
+def segment_energy_filter(
+    energy_array, segment_starts, filter_width, max_valid_drop=5, backward=False
+):
+    """fitness = segment_energy_filter(energy_array, segment_starts,
+    filter_width, max_valid_drop=5, backward=False)
+
+    Run energy_filter over each contiguous segment of energy_array at once,
+    with a JIT compiled loop when numba is available and NumPy otherwise.
+
+    INPUTS:
+        energy_array - numpy array containing the segments, one after another
+
+        segment_starts - the sorted indices of energy_array where each
+        (nonempty) segment starts
+
+        filter_width, max_valid_drop - see energy_filter
+
+        backward - if true, go through each segment from its last point to
+        its first
+
+    OUTPUTS:
+        fitness - numpy array the same size as energy_array with 1 for valid
+        points and 0 for invalid points
+    """
+    segment_starts = np.asarray(segment_starts, dtype=np.int64)
+    segment_ends = np.append(segment_starts[1:], len(energy_array)).astype(np.int64)
+    if backward:
+        # Going backward through a segment is going forward through it reversed
+        segment_counts = segment_ends - segment_starts
+        point_inds = np.repeat(
+            segment_starts + segment_ends - 1, segment_counts
+        ) - np.arange(len(energy_array))
+        return segment_energy_filter(
+            energy_array[point_inds], segment_starts, filter_width, max_valid_drop
+        )[point_inds]
+
+    fitness = np.ones(energy_array.shape)
+    if energy_filter_segments_jit is not None:
+        energy_filter_segments_jit(
+            energy_array,
+            segment_starts,
+            segment_ends,
+            filter_width,
+            max_valid_drop,
+            fitness,
+        )
+    else:
+        energy_filter_segments_numpy(
+            energy_array,
+            segment_starts,
+            segment_ends,
+            filter_width,
+            max_valid_drop,
+            fitness,
+        )
+    return fitness
@@ -0,0 +1,194 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+"""This file provides a size limited on-disk cache of the GLM netCDF files in
+the data directory.
+"""
+import json
+import os
+import time
+import warnings
+from collections import OrderedDict
+
+import src.colors as c
+from src.helper_funs.file_io_helpers import (
+    get_glm_file_index,
+    get_glm_file_meta,
+    is_file_needed,
+    remove_from_glm_file_indexes,
+)
+
+# Name of the manifest file kept in the data directory
+MANIFEST_FILE_NAME = ".netcdf_cache_manifest.json"
+
+
+class NetcdfFileCache:
+    """NetcdfFileCache
+
+    Keeps the GLM netCDF files in data_dir within a byte budget. Files are
+    evicted least recently used first, except for files still needed by an
+    event waiting to be processed. A manifest of the cached files (their size,
+    time span, and last use) is kept in data_dir so a restart doesn't need to
+    search the data directory.
+    """
+
+    def __init__(self, data_dir, max_bytes) -> None:
+        """__init__(self, data_dir, max_bytes) -> None
+
+        INPUTS:
+            data_dir - directory holding the GLM files (must end in /)
+
+            max_bytes - max number of bytes of GLM files to keep
+        """
+        self.data_dir = data_dir
+        self.max_bytes = max_bytes
+        self.manifest_path = data_dir + MANIFEST_FILE_NAME
+
+        # file path -> {"size", "start_ssue", "end_ssue", "last_used_ssue"}
+        self.entries = OrderedDict()
+        if os.path.isfile(self.manifest_path):
+            self.load_manifest()
+        else:
+            # Only the first run needs to look for files already on disk
+            self.add(get_glm_file_index(data_dir).file_paths())
+
+    def total_bytes(self):
+        """total_bytes()
+
+        OUTPUTS:
+            total_bytes - number of bytes of all cached files
+        """
+        return sum(entry["size"] for entry in self.entries.values())
+
+    def add(self, file_paths):
+        """add(file_paths)
+
+        Add files to the cache (or mark them as used if already cached)
+
+        INPUTS:
+            file_paths - list of GLM files (including paths)
+        """
+        now_ssue = time.time()
+        for file_path in file_paths:
+            if file_path in self.entries:
+                self.entries[file_path]["last_used_ssue"] = now_ssue
+                self.entries.move_to_end(file_path)
+                continue
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                continue
+            start_ssue, end_ssue, _ = get_glm_file_meta(file_path)
+            self.entries[file_path] = {
+                "size": size,
+                "start_ssue": start_ssue,
+                "end_ssue": end_ssue,
+                "last_used_ssue": now_ssue,
+            }
+
+    def touch_window(self, start_time_ssue, end_time_ssue):
+        """touch_window(start_time_ssue, end_time_ssue)
+
+        Mark the cached files overlapping a time window as just used
+
+        INPUTS:
+            start_time_ssue - start time of the window in seconds since unix
+            epoch
+
+            end_time_ssue - end time of the window in seconds since unix epoch
+        """
+        self.add(
+            [
+                file_path
+                for file_path, entry in self.entries.items()
+                if (entry["start_ssue"] < end_time_ssue)
+                and (entry["end_ssue"] > start_time_ssue)
+            ]
+        )
+
+    def evict(self, event_dates_deque):
+        """deleted_files = evict(event_dates_deque)
+
+        Delete the least recently used files until the cache is within its
+        byte budget. Files needed by any of the event dates are never deleted.
+
+        INPUTS:
+            event_dates_deque - The next times to process (seconds since unix
+            epoch).
+
+        OUTPUTS:
+            deleted_files - list of the deleted files (including paths)
+        """
+        deleted_files = []
+        total_bytes = self.total_bytes()
+        for file_path, entry in list(self.entries.items()):
+            if total_bytes <= self.max_bytes:
+                break
+            if is_file_needed(
+                entry["start_ssue"], entry["end_ssue"], event_dates_deque
+            ):
+                continue
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            except PermissionError:
+                # let it pass if it can't delete, it will try again
+                print(
+                    f"{c.YELLOW}Failed to delete {file_path}. "
+                    f"Will retry on next pass.{c.RESET}"
+                )
+                continue
+            total_bytes -= entry["size"]
+            del self.entries[file_path]
+            deleted_files.append(file_path)
+
+        remove_from_glm_file_indexes(deleted_files)
+        self.save_manifest()
+        return deleted_files
+
+    def load_manifest(self):
+        """load_manifest()
+
+        Load the cached files from the manifest. Files deleted outside of the
+        cache are dropped when they are evicted.
+        """
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError) as err:
+            warnings.warn(f"Could not load netCDF cache manifest: {err}")
+            return
+
+        for file_path, entry in sorted(
+            manifest.items(), key=lambda item: item[1]["last_used_ssue"]
+        ):
+            self.entries[file_path] = entry
+
+    def save_manifest(self):
+        """save_manifest()
+
+        Write the cached files to the manifest
+        """
+        temp_path = self.manifest_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as manifest_file:
+                json.dump(self.entries, manifest_file)
+            os.replace(temp_path, self.manifest_path)
+        except OSError as err:
+            warnings.warn(f"Could not save netCDF cache manifest: {err}")
@@ -22,6 +22,7 @@ import pandas as pd
 from matplotlib import pyplot as plt
 
 import src.helper_funs.datetime_helpers as dth
+from src.helper_funs.util_helpers import get_cluster_key
 
 
 def plot_clusters(
@@ -67,35 +68,43 @@ def plot_clusters(
     for [cur_cluster_id, cur_rank] in good_cluster_id_ranks:
         fig = plt.figure()
 
-        # Order data by time
-        time_ind = np.argsort(glmdata.time_s)
+        # The data of each satellite in the cluster, ordered by time
+        cluster_sat_rows = {
+            sat_id: rows
+            for _, sat_id, rows in glmdata.get_cluster_sat_rows(cur_cluster_id)
+        }
+        fit_energy_rows = {
+            sat_id: rows[
+                (glmdata.fitness[rows] == 1) & (glmdata.highest_energy[rows] == 1)
+            ]
+            for sat_id, rows in cluster_sat_rows.items()
+        }
 
         # Identify a basetime
-        cluster_fit_energy_bools = (
-            (glmdata.cluster_id[time_ind] == cur_cluster_id)
-            & (glmdata.fitness[time_ind] == 1)
-            & (glmdata.highest_energy[time_ind] == 1)
+        cluster_fit_energy_rows = np.concatenate(
+            [np.array([], dtype=np.intp)] + list(fit_energy_rows.values())
         )
+        cluster_fit_energy_rows = cluster_fit_energy_rows[
+            np.argsort(glmdata.time_s[cluster_fit_energy_rows], kind="stable")
+        ]
         if use_intensities:
-            basetime = glmdata.time_s[time_ind][cluster_fit_energy_bools][
-                np.argmax(
-                    glmdata.source_intensity_wpsr[time_ind][cluster_fit_energy_bools]
-                )
+            basetime = glmdata.time_s[cluster_fit_energy_rows][
+                np.argmax(glmdata.source_intensity_wpsr[cluster_fit_energy_rows])
             ]
         else:
-            basetime = glmdata.time_s[time_ind][cluster_fit_energy_bools][
-                np.argmax(glmdata.energy_joules[time_ind][cluster_fit_energy_bools])
+            basetime = glmdata.time_s[cluster_fit_energy_rows][
+                np.argmax(glmdata.energy_joules[cluster_fit_energy_rows])
             ]
 
         # Plot the data from each satellite
         for sat_id_ind, sat_id in enumerate(sat_ids):
-            ind = cluster_fit_energy_bools & (glmdata.sat_id[time_ind] == sat_id)
-            if np.any(ind):
+            ind = fit_energy_rows.get(sat_id, np.array([], dtype=np.intp))
+            if ind.size > 0:
                 if use_intensities:
                     plt.grid(True, which="major", linestyle="--")
                     plt.plot(
-                        glmdata.time_s[time_ind][ind] - basetime,
-                        glmdata.source_intensity_wpsr[time_ind][ind] / 1000,
+                        glmdata.time_s[ind] - basetime,
+                        glmdata.source_intensity_wpsr[ind] / 1000,
                         plt_colors[sat_id_ind],
                         # marker="o",
                         label="GOES " + str(sat_id),
@@ -103,38 +112,33 @@ def plot_clusters(
                 else:
                     plt.grid(True, which="major", linestyle="--")
                     plt.plot(
-                        glmdata.time_s[time_ind][ind] - basetime,
-                        glmdata.energy_joules[time_ind][ind],
+                        glmdata.time_s[ind] - basetime,
+                        glmdata.energy_joules[ind],
                         plt_colors[sat_id_ind],
                         # marker="o",
                         label="GOES " + str(sat_id),
                     )
                 if debug_mode:
-                    bad_ind = (
-                        (glmdata.cluster_id[time_ind] == cur_cluster_id)
-                        & (glmdata.sat_id[time_ind] == sat_id)
-                        & (glmdata.fitness[time_ind] == 0)
-                    )
-                    low_duplicate_energy_ind = (
-                        (glmdata.cluster_id[time_ind] == cur_cluster_id)
-                        & (glmdata.sat_id[time_ind] == sat_id)
-                        & (glmdata.highest_energy[time_ind] == 0)
-                    )
+                    sat_rows = cluster_sat_rows[sat_id]
+                    bad_ind = sat_rows[glmdata.fitness[sat_rows] == 0]
+                    low_duplicate_energy_ind = sat_rows[
+                        glmdata.highest_energy[sat_rows] == 0
+                    ]
                     plt.plot(
-                        glmdata.time_s[time_ind][bad_ind] - basetime,
-                        glmdata.energy_joules[time_ind][bad_ind],
+                        glmdata.time_s[bad_ind] - basetime,
+                        glmdata.energy_joules[bad_ind],
                         "rx",
                         label="Bad Points",
                     )
                     plt.plot(
-                        glmdata.time_s[time_ind][low_duplicate_energy_ind] - basetime,
-                        glmdata.energy_joules[time_ind][low_duplicate_energy_ind],
+                        glmdata.time_s[low_duplicate_energy_ind] - basetime,
+                        glmdata.energy_joules[low_duplicate_energy_ind],
                         "ro",
                         mfc="none",
                         label="Lower Points",
                     )
                 rocket_prob = glmdata.rocket_prob[
-                    str(cur_cluster_id) + "_" + str(sat_id)
+                    get_cluster_key(cur_cluster_id, sat_id)
                 ]
                 plot_label = f"Sat {sat_id} Rocket Prob = {round(rocket_prob, 3)}"
                 plt.plot(
@@ -146,8 +150,8 @@ def plot_clusters(
                 if write_data:
                     combined_array = np.column_stack(
                         (
-                            glmdata.time_s[time_ind][ind] - basetime,
-                            glmdata.source_intensity_wpsr[time_ind][ind] / 1000,
+                            glmdata.time_s[ind] - basetime,
+                            glmdata.source_intensity_wpsr[ind] / 1000,
                         )
                     )
                     event_datetime = dth.convert_ssue_to_datetime(
@@ -0,0 +1,244 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+"""This file provides a helper class for downloading and decoding the GLM files
+of upcoming batches in the background while the current batch is processed.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import glmtriggergenconfig as settings
+from src.glm_data_set import GlmDataSet
+from src.helper_funs.file_io_helpers import download_glm_files, get_glm_file_index
+
+
+class GlmFilePrefetcher:
+    """GlmFilePrefetcher
+
+    Downloads and decodes the GLM files for scheduled event times on a
+    background thread. At most max_windows event times are scheduled or in
+    flight at once. A finished prefetch releases its slot, so guesses that are
+    never collected do not block later prefetches. The files of at most
+    max_windows finished prefetches are held until they are collected, the
+    files of older ones are handed over by the next collect so they can be
+    cleaned up.
+    """
+
+    def __init__(
+        self, data_dir, status_helper, max_windows=settings.PREFETCH_WINDOWS
+    ) -> None:
+        """__init__(self, data_dir, status_helper, max_windows) -> None
+
+        INPUTS:
+            data_dir - directory to store the data in once downloaded
+
+            status_helper - a StatusHelper object for sending status and logs
+
+            max_windows - max number of event times to prefetch at once
+        """
+        self.data_dir = data_dir
+        self.status_helper = status_helper
+        self.max_windows = max_windows
+        # futures of the event times scheduled or in flight, of those
+        # finished but not yet collected, and of those evicted from finished
+        self.pending = OrderedDict()
+        self.finished = OrderedDict()
+        self.evicted = []
+        self.lock = threading.Lock()
+        # used to decode the files the same way as the processing loop
+        self.glmdata = GlmDataSet(status_helper)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def schedule(self, event_ssue):
+        """schedule(event_ssue)
+
+        Start downloading the files for an event time in the background. Does
+        nothing if the event time is already scheduled or prefetched, or the
+        prefetcher is full.
+
+        INPUTS:
+            event_ssue - event time to process (seconds since unix epoch)
+        """
+        with self.lock:
+            if (
+                (event_ssue in self.pending)
+                or (event_ssue in self.finished)
+                or (len(self.pending) >= self.max_windows)
+            ):
+                return
+            future = self.executor.submit(self.prefetch_window, event_ssue)
+            self.pending[event_ssue] = future
+
+        # Outside of the lock, as a finished future runs the callback at once
+        future.add_done_callback(
+            lambda done_future: self.release(event_ssue, done_future)
+        )
+
+    def release(self, event_ssue, future):
+        """release(event_ssue, future)
+
+        Free the slot of a finished prefetch, keeping its future until the
+        event time is collected. The oldest finished prefetches are evicted
+        beyond max_windows.
+
+        INPUTS:
+            event_ssue - event time of the prefetch (seconds since unix epoch)
+
+            future - the finished future of the prefetch
+        """
+        with self.lock:
+            if self.pending.get(event_ssue) is future:
+                del self.pending[event_ssue]
+                self.finished[event_ssue] = future
+                while len(self.finished) > self.max_windows:
+                    self.evicted.append(self.finished.popitem(last=False)[1])
+
+    def prefetch_window(self, event_ssue):
+        """local_filenames = prefetch_window(event_ssue)
+
+        Download the files needed to process an event time, then decode them
+        into the decoded file cache. Runs on the background thread.
+
+        INPUTS:
+            event_ssue - event time to process (seconds since unix epoch)
+
+        OUTPUTS:
+            local_filenames - list of files that were downloaded (including
+            their path)
+        """
+        start_time_ssue = event_ssue - settings.PROCESS_TIME_SIZE_S / 2
+        end_time_ssue = event_ssue + settings.PROCESS_TIME_SIZE_S / 2
+        [local_filenames, _] = download_glm_files(
+            start_time_ssue, end_time_ssue, self.data_dir, self.status_helper
+        )
+
+        # The files are decoded serially, the processing loop decodes any
+        # that could not be
+        if settings.DECODED_FILE_CACHE_MAX_BYTES > 0:
+            try:
+                self.glmdata.decode_glm_files(
+                    get_glm_file_index(self.data_dir).query(
+                        start_time_ssue, end_time_ssue
+                    )
+                )
+            except Exception as err:  # pylint: disable=broad-except
+                self.status_helper.send_logs(
+                    [("warning", f"Prefetching decoded files failed: {err}")]
+                )
+        return local_filenames
+
+    def collect(self, event_ssue):
+        """local_filenames = collect(event_ssue)
+
+        Wait for the prefetch of an event time to finish and hand over the
+        files it downloaded, along with those of any evicted prefetches. A
+        failed prefetch is logged and ignored, the caller is expected to
+        download any files that are still missing.
+
+        INPUTS:
+            event_ssue - event time to process (seconds since unix epoch)
+
+        OUTPUTS:
+            local_filenames - list of files that were downloaded (including
+            their path)
+        """
+        with self.lock:
+            future = self.pending.pop(event_ssue, None)
+            if future is None:
+                future = self.finished.pop(event_ssue, None)
+            futures = self.evicted
+            self.evicted = []
+        if future is not None:
+            futures.append(future)
+
+        local_filenames = []
+        for done_future in futures:
+            try:
+                local_filenames.extend(done_future.result())
+            except Exception as err:  # pylint: disable=broad-except
+                self.status_helper.send_logs(
+                    [
+                        (
+                            "warning",
+                            f"Prefetching files failed and will be retried: {err}",
+                        )
+                    ]
+                )
+        return local_filenames
+
+    def shutdown(self):
+        """local_filenames = shutdown()
+
+        Wait for all prefetches to finish and stop the background thread.
+
+        OUTPUTS:
+            local_filenames - list of all files downloaded by prefetches that
+            were never collected
+        """
+        with self.lock:
+            event_dates = list(self.pending) + list(self.finished)
+        local_filenames = self.collect(None)
+        for event_ssue in event_dates:
+            local_filenames.extend(self.collect(event_ssue))
+        self.executor.shutdown()
+        return local_filenames
+
+
+def get_upcoming_event_dates(event_dates_que, event_index, continuous_mode, num_events):
+    """upcoming_event_dates = get_upcoming_event_dates(event_dates_que,
+                                                       event_index,
+                                                       continuous_mode,
+                                                       num_events)
+
+    Guess which event times the main processing loop will work on after the
+    event at event_index, most likely first.
+
+    INPUTS:
+        event_dates_que - The next times to process (seconds since unix epoch)
+
+        event_index - index of the event currently being processed
+
+        continuous_mode - if true, a new event is appended after the newest
+        event is processed
+
+        num_events - max number of upcoming event times to return
+
+    OUTPUTS:
+        upcoming_event_dates - list of event times (seconds since unix epoch)
+    """
+    upcoming_event_dates = []
+    if event_index == len(event_dates_que) - 1:
+        # The newest events are processed first
+        if continuous_mode:
+            upcoming_event_dates.append(
+                event_dates_que[event_index] + settings.PROCESS_INTERVAL_S
+            )
+        for ii in range(event_index - 1, -1, -1):
+            if len(upcoming_event_dates) >= num_events:
+                break
+            upcoming_event_dates.append(event_dates_que[ii])
+    else:
+        # Otherwise, the oldest events are being caught up on
+        for ii in range(event_index + 1, len(event_dates_que)):
+            if len(upcoming_event_dates) >= num_events:
+                break
+            upcoming_event_dates.append(event_dates_que[ii])
+
+    return upcoming_event_dates[:num_events]
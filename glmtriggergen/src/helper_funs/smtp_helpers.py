@@ -51,7 +51,7 @@ def create_download_string(event_time, sat_ids):
             event_time + settings.PROCESS_INTERVAL_S,
         ]
 
-    # Download the URIs from the gcloud for the file times
+    # Look up the URIs on the gcloud for the file times
     download_uris = []
 
     for file_time in file_times:
@@ -59,7 +59,7 @@ def create_download_string(event_time, sat_ids):
         # Floor seconds to 0, 20, or 40.
         second = int(second - second % settings.PROCESS_INTERVAL_S)
         for sat_id in sat_ids:
-            uri = ghf.get_file_list_from_gcloud(
+            uri = ghf.LISTING_CACHE.get_file_list(
                 int(sat_id), year, doy, hour, minute, second
             )
             download_uris.append(uri[0])
@@ -152,6 +152,60 @@ class StatusHelperQueue:
             status_item.error_flag = False
 
 
+class StatusHelperBuffer:
+    """StatusHelperBuffer
+
+    A stand in for StatusHelperQueue in worker processes, which can't share
+    the status server socket. Status and logs are held in a list until the
+    parent process forwards them to its StatusHelperQueue.
+    """
+
+    def __init__(self) -> None:
+        """__init__(self) -> None"""
+        self.status_records = []
+
+    def send_status(self, status_tuples_list):
+        """send_status(status_tuples_list)
+
+        Hold status to be forwarded (see StatusHelperQueue.send_status)
+        """
+        self.status_records.append(("status", list(status_tuples_list)))
+
+    def send_logs(self, log_tuples_list):
+        """send_logs(log_tuples_list)
+
+        Hold logs to be forwarded (see StatusHelperQueue.send_logs)
+        """
+        self.status_records.append(("logs", list(log_tuples_list)))
+
+    def pop_records(self):
+        """status_records = pop_records()
+
+        OUTPUTS:
+            status_records - list of ("status" or "logs", tuples_list) records
+            held since the last call
+        """
+        status_records = self.status_records
+        self.status_records = []
+        return status_records
+
+
+def forward_status_records(status_records, status_helper):
+    """forward_status_records(status_records, status_helper)
+
+    Send status and logs held by a StatusHelperBuffer to a status helper
+
+    Args:
+        status_records (list): records returned by StatusHelperBuffer.pop_records
+        status_helper (StatusHelper Instance): An instance of the StatusHelper class
+    """
+    for record_type, tuples_list in status_records:
+        if record_type == "status":
+            status_helper.send_status(tuples_list)
+        else:
+            status_helper.send_logs(tuples_list)
+
+
 def send_setup_status(setup, event_dates_que, status_helper):
     """send_setup_status(setup, event_dates_que, status_helper)
 
@@ -183,6 +237,9 @@ def send_setup_status(setup, event_dates_que, status_helper):
     keep_netcdf_files_string = f"Keep local netCDF files:\t{setup.keep_netcdfs}"
     create_plots_string = f"Create plots:\t\t\t{setup.do_plots}"
     debug_mode_string = f"Debug mode:\t\t\t{setup.debug_mode}"
+    backfill_workers_string = (
+        f"Backfill worker processes:\t{setup.num_backfill_workers}"
+    )
 
     # Print the setup strings
     print(smtp_send_string)
@@ -197,6 +254,7 @@ def send_setup_status(setup, event_dates_que, status_helper):
     print(keep_netcdf_files_string)
     print(create_plots_string)
     print(debug_mode_string)
+    print(backfill_workers_string)
 
     # Log the setup
     status_helper.send_logs(
@@ -213,5 +271,6 @@ def send_setup_status(setup, event_dates_que, status_helper):
             ("info", keep_netcdf_files_string),
             ("info", create_plots_string),
             ("info", debug_mode_string),
+            ("info", backfill_workers_string),
         ]
     )
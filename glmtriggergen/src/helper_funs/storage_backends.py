@@ -0,0 +1,310 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+"""This file provides interchangeable backends for listing and fetching the GOES
+GLM files stored on the Google cloud. Files are always named by their gcloud
+URI (gs://bucket/object) regardless of which backend serves them.
+"""
+import abc
+import json
+import os
+import shutil
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+import warnings
+
+from config import glmtriggergenconfig as settings
+
+# Public endpoints for the Google cloud storage JSON API and object downloads
+GCS_JSON_API_URL = "https://storage.googleapis.com/storage/v1/b/"
+GCS_DOWNLOAD_URL = "https://storage.googleapis.com/"
+# Timeout (in secs) for a single request to the Google cloud
+HTTP_TIMEOUT_S = 60.0
+
+
+def split_gcloud_uri(uri):
+    """bucket, object_name = split_gcloud_uri(uri)
+
+    Split a gcloud URI (gs://bucket/object) into its bucket and object name
+
+    Args:
+        uri (string): The gcloud URI
+
+    Returns:
+        bucket (string): The bucket name
+        object_name (string): The object name (may be empty or a prefix)
+    """
+    if not uri.startswith("gs://"):
+        raise ValueError(f"Expected a gcloud URI starting with gs://: {uri}")
+
+    bucket, _, object_name = uri[5:].partition("/")
+    return bucket, object_name
+
+
+def get_temp_path(local_path):
+    """temp_path = get_temp_path(local_path)
+
+    Get a unique temporary path next to local_path to fetch a file into, so
+    several processes fetching the same file never write to the same
+    temporary file
+
+    Args:
+        local_path (string): path (including file name) the file is saved to
+
+    Returns:
+        string: The temporary path
+    """
+    return f"{local_path}.{os.getpid()}.{uuid.uuid4().hex}.part"
+
+
+class StorageBackend(abc.ABC):
+    """StorageBackend
+
+    The interface all storage backends provide. Prefixes and URIs are gcloud
+    URIs. A prefix ending in / lists the files directly inside that directory,
+    any other prefix lists the files in its directory starting with it. A
+    backend missing any of these methods cannot be created.
+    """
+
+    @abc.abstractmethod
+    def list_prefix(self, uri_prefix):
+        """list_prefix(uri_prefix)
+
+        Args:
+            uri_prefix (string): gcloud URI prefix to list
+
+        Returns:
+            list: A sorted list of gcloud URIs of the matching files
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def fetch_to_path(self, uri, local_path):
+        """fetch_to_path(uri, local_path)
+
+        Copy a file to the local system. The file only appears at local_path
+        once it has been completely fetched.
+
+        Args:
+            uri (string): gcloud URI of a file
+            local_path (string): path (including file name) to save the file to
+
+        Returns:
+            bool: True if succeeded. False otherwise.
+        """
+        raise NotImplementedError
+
+
+class HttpStorageBackend(StorageBackend):
+    """HttpStorageBackend
+
+    Accesses the public GOES buckets in process through the Google cloud
+    storage JSON API and public download URLs. No credentials are needed.
+    """
+
+    def list_prefix(self, uri_prefix):
+        bucket, object_prefix = split_gcloud_uri(uri_prefix)
+        files = []
+        page_token = ""
+        while True:
+            query = {
+                "prefix": object_prefix,
+                "delimiter": "/",
+                "fields": "items(name),nextPageToken",
+            }
+            if page_token:
+                query["pageToken"] = page_token
+            url = (
+                GCS_JSON_API_URL
+                + urllib.parse.quote(bucket, safe="")
+                + "/o?"
+                + urllib.parse.urlencode(query)
+            )
+            try:
+                with urllib.request.urlopen(url, timeout=HTTP_TIMEOUT_S) as response:
+                    listing = json.load(response)
+            except (urllib.error.URLError, OSError, ValueError) as err:
+                warnings.warn(f"Could not list {uri_prefix} on the gcloud: {err}")
+                return []
+
+            files.extend(
+                f"gs://{bucket}/{item['name']}" for item in listing.get("items", [])
+            )
+            page_token = listing.get("nextPageToken", "")
+            if not page_token:
+                break
+
+        return sorted(files)
+
+    def fetch_to_path(self, uri, local_path):
+        temp_path = get_temp_path(local_path)
+        try:
+            with urllib.request.urlopen(
+                self.get_download_url(uri), timeout=HTTP_TIMEOUT_S
+            ) as response, open(temp_path, "wb") as local_file:
+                shutil.copyfileobj(response, local_file)
+            os.replace(temp_path, local_path)
+        except (urllib.error.URLError, OSError) as err:
+            print(f"{uri} failed to download! {err}")
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+            return False
+        return True
+
+    @staticmethod
+    def get_download_url(uri):
+        """get_download_url(uri)
+
+        Args:
+            uri (string): gcloud URI of a file
+
+        Returns:
+            string: The public https URL of the file
+        """
+        bucket, object_name = split_gcloud_uri(uri)
+        return GCS_DOWNLOAD_URL + bucket + "/" + urllib.parse.quote(object_name)
+
+
+class GsutilStorageBackend(StorageBackend):
+    """GsutilStorageBackend
+
+    Accesses the gcloud by running settings.GS_UTIL in a subprocess.
+    """
+
+    def list_prefix(self, uri_prefix):
+        # A directory is listed as is, anything else gets a wild card
+        if not uri_prefix.endswith("/"):
+            uri_prefix += "*"
+        # gsutil fails when nothing matches, which just means no files
+        output = self.run_gsutil(["ls", uri_prefix], check=False)
+        return sorted(file for file in output.stdout.split("\n") if file != "")
+
+    def fetch_to_path(self, uri, local_path):
+        temp_path = get_temp_path(local_path)
+        try:
+            self.run_gsutil(["cp", uri, temp_path], check=True)
+            os.replace(temp_path, local_path)
+        except (subprocess.CalledProcessError, OSError):
+            print(uri + " failed to download!")
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+            return False
+        return True
+
+    @staticmethod
+    def run_gsutil(args, check):
+        """run_gsutil(args, check)
+
+        Args:
+            args (list): arguments to pass to settings.GS_UTIL
+            check (bool): If true, raise subprocess.CalledProcessError when
+            gsutil fails
+
+        Returns:
+            subprocess.CompletedProcess: The finished gsutil process
+        """
+        return subprocess.run(
+            [settings.GS_UTIL] + args,
+            check=check,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+
+class LocalStorageBackend(StorageBackend):
+    """LocalStorageBackend
+
+    Serves gcloud URIs from a local directory that mirrors the bucket layout,
+    e.g. gs://gcp-public-data-goes-16/GLM-L2-LCFA/2024/116/12/file.nc is read
+    from root_dir/gcp-public-data-goes-16/GLM-L2-LCFA/2024/116/12/file.nc
+    """
+
+    def __init__(self, root_dir) -> None:
+        """__init__(self, root_dir) -> None
+
+        INPUTS:
+        root_dir: The directory holding one sub directory per bucket
+        """
+        self.root_dir = root_dir
+
+    def get_local_path(self, uri):
+        """get_local_path(uri)
+
+        Args:
+            uri (string): gcloud URI of a file or prefix
+
+        Returns:
+            string: The matching path under root_dir
+        """
+        bucket, object_name = split_gcloud_uri(uri)
+        return os.path.join(self.root_dir, bucket, object_name)
+
+    def list_prefix(self, uri_prefix):
+        local_prefix = self.get_local_path(uri_prefix)
+        local_dir, name_prefix = os.path.split(local_prefix)
+        uri_dir = uri_prefix[: uri_prefix.rfind("/") + 1]
+        try:
+            with os.scandir(local_dir) as entries:
+                files = [
+                    uri_dir + entry.name
+                    for entry in entries
+                    if entry.is_file() and entry.name.startswith(name_prefix)
+                ]
+        except FileNotFoundError:
+            return []
+        return sorted(files)
+
+    def fetch_to_path(self, uri, local_path):
+        temp_path = get_temp_path(local_path)
+        try:
+            shutil.copyfile(self.get_local_path(uri), temp_path)
+            os.replace(temp_path, local_path)
+        except OSError:
+            print(uri + " failed to download!")
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+            return False
+        return True
+
+
+def get_storage_backend(backend_name, local_root_dir=""):
+    """get_storage_backend(backend_name, local_root_dir="")
+
+    Args:
+        backend_name (string): One of "http", "gsutil", or "local"
+        local_root_dir (string, optional): Root directory used by the "local"
+        backend. Defaults to "".
+
+    Returns:
+        StorageBackend: The requested storage backend
+    """
+    if backend_name == "http":
+        return HttpStorageBackend()
+    if backend_name == "gsutil":
+        return GsutilStorageBackend()
+    if backend_name == "local":
+        if not local_root_dir:
+            raise ValueError("The local storage backend needs a root directory")
+        return LocalStorageBackend(local_root_dir)
+    raise ValueError(
+        f"Storage backend must be http, gsutil, or local. It is {backend_name}."
+    )
@@ -47,6 +47,25 @@ def in_glm_file_latter_half(ssue):
     return (ssue % settings.PROCESS_INTERVAL_S) >= (settings.PROCESS_INTERVAL_S / 2)
 
 
+def get_cluster_key(cluster_id, sat_id=None):
+    """get_cluster_key(cluster_id, sat_id=None)
+
+    Get the dictionary key for estimates stored by cluster (and satellite).
+    The key is the same whether the IDs are stored as ints or floats, and the
+    IDs are written as floats, as in the trigger data file names.
+
+    Args:
+        cluster_id (int or float): The cluster ID
+        sat_id (int or float, optional): The satellite ID. Defaults to None.
+
+    Returns:
+        str: The key, e.g., "5.0" or "5.0_16.0"
+    """
+    if sat_id is None:
+        return str(float(cluster_id))
+    return f"{float(cluster_id)}_{float(sat_id)}"
+
+
 def signal_handler(sig, frame):
     """signal_handler(sig, frame)
 
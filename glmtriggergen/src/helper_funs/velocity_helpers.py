@@ -38,109 +38,94 @@ def associate_los_vectors(least_cluster_sat_data, most_cluster_sat_data):
         in the cluster
         most_cluster_sat_data (tuple): A tuple of LOS times, high alt
         points, and low alt points for the satellite with the most LOSs
-        in the cluster
+        in the cluster. The LOS times must be sorted.
 
     Returns:
-        list: A list of associated times and LOS vectors
+        tuple: The least_cluster_sat_data and most_cluster_sat_data tuples,
+        reduced to the associated LOSs (one pair per row)
     """
     # Extract the LOS data
-    (times_cluster_sat_least_s, high_pos_ecef_least_m, low_pos_ecef_least_m) = (
-        least_cluster_sat_data
-    )
+    times_cluster_sat_least_s = least_cluster_sat_data[0]
+    times_cluster_sat_most_s = most_cluster_sat_data[0]
 
-    (times_cluster_sat_most_s, high_pos_ecef_most_m, low_pos_ecef_most_m) = (
-        most_cluster_sat_data
+    # For every point in the sat with least points, find the neighboring
+    # points of the sat with most points, on either side of its time
+    next_time_indices = np.searchsorted(
+        times_cluster_sat_most_s, times_cluster_sat_least_s
     )
+    last_time_index = len(times_cluster_sat_most_s) - 1
+    prev_time_diffs_s = np.abs(
+        times_cluster_sat_most_s[np.clip(next_time_indices - 1, 0, last_time_index)]
+        - times_cluster_sat_least_s
+    )
+    next_time_diffs_s = np.abs(
+        times_cluster_sat_most_s[np.clip(next_time_indices, 0, last_time_index)]
+        - times_cluster_sat_least_s
+    )
+    prev_time_diffs_s[next_time_indices == 0] = np.inf
+    next_time_diffs_s[next_time_indices > last_time_index] = np.inf
 
-    # Initialize the time_los_vectors list
-    time_los_vectors = []
-
-    # For every point in the sat with least points, look for associated points with other sat
-    for least_time_index, least_time_s in enumerate(times_cluster_sat_least_s):
-        # Subset all of the sat with most points within a window around the least_time_s
-        time_diffs_s = np.abs(times_cluster_sat_most_s - least_time_s)
-
-        if (
-            np.min(time_diffs_s) < POINT_SOURCE_ASSOCIATION_TIME_WINDOW_S
-        ):  # There is at least one point within the time window
-            # Hence, initialize a time_los_vector
-            time_los_vector = [None] * 6
-
-            # Add least-sat time and los points to time_los_vector
-            time_los_vector[0] = least_time_s
-            time_los_vector[1] = high_pos_ecef_least_m[least_time_index]
-            time_los_vector[2] = low_pos_ecef_least_m[least_time_index]
-
-            # Add most-sat time and los points to time_los_vector
-            most_time_index = np.argmin(time_diffs_s)
-
-            time_los_vector[3] = times_cluster_sat_most_s[most_time_index]
-            time_los_vector[4] = high_pos_ecef_most_m[most_time_index]
-            time_los_vector[5] = low_pos_ecef_most_m[most_time_index]
+    # Keep the nearest in time, preferring the earlier point on ties
+    use_next_bools = next_time_diffs_s < prev_time_diffs_s
+    most_time_indices = np.where(
+        use_next_bools, next_time_indices, next_time_indices - 1
+    )
+    time_diffs_s = np.where(use_next_bools, next_time_diffs_s, prev_time_diffs_s)
 
-            # Add time_los_vector to time_los_vectors list
-            time_los_vectors.append(time_los_vector)
+    # Keep the points with at least one point within the time window
+    least_time_indices = np.flatnonzero(
+        time_diffs_s < POINT_SOURCE_ASSOCIATION_TIME_WINDOW_S
+    )
+    most_time_indices = most_time_indices[least_time_indices]
+    # Use the first of any points with duplicate times
+    most_time_indices = np.searchsorted(
+        times_cluster_sat_most_s, times_cluster_sat_most_s[most_time_indices]
+    )
 
-    return time_los_vectors
+    return (
+        tuple(los_data[least_time_indices] for los_data in least_cluster_sat_data),
+        tuple(los_data[most_time_indices] for los_data in most_cluster_sat_data),
+    )
 
 
-def compute_nearest_approach_points(time_los_vectors):
-    """compute_nearest_approach_points(time_los_vectors)
+def compute_nearest_approach_points(least_cluster_sat_data, most_cluster_sat_data):
+    """compute_nearest_approach_points(least_cluster_sat_data,
+    most_cluster_sat_data)
 
     Args:
-        time_los_vectors (list): A list of associated times and LOS vectors
+        least_cluster_sat_data (tuple): A tuple of LOS times, high alt
+        points, and low alt points for the satellite with the least LOSs
+        most_cluster_sat_data (tuple): A tuple of the associated LOS times,
+        high alt points, and low alt points for the satellite with the most
+        LOSs (see associate_los_vectors)
 
     Returns:
-        tuple: A tuple of lists of nearest approach point data
+        tuple: A tuple of arrays of nearest approach point data
     """
+    (least_times_s, high_pos_ecef0m, low_pos_ecef0m) = least_cluster_sat_data
+    (most_times_s, high_pos_ecef1m, low_pos_ecef1m) = most_cluster_sat_data
+
+    # Compute the min distance vectors between all of the associated
+    # lines-of-sight at once
+    [_, seg0p_min, seg1p_min] = ghf.dist3d_segments_to_segments(
+        high_pos_ecef0m,
+        low_pos_ecef0m,
+        high_pos_ecef1m,
+        low_pos_ecef1m,
+    )
+
+    # Find the middle points of the min distance vectors
+    nearest_approach_points = np.mean(np.stack([seg0p_min, seg1p_min]), axis=0)
 
-    closest_distances = [None] * len(time_los_vectors)
-    nearest_approach_points = [None] * len(time_los_vectors)
-    nearest_approach_times = [None] * len(time_los_vectors)
-    estimated_lats = [None] * len(time_los_vectors)
-    estimated_lons = [None] * len(time_los_vectors)
-    estimated_alts = [None] * len(time_los_vectors)
-
-    # For all of the associated LOSs, compute points of nearest intersections
-    for time_los_index, time_los_vector in enumerate(time_los_vectors):
-
-        # Extract LOS high and low points
-        high_pos_ecef0m = time_los_vector[1]
-        low_pos_ecef0m = time_los_vector[2]
-        high_pos_ecef1m = time_los_vector[4]
-        low_pos_ecef1m = time_los_vector[5]
-
-        # Compute the min distance vector between two lines-of-sight
-        [closest_distance, seg0p_min, seg1p_min] = ghf.dist3d_segment_to_segment(
-            high_pos_ecef0m,
-            low_pos_ecef0m,
-            high_pos_ecef1m,
-            low_pos_ecef1m,
-        )
-
-        closest_distances[time_los_index] = closest_distance
-
-        # Find the middle point of the min distance vector
-        min_dist_seg_ecef_ave = np.mean(np.stack([seg0p_min, seg1p_min]), axis=0)
-
-        # Store the estimated location
-        nearest_approach_points[time_los_index] = min_dist_seg_ecef_ave
-
-        # Compute intersection times
-        nearest_approach_times[time_los_index] = np.mean(
-            [time_los_vector[0], time_los_vector[3]]
-        )
-
-        # Convert the middle point to Geodetic to estimate altitude
-        (estimated_lat, estimated_lon, estimated_alt) = ghf.ecef2geodetic(
-            min_dist_seg_ecef_ave[0],
-            min_dist_seg_ecef_ave[1],
-            min_dist_seg_ecef_ave[2],
-        )
-
-        estimated_lats[time_los_index] = estimated_lat
-        estimated_lons[time_los_index] = estimated_lon
-        estimated_alts[time_los_index] = estimated_alt
+    # Compute intersection times
+    nearest_approach_times = np.mean(np.stack([least_times_s, most_times_s]), axis=0)
+
+    # Convert the middle points to Geodetic to estimate altitudes
+    (estimated_lats, estimated_lons, estimated_alts) = ghf.ecef2geodetic(
+        nearest_approach_points[:, 0],
+        nearest_approach_points[:, 1],
+        nearest_approach_points[:, 2],
+    )
 
     return (
         nearest_approach_points,
@@ -168,7 +153,7 @@ def estimate_velocity(nearest_approach_times, nearest_approach_points):
     for each of the x, y, and z nearest-approach point coordinates.
 
     Args:
-        nearest_approach_times (list): A list of times in seconds
+        nearest_approach_times (array): An array of times in seconds
         nearest_approach_points (array): An array of ECEF points in meters
 
     Returns:
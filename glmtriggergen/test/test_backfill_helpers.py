@@ -0,0 +1,113 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import src.helper_funs.backfill_helpers as bfh
+import src.helper_funs.datetime_helpers as dth
+from src.helper_funs.status_helpers_queue import StatusHelperBuffer
+
+FIRST_FILE_SSUE = (datetime(2024, 4, 25, 12, 25, 0) - dth.EPOCH).total_seconds()
+
+
+def get_glm_file_name(start_ssue):
+    """get_glm_file_name(start_ssue)
+
+    Name a 20 second GOES-16 GLM file starting at start_ssue
+    """
+    start_time = dth.EPOCH + timedelta(seconds=start_ssue)
+    end_time = start_time + timedelta(seconds=20)
+    return (
+        f"OR_GLM-L2-LCFA_G16_s{start_time:%Y%j%H%M%S}0_"
+        f"e{end_time:%Y%j%H%M%S}0_c{end_time:%Y%j%H%M%S}0.nc"
+    )
+
+
+@pytest.mark.parametrize(
+    "num_events, num_shards, expected_shard_lengths",
+    [
+        (10, 4, [3, 3, 2, 2]),
+        (3, 5, [1, 1, 1]),
+        (4, 1, [4]),
+        (0, 4, []),
+    ],
+)
+def test_shard_event_dates(num_events, num_shards, expected_shard_lengths):
+    """test_shard_event_dates(num_events, num_shards, expected_shard_lengths)"""
+    event_dates = [FIRST_FILE_SSUE + 20 * ii for ii in range(num_events)]
+    shards = bfh.shard_event_dates(list(reversed(event_dates)), num_shards)
+
+    # The shards are contiguous time ranges holding every event once, in order
+    assert [len(shard) for shard in shards] == expected_shard_lengths
+    assert [event_date for shard in shards for event_date in shard] == event_dates
+
+
+@pytest.mark.parametrize(
+    "guard_event_dates, expected_leftover_starts",
+    [([FIRST_FILE_SSUE + 60], [FIRST_FILE_SSUE + 40]), ([], [])],
+)
+def test_process_event_shard_guard(
+    monkeypatch, tmp_path, guard_event_dates, expected_leftover_starts
+):
+    """test_process_event_shard_guard(monkeypatch, tmp_path, guard_event_dates,
+    expected_leftover_starts)"""
+    data_dir = str(tmp_path) + "/"
+
+    def download_glm_files(start_time_ssue, end_time_ssue, data_dir, status_helper):
+        # An event at a file boundary needs the files on either side of it
+        local_filenames = []
+        for file_start_ssue in (start_time_ssue - 10, start_time_ssue + 10):
+            file_path = data_dir + get_glm_file_name(file_start_ssue)
+            if not os.path.isfile(file_path):
+                open(file_path, "wb").close()
+                local_filenames.append(file_path)
+        return [local_filenames, True]
+
+    def process_glm_files(data_dir, *args):
+        event_ssue = args[2]
+        for file_start_ssue in (event_ssue - 20, event_ssue):
+            assert os.path.isfile(data_dir + get_glm_file_name(file_start_ssue))
+        return [2, 0]
+
+    monkeypatch.setattr(bfh, "download_glm_files", download_glm_files)
+    monkeypatch.setattr(bfh, "process_glm_files", process_glm_files)
+    monkeypatch.setitem(bfh.WORKER_STATE, "status_buffer", StatusHelperBuffer())
+    monkeypatch.setitem(bfh.WORKER_STATE, "l2_cal_tables_dict", {})
+    monkeypatch.setitem(bfh.WORKER_STATE, "rocket_pipeline", None)
+    monkeypatch.setitem(bfh.WORKER_STATE, "db_helper", None)
+
+    # The first event of the neighboring shard needs the last file of this one
+    shard_event_dates = [FIRST_FILE_SSUE + 20, FIRST_FILE_SSUE + 40]
+    [event_results, local_filenames, _] = bfh.process_event_shard(
+        shard_event_dates, guard_event_dates, data_dir, False, False, [False] * 3
+    )
+    assert [event_result[0] for event_result in event_results] == shard_event_dates
+
+    # Only the files the guard event times need are left to the parent
+    expected_leftovers = [
+        data_dir + get_glm_file_name(file_start_ssue)
+        for file_start_ssue in expected_leftover_starts
+    ]
+    assert local_filenames == expected_leftovers
+    assert sorted(os.listdir(data_dir)) == sorted(
+        os.path.basename(file_path) for file_path in expected_leftovers
+    )
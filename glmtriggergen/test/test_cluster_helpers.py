@@ -0,0 +1,240 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import src.helper_funs.cluster_helpers as chf
+from src.helper_funs.cluster_helpers import (
+    ClusterMerger,
+    StreamingClusterState,
+    cluster_close_pairs,
+    find_close_pairs,
+    find_merge_pairs_in_tiles,
+    find_window_pairs,
+    get_group_keys,
+    merge_clusters,
+)
+
+DLAT_DIST_M = 111.0e3
+
+
+def cluster_by_scan(time_s, lat_lon_deg, positions_m, distance_m, time_distance_s):
+    """cluster_by_scan(time_s, lat_lon_deg, positions_m, distance_m,
+    time_distance_s)
+
+    Cluster the points with a full scan over all points for each point in
+    time order, relabeling merged clusters one at a time
+    """
+    rough_lat_deg = 3 * distance_m / DLAT_DIST_M
+    cluster_id = np.zeros(len(time_s), dtype=np.int32)
+    sorted_time_indices = np.argsort(time_s)
+    num_clusters = 0
+    for current_index in sorted_time_indices:
+        if cluster_id[current_index] == 0:
+            num_clusters += 1
+            cluster_id[current_index] = num_clusters
+        if current_index == len(time_s) - 1:
+            continue
+        current_lat, current_lon = lat_lon_deg[current_index]
+        rough_lon_deg = (
+            7.5 * distance_m / (np.cos(np.radians(current_lat)) * DLAT_DIST_M)
+        )
+        for window_index in np.where(
+            (time_s[current_index] <= time_s)
+            & (time_s <= time_s[current_index] + time_distance_s)
+            & (np.abs(lat_lon_deg[:, 0] - current_lat) <= rough_lat_deg)
+            & (np.abs(lat_lon_deg[:, 1] - current_lon) <= rough_lon_deg)
+        )[0]:
+            if cluster_id[window_index] == cluster_id[current_index]:
+                continue
+            if (
+                np.linalg.norm(positions_m[window_index] - positions_m[current_index])
+                > distance_m
+            ):
+                continue
+            if cluster_id[window_index] > 0:
+                cluster_id[cluster_id == cluster_id[window_index]] = cluster_id[
+                    current_index
+                ]
+            else:
+                cluster_id[window_index] = cluster_id[current_index]
+    return cluster_id
+
+
+def test_merge_clusters(monkeypatch):
+    """test_merge_clusters(monkeypatch)"""
+    rng = np.random.default_rng(321)
+    num_points = 600
+    time_s = np.round(rng.uniform(0, 20, num_points), 2)
+    lat_lon_deg = np.column_stack(
+        (rng.uniform(20, 24, num_points), rng.uniform(-80, -76, num_points))
+    )
+    positions_m = np.column_stack(
+        (lat_lon_deg * DLAT_DIST_M, rng.uniform(0, 1e4, num_points))
+    )
+    distance_m = 25.0e3
+    time_distance_s = 2.0
+
+    window_pairs = list(
+        find_window_pairs(
+            time_s,
+            lat_lon_deg[:, 0],
+            lat_lon_deg[:, 1],
+            time_distance_s,
+            3 * distance_m / DLAT_DIST_M,
+            7.5 * distance_m,
+            DLAT_DIST_M,
+        )
+    )
+    current_inds = np.concatenate([pairs[1] for pairs in window_pairs])
+    window_inds = np.concatenate([pairs[2] for pairs in window_pairs])
+
+    # Small blocks, visited in any order, hold the same pairs
+    monkeypatch.setattr(chf, "MAX_BLOCK_PAIRS", 50)
+    visit_order = rng.permutation(num_points)
+    block_pairs = list(
+        find_window_pairs(
+            time_s,
+            lat_lon_deg[:, 0],
+            lat_lon_deg[:, 1],
+            time_distance_s,
+            3 * distance_m / DLAT_DIST_M,
+            7.5 * distance_m,
+            DLAT_DIST_M,
+            visit_order=visit_order,
+        )
+    )
+    assert len(block_pairs) > len(window_pairs)
+    np.testing.assert_array_equal(
+        np.concatenate([pairs[0] for pairs in block_pairs]), visit_order
+    )
+    block_current_inds = np.concatenate([pairs[1] for pairs in block_pairs])
+    block_window_inds = np.concatenate([pairs[2] for pairs in block_pairs])
+    pair_order = np.lexsort((block_window_inds, block_current_inds))
+    np.testing.assert_array_equal(block_current_inds[pair_order], current_inds)
+    np.testing.assert_array_equal(block_window_inds[pair_order], window_inds)
+    are_close_bools = (
+        np.linalg.norm(positions_m[window_inds] - positions_m[current_inds], axis=1)
+        <= distance_m
+    )
+    cluster_id = merge_clusters(
+        np.zeros(num_points, dtype=np.int32),
+        np.argsort(time_s),
+        current_inds[are_close_bools],
+        window_inds[are_close_bools],
+        last_index=num_points - 1,
+    )
+
+    # The clusters and their IDs match the full scan
+    expected_cluster_id = cluster_by_scan(
+        time_s, lat_lon_deg, positions_m, distance_m, time_distance_s
+    )
+    assert len(np.unique(expected_cluster_id)) < num_points
+    np.testing.assert_array_equal(cluster_id, expected_cluster_id)
+
+
+def test_streaming_cluster_state():
+    """test_streaming_cluster_state()"""
+    sat_id = np.array([16, 16, 18, 18, 16])
+    group_id = np.array([7, 8, 7, 9, 7])
+    times_ssue = 1714047945.0 + np.array([0.0, 0.5, 0.5, 1.0, 20.0])
+    keys = get_group_keys(sat_id, group_id, times_ssue)
+    # Groups differing by satellite, group ID, or time have different keys
+    assert len(np.unique(keys)) == 5
+
+    state = StreamingClusterState()
+    np.testing.assert_array_equal(state.find_carried_rows(keys), 0)
+
+    # The carried clusters are renumbered from 1
+    state.carry(keys[:4], [12, 12, 30, 41], [30])
+    assert state.num_clusters == 3
+    np.testing.assert_array_equal(state.reported_cluster_ids, [2])
+
+    # The next batch finds the shared groups, even with times relative to a
+    # different basetime
+    next_keys = get_group_keys(
+        sat_id[::-1], group_id[::-1], (times_ssue[::-1] - 20.0) + 20.0
+    )
+    np.testing.assert_array_equal(state.find_carried_rows(next_keys), [0, 3, 2, 1, 1])
+
+
+def test_find_merge_pairs_in_tiles(monkeypatch):
+    """test_find_merge_pairs_in_tiles(monkeypatch)"""
+    rng = np.random.default_rng(321)
+    num_points = 3000
+    time_s = np.round(rng.uniform(0, 20, num_points), 2)
+    lat_deg = rng.uniform(20, 24, num_points)
+    lon_deg = rng.uniform(-84, -76, num_points)
+    high_pos_ecef_m = np.column_stack(
+        (lat_deg * DLAT_DIST_M, lon_deg * DLAT_DIST_M, rng.uniform(0, 1e4, num_points))
+    )
+    low_pos_ecef_m = high_pos_ecef_m + rng.uniform(-1e4, 1e4, (num_points, 3))
+    sorted_time_indices = np.argsort(time_s)
+    args = (time_s, lat_deg, lon_deg, low_pos_ecef_m, high_pos_ecef_m)
+    window_args = (2.0, 25.0e3, 3 * 25.0e3 / DLAT_DIST_M, 7.5 * 25.0e3, DLAT_DIST_M)
+
+    close_pairs = list(find_close_pairs(*args, *window_args))
+    current_inds = np.concatenate([pairs[1] for pairs in close_pairs])
+    window_inds = np.concatenate([pairs[2] for pairs in close_pairs])
+    expected_cluster_id = merge_clusters(
+        np.zeros(num_points, dtype=np.int32),
+        sorted_time_indices,
+        current_inds,
+        window_inds,
+        last_index=num_points - 1,
+    )
+    assert len(np.unique(expected_cluster_id)) < num_points / 2
+
+    # Merging small blocks as they are found, skipping the pairs already
+    # joined, gives the same cluster IDs
+    monkeypatch.setattr(chf, "MAX_BLOCK_PAIRS", 200)
+    are_searched = np.arange(num_points) != num_points - 1
+    merger = ClusterMerger(np.zeros(num_points, dtype=np.int32))
+    forest_current_inds, _ = cluster_close_pairs(
+        merger,
+        *args,
+        sorted_time_indices,
+        *window_args,
+        are_searched=are_searched,
+    )
+    np.testing.assert_array_equal(merger.get_cluster_id(), expected_cluster_id)
+    assert len(forest_current_inds) == num_points - len(np.unique(expected_cluster_id))
+    monkeypatch.undo()
+
+    # Merging the pairs found in tiles gives the same cluster IDs
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for num_tiles in (1, 3, 8):
+            tile_current_inds, tile_window_inds = find_merge_pairs_in_tiles(
+                executor,
+                num_tiles,
+                *args,
+                sorted_time_indices,
+                *window_args,
+                last_index=num_points - 1,
+            )
+            assert len(tile_current_inds) < len(current_inds)
+            cluster_id = merge_clusters(
+                np.zeros(num_points, dtype=np.int32),
+                sorted_time_indices,
+                tile_current_inds,
+                tile_window_inds,
+                last_index=num_points - 1,
+            )
+            np.testing.assert_array_equal(cluster_id, expected_cluster_id)
@@ -0,0 +1,194 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+
+import glob
+import os
+import shutil
+import threading
+from types import SimpleNamespace
+
+import src.helper_funs.file_io_helpers as fio
+from src.helper_funs.datetime_helpers import get_ssue_from_datetime_string
+from src.helper_funs.file_io_helpers import (
+    GlmFileIndex,
+    download_gcloud_files_concurrently,
+)
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), "test_data")
+
+
+def test_glm_file_index(tmp_path):
+    """test_glm_file_index()"""
+    data_dir = str(tmp_path) + "/"
+    for file_path in sorted(glob.glob(os.path.join(TEST_DATA_DIR, "*.nc"))):
+        shutil.copy(file_path, data_dir)
+    file_paths = sorted(glob.glob(data_dir + "*.nc"))
+    g16_first_file, g16_second_file, g18_first_file, g18_second_file = file_paths
+
+    # The files on disk are found when the index is first created
+    index = GlmFileIndex(data_dir)
+    assert index.file_paths() == [
+        g16_first_file,
+        g18_first_file,
+        g16_second_file,
+        g18_second_file,
+    ]
+    window_start_ssue = get_ssue_from_datetime_string("20240425122540")
+    assert index.query(window_start_ssue, window_start_ssue + 20) == [
+        g16_second_file,
+        g18_second_file,
+    ]
+    assert index.query(window_start_ssue - 10, window_start_ssue - 5) == [
+        g16_first_file,
+        g18_first_file,
+    ]
+
+    # Removals are replayed from the log by a new index
+    os.remove(g16_first_file)
+    index.remove([g16_first_file])
+    index = GlmFileIndex(data_dir)
+    assert index.file_paths() == [g18_first_file, g16_second_file, g18_second_file]
+
+    # Files deleted outside of the index are dropped from query results
+    os.remove(g18_second_file)
+    assert index.query(window_start_ssue, window_start_ssue + 20) == [g16_second_file]
+    assert g18_second_file not in index.files
+
+
+def test_glm_file_index_shared_directory(tmp_path):
+    """test_glm_file_index_shared_directory()"""
+    data_dir = str(tmp_path) + "/"
+    test_file_paths = sorted(glob.glob(os.path.join(TEST_DATA_DIR, "*.nc")))
+    g16_first_file, g16_second_file, g18_first_file, g18_second_file = [
+        data_dir + os.path.basename(file_path) for file_path in test_file_paths
+    ]
+    window_start_ssue = get_ssue_from_datetime_string("20240425122540")
+    for file_path in test_file_paths[:2]:
+        shutil.copy(file_path, data_dir)
+
+    # Two processes share the data directory and the index log
+    index = GlmFileIndex(data_dir)
+    other_index = GlmFileIndex(data_dir)
+    assert other_index.file_paths() == [g16_first_file, g16_second_file]
+
+    # Files written by the other process are found once the directory changes
+    shutil.copy(test_file_paths[2], data_dir)
+    other_index.add([g18_first_file])
+    assert index.query(window_start_ssue - 10, window_start_ssue - 5) == [
+        g16_first_file,
+        g18_first_file,
+    ]
+
+    # Files changed by hand are found once the directory changes
+    shutil.copy(test_file_paths[3], data_dir)
+    os.remove(g16_second_file)
+    assert index.query(window_start_ssue, window_start_ssue + 20) == [g18_second_file]
+
+    # Both processes appended their changes to the log, which restores the
+    # index of either
+    other_index.remove([g16_first_file])
+    with open(data_dir + ".glm_file_index.log", "r", encoding="utf-8") as log_file:
+        assert all(line.count("\t") in (1, 4) for line in log_file)
+    os.remove(g16_first_file)
+    assert GlmFileIndex(data_dir).file_paths() == [g18_first_file, g18_second_file]
+
+
+def test_glm_file_index_searches(monkeypatch, tmp_path):
+    """test_glm_file_index_searches()"""
+    data_dir = str(tmp_path) + "/"
+    test_file_paths = sorted(glob.glob(os.path.join(TEST_DATA_DIR, "*.nc")))
+    for file_path in test_file_paths[:2]:
+        shutil.copy(file_path, data_dir)
+    window_start_ssue = get_ssue_from_datetime_string("20240425122540")
+    searched_dirs = []
+
+    def fake_glob(pathname, recursive=False):
+        searched_dirs.append(pathname)
+        return glob.glob(pathname, recursive=recursive)
+
+    monkeypatch.setattr(fio, "glob", SimpleNamespace(glob=fake_glob))
+    index = GlmFileIndex(data_dir)
+    assert len(searched_dirs) == 1
+
+    # The changes made by the index itself and empty queries don't search the
+    # directory again
+    index.query(window_start_ssue, window_start_ssue + 20)
+    shutil.copy(test_file_paths[2], data_dir)
+    index.add([data_dir + os.path.basename(test_file_paths[2])])
+    index.query(window_start_ssue - 10, window_start_ssue - 5)
+    index.query(window_start_ssue + 100, window_start_ssue + 120)
+    index.query(window_start_ssue + 200, window_start_ssue + 220)
+    assert len(searched_dirs) == 1
+
+    # Changes made by another process are found
+    os.remove(data_dir + os.path.basename(test_file_paths[0]))
+    GlmFileIndex(data_dir).remove([data_dir + os.path.basename(test_file_paths[0])])
+    assert index.query(window_start_ssue - 10, window_start_ssue - 5) == [
+        data_dir + os.path.basename(test_file_paths[2])
+    ]
+    assert len(searched_dirs) == 3
+
+
+def test_download_gcloud_files_concurrently(monkeypatch, tmp_path):
+    """test_download_gcloud_files_concurrently()"""
+    data_dir = str(tmp_path) + "/"
+    # Most of the files come from the first satellite
+    gcloud_filenames = [
+        f"gs://gcp-public-data-goes-{sat_id}/GLM-L2-LCFA/2024/116/12/"
+        f"OR_GLM-L2-LCFA_G{sat_id}_s202411612{start}0_"
+        f"e202411612{end}0_c20241161226019.nc"
+        for sat_id, start, end in (
+            (16, "2500", "2520"),
+            (16, "2520", "2540"),
+            (16, "2540", "2600"),
+            (18, "2500", "2520"),
+            (19, "2500", "2520"),
+        )
+    ]
+    num_sat_downloads = {16: 0, 18: 0, 19: 0}
+    max_sat_downloads = {16: 0, 18: 0, 19: 0}
+    lock = threading.Lock()
+    all_workers_busy = threading.Barrier(3, timeout=5)
+
+    def save_gcloud_files_to_dir(data_dir, file):
+        sat_id = fio.get_glm_file_meta(file)[2]
+        with lock:
+            num_sat_downloads[sat_id] += 1
+            max_sat_downloads[sat_id] = max(
+                max_sat_downloads[sat_id], num_sat_downloads[sat_id]
+            )
+        try:
+            # The first downloads all run at once, so none of the workers
+            # waits on a satellite's limit
+            if "_s2024116122500" in file:
+                all_workers_busy.wait()
+            return True
+        except threading.BrokenBarrierError:
+            return False
+        finally:
+            with lock:
+                num_sat_downloads[sat_id] -= 1
+
+    monkeypatch.setattr(fio.ghf, "save_gcloud_files_to_dir", save_gcloud_files_to_dir)
+    download_results = download_gcloud_files_concurrently(
+        data_dir, gcloud_filenames, max_workers=3, max_workers_per_sat=1
+    )
+    assert [result[0] for result in download_results] == gcloud_filenames
+    assert all(result[1] for result in download_results)
+    assert max_sat_downloads == {16: 1, 18: 1, 19: 1}
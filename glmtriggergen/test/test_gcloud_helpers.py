@@ -0,0 +1,119 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+
+import src.helper_funs.gcloud_helpers as ghf
+
+HOUR_DIR = "gs://gcp-public-data-goes-16/GLM-L2-LCFA/2024/116/12/"
+HOUR_FILES = [
+    HOUR_DIR + f"OR_GLM-L2-LCFA_G16_s202411612{minute:02}{second:02}0_"
+    f"e202411612{minute:02}{second + 20:02}0_c20241161226019.nc"
+    for minute in range(60)
+    for second in (0, 20, 40)
+]
+
+
+def test_listing_cache(monkeypatch):
+    """test_listing_cache()"""
+    num_listings = []
+
+    def fake_get_file_list_from_gcloud(sat_id, year, doy, hour):
+        num_listings.append((sat_id, year, doy, hour))
+        return list(reversed(HOUR_FILES))
+
+    monkeypatch.setattr(
+        ghf, "get_file_list_from_gcloud", fake_get_file_list_from_gcloud
+    )
+    cache = ghf.GcloudListingCache(current_hour_ttl_s=20, settle_time_s=200)
+
+    # A single file, a minute of files and the whole hour
+    assert cache.get_file_list(16, 2024, 116, 12, 25, 20) == [HOUR_FILES[76]]
+    assert cache.get_file_list(16, 2024, 116, 12, 25) == HOUR_FILES[75:78]
+    assert cache.get_file_list(16, 2024, 116, 12) == HOUR_FILES
+
+    # The hour is long past, so it was only listed once
+    assert len(num_listings) == 1
+
+
+def test_listing_cache_persistence(monkeypatch, tmp_path):
+    """test_listing_cache_persistence()"""
+    monkeypatch.setattr(
+        ghf, "get_file_list_from_gcloud", lambda *args: list(HOUR_FILES)
+    )
+    cache_file = str(tmp_path / "listings.json")
+    cache = ghf.GcloudListingCache(20, 200, cache_file)
+    cache.get_file_list(16, 2024, 116, 12, 0, 0)
+
+    # A new cache should be warm without listing gcloud again
+    monkeypatch.setattr(ghf, "get_file_list_from_gcloud", None)
+    warm_cache = ghf.GcloudListingCache(20, 200, cache_file)
+    assert warm_cache.get_file_list(16, 2024, 116, 12, 59, 40) == [HOUR_FILES[-1]]
+
+
+def test_listing_cache_late_files(monkeypatch):
+    """test_listing_cache_late_files()"""
+    hour_end_ssue = ghf.get_hour_start_ssue(2024, 116, 12) + 3600
+    now_ssue = [hour_end_ssue + 200]
+    uploaded_files = HOUR_FILES[:-1]
+    num_listings = []
+
+    def fake_get_file_list_from_gcloud(sat_id, year, doy, hour):
+        num_listings.append((sat_id, year, doy, hour))
+        return list(uploaded_files)
+
+    monkeypatch.setattr(ghf.time, "time", lambda: now_ssue[0])
+    monkeypatch.setattr(
+        ghf, "get_file_list_from_gcloud", fake_get_file_list_from_gcloud
+    )
+    cache = ghf.GcloudListingCache(current_hour_ttl_s=20, settle_time_s=10000)
+    assert cache.get_file_list(16, 2024, 116, 12, 59, 40) == []
+
+    # A file uploaded late is found once the listing expires
+    uploaded_files = HOUR_FILES
+    now_ssue[0] += 10
+    assert cache.get_file_list(16, 2024, 116, 12, 59, 40) == []
+    now_ssue[0] += 20
+    assert cache.get_file_list(16, 2024, 116, 12, 59, 40) == [HOUR_FILES[-1]]
+    assert len(num_listings) == 2
+
+    # Listings fetched after settle_time_s are never refetched
+    now_ssue[0] = hour_end_ssue + 10000
+    cache.get_file_list(16, 2024, 116, 12)
+    now_ssue[0] += 1e6
+    cache.get_file_list(16, 2024, 116, 12)
+    assert len(num_listings) == 3
+
+
+def test_listing_cache_max_hours(monkeypatch, tmp_path):
+    """test_listing_cache_max_hours()"""
+    monkeypatch.setattr(
+        ghf, "get_file_list_from_gcloud", lambda *args: list(HOUR_FILES)
+    )
+    cache_file = str(tmp_path / "listings.json")
+    cache = ghf.GcloudListingCache(20, 200, cache_file)
+    for hour in range(12, 15):
+        cache.get_file_list(16, 2024, 116, hour)
+
+    # Each listing is appended once, and only the latest max_hours are loaded
+    with open(cache_file, "r", encoding="utf-8") as saved_file:
+        assert len(saved_file.readlines()) == 3
+    warm_cache = ghf.GcloudListingCache(20, 200, cache_file, max_hours=2)
+    warm_cache.load()
+    assert list(warm_cache.listings) == [(16, 2024, 116, 13), (16, 2024, 116, 14)]
+    with open(cache_file, "r", encoding="utf-8") as saved_file:
+        assert len(saved_file.readlines()) == 2
@@ -0,0 +1,90 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+import numpy as np
+
+from src.helper_funs.geo_helpers import (
+    adjusted_lat_lon_to_ecef,
+    dist3d_segment_to_segment,
+    dist3d_segments_to_segments,
+    ecef2geodetic,
+    find_pierce_point_at_alt,
+    find_pierce_points_at_alts,
+)
+
+
+def test_dist3d_segments_to_segments():
+    """test_dist3d_segments_to_segments()"""
+    rng = np.random.default_rng(321)
+    num_pairs = 400
+    seg1p0, seg1p1, seg2p0, seg2p1 = rng.normal(size=(4, num_pairs, 3)) * 1e3
+    # Parallel segments, and segments which are single points
+    seg1p1[:50] = seg1p0[:50] + (seg2p1[:50] - seg2p0[:50])
+    seg1p1[50:100] = seg1p0[50:100]
+    seg2p1[100:150] = seg2p0[100:150]
+
+    out = (np.empty(num_pairs), np.empty((num_pairs, 3)), np.empty((num_pairs, 3)))
+    closest_distances_m, seg1ps, seg2ps = dist3d_segments_to_segments(
+        seg1p0, seg1p1, seg2p0, seg2p1, out=out
+    )
+    assert closest_distances_m is out[0]
+
+    # Each pair matches the single pair version
+    for pair_ind in range(num_pairs):
+        closest_distance_m, seg1p, seg2p = dist3d_segment_to_segment(
+            seg1p0[pair_ind], seg1p1[pair_ind], seg2p0[pair_ind], seg2p1[pair_ind]
+        )
+        np.testing.assert_allclose(
+            closest_distances_m[pair_ind], closest_distance_m, rtol=1e-9
+        )
+        np.testing.assert_allclose(seg1ps[pair_ind], seg1p, rtol=1e-9)
+        np.testing.assert_allclose(seg2ps[pair_ind], seg2p, rtol=1e-9)
+
+
+def test_find_pierce_points_at_alts():
+    """test_find_pierce_points_at_alts()"""
+    rng = np.random.default_rng(321)
+    sat_pos_ecef_m = adjusted_lat_lon_to_ecef(np.array([0.0, -75.2, 35786e3]))
+    look_point_ecef_m = adjusted_lat_lon_to_ecef(
+        np.column_stack((rng.uniform(-50, 50, 100), rng.uniform(-120, -30, 100))),
+        6e3,
+        6e3,
+    )
+    desired_alts_m = (100e3, 0.0)
+
+    out = [np.empty((100, 3)), np.empty((100, 3))]
+    pierce_points_ecef_m = find_pierce_points_at_alts(
+        sat_pos_ecef_m, look_point_ecef_m, desired_alts_m, out=out
+    )
+    assert pierce_points_ecef_m[0] is out[0]
+    for desired_alt_m, pierce_point_ecef_m in zip(desired_alts_m, out):
+        # Matches the single altitude version, and lies at the altitude
+        np.testing.assert_allclose(
+            pierce_point_ecef_m,
+            find_pierce_point_at_alt(
+                np.tile(sat_pos_ecef_m, (100, 1)), look_point_ecef_m, desired_alt_m
+            ),
+        )
+        _, _, alts_m = ecef2geodetic(*pierce_point_ecef_m.T)
+        np.testing.assert_allclose(alts_m, desired_alt_m, atol=1.0)
+
+    float32_points_ecef_m = find_pierce_points_at_alts(
+        sat_pos_ecef_m, look_point_ecef_m, desired_alts_m, dtype=np.float32
+    )
+    assert float32_points_ecef_m[0].dtype == np.float32
+    np.testing.assert_allclose(float32_points_ecef_m[1], out[1], rtol=1e-6)
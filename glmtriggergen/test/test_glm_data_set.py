@@ -0,0 +1,282 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+
+import glob
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import src.glm_data_set as gds
+from config import glmtriggergenconfig as settings
+from src.helper_funs.cluster_helpers import StreamingClusterState
+from src.helper_funs.datetime_helpers import get_ssue_from_datetime_string
+from src.helper_funs.geo_helpers import adjusted_lat_lon_to_ecef
+from src.helper_funs.glm_decode_helpers import decode_glm_file
+
+BASETIME_SSUE = 1714047900.0
+TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), "test_data")
+
+
+class StatusHelperStub:
+    """StatusHelperStub
+
+    Drops the status and logs sent by a GlmDataSet
+    """
+
+    def send_status(self, status):
+        pass
+
+    def send_logs(self, log_tuples_list):
+        pass
+
+
+def make_glm_data_set(time_s, sat_id, group_id, lat_lon_deg, basetime_ssue):
+    """glmdata = make_glm_data_set(time_s, sat_id, group_id, lat_lon_deg,
+    basetime_ssue)
+
+    Make a GlmDataSet of groups with vertical lines-of-sight
+    """
+    glmdata = gds.GlmDataSet(StatusHelperStub())
+    num_groups = len(time_s)
+    for array_name in glmdata.GROUP_ARRAY_NAMES:
+        setattr(
+            glmdata,
+            array_name,
+            np.zeros(num_groups, dtype=getattr(glmdata, array_name).dtype),
+        )
+    glmdata.basetime_ssue = basetime_ssue
+    glmdata.time_s = np.asarray(time_s, dtype=float)
+    glmdata.sat_id = np.asarray(sat_id, dtype=gds.SAT_ID_DTYPE)
+    glmdata.group_id = np.asarray(group_id)
+    glmdata.cloud_top_lat_lon_deg = np.asarray(lat_lon_deg, dtype=float)
+    glmdata.low_pos_ecef_m = adjusted_lat_lon_to_ecef(
+        np.column_stack(
+            (lat_lon_deg, np.full(num_groups, float(glmdata.LOW_ALTITUDE_M)))
+        )
+    )
+    glmdata.high_pos_ecef_m = adjusted_lat_lon_to_ecef(
+        np.column_stack(
+            (lat_lon_deg, np.full(num_groups, float(glmdata.HIGH_ALTITUDE_M)))
+        )
+    )
+    glmdata.energy_joules = np.ones(num_groups)
+    glmdata.quality_flag = np.full(num_groups, gds.GOOD_QUALITY_FLAG)
+    glmdata.cluster_id = np.zeros(num_groups, dtype=gds.CLUSTER_ID_DTYPE)
+    return glmdata
+
+
+def assert_same_clusters(cluster_id, expected_cluster_id):
+    """assert_same_clusters(cluster_id, expected_cluster_id)
+
+    Check that two clusterings group the rows the same way, whatever their IDs
+    """
+    num_pairs = len(
+        np.unique(np.column_stack((cluster_id, expected_cluster_id)), axis=0)
+    )
+    assert num_pairs == len(np.unique(cluster_id))
+    assert num_pairs == len(np.unique(expected_cluster_id))
+
+
+def test_streaming_clusters_match_combined_data():
+    """test_streaming_clusters_match_combined_data()"""
+    rng = np.random.default_rng(17)
+    num_groups = 600
+    time_s = rng.uniform(0, 30, num_groups)
+    sat_id = rng.choice([16, 18], num_groups)
+    group_id = np.arange(num_groups) + 5000
+    cell_centers_deg = np.column_stack(
+        (rng.uniform(20, 30, 40), rng.uniform(-90, -70, 40))
+    )
+    lat_lon_deg = cell_centers_deg[rng.integers(0, 40, num_groups)] + rng.normal(
+        0, 0.1, (num_groups, 2)
+    )
+    combined = make_glm_data_set(time_s, sat_id, group_id, lat_lon_deg, BASETIME_SSUE)
+    combined.cluster_glm_data(settings.CLUSTER_DISTANCE_M, settings.CLUSTER_TIME_S)
+    assert len(np.unique(combined.cluster_id)) < num_groups / 2
+
+    # The first batch ends at 20 s, with the GOES-18 data lagging to 16 s
+    state = StreamingClusterState()
+    first_rows = np.flatnonzero(np.where(sat_id == 18, time_s < 16, time_s < 20))
+    first_batch = make_glm_data_set(
+        time_s[first_rows],
+        sat_id[first_rows],
+        group_id[first_rows],
+        lat_lon_deg[first_rows],
+        BASETIME_SSUE,
+    )
+    first_batch.cluster_glm_data(
+        settings.CLUSTER_DISTANCE_M, settings.CLUSTER_TIME_S, state
+    )
+    first_cluster_id = first_batch.cluster_id.copy()
+    first_batch.mark_streamed_clusters(state, settings.CLUSTER_TIME_S)
+
+    # Only the clusters ending before the GOES-18 data can join them are
+    # reported, including some ending before the GOES-16 data could
+    watermark_s = np.max(time_s[first_rows][sat_id[first_rows] == 18])
+    cluster_end_s = {
+        cluster: np.max(time_s[first_rows][first_cluster_id == cluster])
+        for cluster in np.unique(first_cluster_id)
+    }
+    are_reported = first_batch.cluster_id != first_batch.BAD_CLUSTER_ID
+    assert np.any(are_reported)
+    for cluster, end_s in cluster_end_s.items():
+        assert np.all(
+            are_reported[first_cluster_id == cluster]
+            == (end_s < watermark_s - settings.CLUSTER_TIME_S)
+        )
+    assert any(
+        watermark_s - settings.CLUSTER_TIME_S <= end_s < 20 - settings.CLUSTER_TIME_S
+        for end_s in cluster_end_s.values()
+    )
+
+    # The second batch overlaps the first from 10 s, with its own basetime,
+    # and its clusters match clustering the combined data from scratch
+    second_rows = np.flatnonzero(time_s >= 10)
+    second_batch = make_glm_data_set(
+        time_s[second_rows] - 10,
+        sat_id[second_rows],
+        group_id[second_rows],
+        lat_lon_deg[second_rows],
+        BASETIME_SSUE + 10,
+    )
+    second_batch.cluster_glm_data(
+        settings.CLUSTER_DISTANCE_M, settings.CLUSTER_TIME_S, state
+    )
+    assert_same_clusters(second_batch.cluster_id, combined.cluster_id[second_rows])
+
+    # The clusters reported by the first batch are not reported again
+    reported_group_ids = first_batch.group_id[are_reported]
+    second_batch.mark_streamed_clusters(state, settings.CLUSTER_TIME_S)
+    are_reported_again = np.isin(second_batch.group_id, reported_group_ids)
+    assert np.any(are_reported_again)
+    assert np.all(
+        second_batch.cluster_id[are_reported_again] == second_batch.BAD_CLUSTER_ID
+    )
+
+
+@pytest.mark.parametrize(
+    "max_groups, expected_shed_counts, expected_group_ids",
+    [
+        (20, [], np.arange(20)),
+        (19, [("degraded quality", 2)], np.arange(2, 20)),
+        (15, [("degraded quality", 2), ("low energy", 3)], np.arange(5, 20)),
+        (
+            10,
+            [("degraded quality", 2), ("low energy", 3), ("dense cells", 8)],
+            np.arange(13, 20),
+        ),
+        (
+            5,
+            [("degraded quality", 2), ("low energy", 3), ("dense cells", 12)],
+            np.arange(13, 16),
+        ),
+    ],
+)
+def test_shed_load(monkeypatch, max_groups, expected_shed_counts, expected_group_ids):
+    """test_shed_load(monkeypatch, max_groups, expected_shed_counts,
+    expected_group_ids)"""
+    monkeypatch.setattr(settings, "SHED_ENERGY_FRACTION", 0.5)
+    monkeypatch.setattr(settings, "SHED_CELL_SIZE_DEG", 1.0)
+    # Groups 5-12 of GOES-16 share the densest cell, and groups 16-19 of
+    # GOES-18 share its lat-lon cell but are counted apart from them
+    sat_id = np.array([16] * 16 + [18] * 4)
+    lat_lon_deg = np.array(
+        [[30.5, -70.5]] * 5
+        + [[20.5, -80.5]] * 8
+        + [[25.5, -75.5]] * 3
+        + [[20.5, -80.5]] * 4
+    )
+    glmdata = make_glm_data_set(
+        np.linspace(0, 19, 20), sat_id, np.arange(20), lat_lon_deg, BASETIME_SSUE
+    )
+    glmdata.quality_flag[:2] = gds.GOOD_QUALITY_FLAG + 1
+    glmdata.energy_joules[2:5] = 0.1
+
+    # The stages run in order, each only while there are too many groups
+    shed_counts = glmdata.shed_load(max_groups, min_energy_j=1.0)
+    assert shed_counts == expected_shed_counts
+    np.testing.assert_array_equal(glmdata.group_id, expected_group_ids)
+    np.testing.assert_array_equal(glmdata.sat_id, sat_id[expected_group_ids])
+    np.testing.assert_array_equal(
+        glmdata.cloud_top_lat_lon_deg, lat_lon_deg[expected_group_ids]
+    )
+
+
+def test_mark_higher_energies():
+    """test_mark_higher_energies()"""
+    cluster_id = np.array([1, 1, 1, 1, 1, 2, 2, -1, 2, 2, 1, 1])
+    sat_id = np.array([16, 16, 16, 18, 16, 16, 16, 16, 18, 18, 18, 16])
+    time_s = np.array([0.0, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 1.0, 1.0, 0.5, 0.0])
+    energy_joules = np.array([5, 3, 7, 2, 7, 9, 9, 100, 4, 4, 6, 5], dtype=float)
+    glmdata = make_glm_data_set(
+        time_s, sat_id, np.arange(12), np.zeros((12, 2)), BASETIME_SSUE
+    )
+    glmdata.cluster_id = cluster_id.astype(gds.CLUSTER_ID_DTYPE)
+    glmdata.energy_joules = energy_joules
+    glmdata.highest_energy[:] = 1
+
+    # Each cluster, satellite, and time flags its highest energy. Of tied
+    # energies the first row is flagged, and the bad cluster is left as is.
+    glmdata.mark_higher_energies()
+    np.testing.assert_array_equal(
+        glmdata.highest_energy, [1, 0, 1, 0, 0, 1, 0, 1, 1, 0, 1, 0]
+    )
+
+
+def test_load_glm_data_layout(tmp_path):
+    """test_load_glm_data_layout()"""
+    data_dir = str(tmp_path) + "/"
+    for file_path in glob.glob(os.path.join(TEST_DATA_DIR, "*.nc")):
+        shutil.copy(file_path, data_dir)
+    glmdata = gds.GlmDataSet(StatusHelperStub())
+    event_ssue = get_ssue_from_datetime_string("20240425122540")
+    assert glmdata.load_glm_data_at_time(data_dir, event_ssue - 10, event_ssue + 10)
+
+    # The group level arrays are compact and have one row per group
+    expected_dtypes = {
+        "sat_id": gds.SAT_ID_DTYPE,
+        "cluster_id": gds.CLUSTER_ID_DTYPE,
+        "sat_pos_index": gds.SAT_POS_INDEX_DTYPE,
+        "yaw_flip_flag": gds.FLAG_DTYPE,
+        "fitness": gds.FLAG_DTYPE,
+        "highest_energy": gds.FLAG_DTYPE,
+    }
+    for array_name in gds.GlmDataSet.GROUP_ARRAY_NAMES:
+        group_array = getattr(glmdata, array_name)
+        assert len(group_array) == len(glmdata.group_id)
+        if array_name in expected_dtypes:
+            assert group_array.dtype == expected_dtypes[array_name]
+
+    # Each group looks up the position of the satellite that recorded it
+    assert glmdata.sat_pos_table.shape == (4, 3)
+    assert np.all(glmdata.sat_pos_index < len(glmdata.sat_pos_table))
+    assert set(np.unique(glmdata.sat_id)) == {16, 18}
+    for file_path in glob.glob(data_dir + "*.nc"):
+        sat_id = 16 if "_G16_" in file_path else 18
+        sat_pos_ecef_m = decode_glm_file(
+            file_path,
+            (glmdata.CLOUD_TOP_EQUATOR_M, glmdata.CLOUD_TOP_POLE_M),
+            (glmdata.HIGH_ALTITUDE_M, glmdata.LOW_ALTITUDE_M),
+        )["sat_pos_ecef_m"]
+        np.testing.assert_array_equal(
+            glmdata.get_sat_pos_ecef_m(glmdata.sat_id == sat_id),
+            np.tile(sat_pos_ecef_m, (np.sum(glmdata.sat_id == sat_id), 1)),
+        )
@@ -0,0 +1,119 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+
+import numpy as np
+import pytest
+
+import src.glm_data_set as gds
+from config import glmtriggergenconfig as settings
+from src.helper_funs.glm_data_set_helpers import compact_batch, get_process_stages
+
+
+class StatusHelperStub:
+    """StatusHelperStub
+
+    Collects the logs sent by a GlmDataSet
+    """
+
+    def __init__(self) -> None:
+        self.logs = []
+
+    def send_status(self, status):
+        pass
+
+    def send_logs(self, log_tuples_list):
+        self.logs.extend(log_tuples_list)
+
+
+def test_get_process_stages():
+    """test_get_process_stages()"""
+    stages = get_process_stages(settings.PROCESS_STAGES)
+    assert [stage.name for stage in stages] == settings.PROCESS_STAGES
+
+    # Optional stages can be disabled
+    stage_names = [
+        name
+        for name in settings.PROCESS_STAGES
+        if name not in ("rocket_filter", "plot_clusters")
+    ]
+    assert len(get_process_stages(stage_names)) == len(stage_names)
+
+    # Required stages cannot be disabled
+    with pytest.raises(ValueError, match="Required"):
+        get_process_stages([name for name in stage_names if name != "rank"])
+
+    # Stages cannot run before the stages producing their inputs
+    stage_names = list(settings.PROCESS_STAGES)
+    stage_names.remove("mark_bad_points")
+    stage_names.insert(stage_names.index("mark_higher_energies"), "mark_bad_points")
+    with pytest.raises(ValueError, match="mark_bad_points"):
+        get_process_stages(stage_names)
+
+    with pytest.raises(ValueError, match="Unknown"):
+        get_process_stages(settings.PROCESS_STAGES + ["not_a_stage"])
+
+
+def test_compact_batch(monkeypatch):
+    """test_compact_batch(monkeypatch)"""
+    status_helper = StatusHelperStub()
+    glmdata = gds.GlmDataSet(status_helper)
+    num_groups = 100
+    for array_name in glmdata.GROUP_ARRAY_NAMES:
+        setattr(glmdata, array_name, np.arange(num_groups))
+    glmdata.cluster_id = np.repeat(np.arange(-1, 9), 10).astype(np.int32)
+    glmdata.sat_id = np.tile([16, 18], 50).astype(np.uint8)
+    glmdata.time_s = np.arange(num_groups) / 10.0
+    glmdata.group_id = np.arange(num_groups) + 1000
+    for array_name in glmdata.EVENT_ARRAY_NAMES:
+        setattr(glmdata, array_name, np.arange(3 * num_groups))
+    glmdata.event_parent_group_id = np.repeat(np.arange(num_groups) + 1000, 3)
+    batch = {"glmdata": glmdata, "status_helper": status_helper}
+    monkeypatch.setattr(settings, "COMPACT_LIVE_FRACTION", 0.5)
+
+    # The live clusters hold most of the groups, so nothing is compacted
+    glmdata.mark_rows_bad(glmdata.cluster_id < 3)
+    compact_batch(batch, are_ranked=False)
+    assert glmdata.time_s.size == num_groups
+
+    # Compacting drops the bad groups and their events
+    glmdata.mark_rows_bad(glmdata.cluster_id < 5)
+    compact_batch(batch, are_ranked=False)
+    np.testing.assert_array_equal(glmdata.cluster_id, np.repeat(np.arange(5, 9), 10))
+    np.testing.assert_array_equal(glmdata.group_id, np.arange(60, 100) + 1000)
+    np.testing.assert_array_equal(glmdata.event_time, np.arange(180, 300))
+    np.testing.assert_array_equal(
+        glmdata.event_parent_group_id, np.repeat(glmdata.group_id, 3)
+    )
+    cluster_sat_rows = glmdata.get_cluster_sat_rows()
+    assert [cluster_id for cluster_id, _, _ in cluster_sat_rows] == [
+        5,
+        5,
+        6,
+        6,
+        7,
+        7,
+        8,
+        8,
+    ]
+
+    # After ranking, only the good clusters are kept
+    batch["good_cluster_ids"] = np.array([6])
+    compact_batch(batch, are_ranked=True)
+    np.testing.assert_array_equal(glmdata.group_id, np.arange(70, 80) + 1000)
+    np.testing.assert_array_equal(glmdata.event_time, np.arange(210, 240))
@@ -0,0 +1,88 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+
+import glob
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.helper_funs.glm_decode_helpers import (
+    DecodedFileCache,
+    decode_glm_file,
+    get_block_nbytes,
+)
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), "test_data")
+CLOUD_TOP_ALTS_M = (14e3, 6e3)
+PIERCE_ALTS_M = (100e3, 0)
+
+
+def test_decoded_file_cache(tmp_path):
+    """test_decoded_file_cache()"""
+    data_dir = str(tmp_path) + "/"
+    for file_path in sorted(glob.glob(os.path.join(TEST_DATA_DIR, "*G16*.nc"))):
+        shutil.copy(file_path, data_dir)
+    first_file, second_file = sorted(glob.glob(data_dir + "*.nc"))
+
+    # Repeated requests are answered from the cache
+    cache = DecodedFileCache(max_bytes=2**40)
+    first_block = cache.get(first_file, CLOUD_TOP_ALTS_M, PIERCE_ALTS_M)
+    assert len(first_block["time_s"]) == len(first_block["group_id"])
+    assert first_block["high_pos_ecef_m"].shape == (len(first_block["group_id"]), 3)
+    assert cache.get(first_file, CLOUD_TOP_ALTS_M, PIERCE_ALTS_M) is first_block
+
+    # Files changed on disk are decoded again
+    file_stat = os.stat(first_file)
+    os.utime(first_file, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 1))
+    assert cache.get(first_file, CLOUD_TOP_ALTS_M, PIERCE_ALTS_M) is not first_block
+
+    # The least recently used file is evicted beyond max_bytes
+    second_block = cache.get(second_file, CLOUD_TOP_ALTS_M, PIERCE_ALTS_M)
+    cache = DecodedFileCache(
+        max_bytes=max(get_block_nbytes(first_block), get_block_nbytes(second_block))
+    )
+    cache.get(first_file, CLOUD_TOP_ALTS_M, PIERCE_ALTS_M)
+    cache.get(second_file, CLOUD_TOP_ALTS_M, PIERCE_ALTS_M)
+    assert list(cache.entries) == [second_file]
+    assert cache.total_bytes <= cache.max_bytes
+
+
+def test_decode_glm_file_from_threads():
+    """test_decode_glm_file_from_threads()"""
+    file_paths = sorted(glob.glob(os.path.join(TEST_DATA_DIR, "*.nc"))) * 4
+    expected_blocks = [
+        decode_glm_file(file_path, CLOUD_TOP_ALTS_M, PIERCE_ALTS_M)
+        for file_path in file_paths
+    ]
+
+    # Decoding on several threads at once gives the same data as serially
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        blocks = list(
+            executor.map(
+                lambda file_path: decode_glm_file(
+                    file_path, CLOUD_TOP_ALTS_M, PIERCE_ALTS_M
+                ),
+                file_paths,
+            )
+        )
+    for block, expected_block in zip(blocks, expected_blocks):
+        for name, expected_array in expected_block.items():
+            np.testing.assert_array_equal(block[name], expected_array)
@@ -0,0 +1,103 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+
+import numpy as np
+
+from src.helper_funs.index_helpers import ClusterSegmentIndex, GroupEventIndex
+
+
+def test_group_event_index():
+    """test_group_event_index()"""
+    rng = np.random.default_rng(321)
+    event_parent_group_id = rng.integers(0, 50, size=1000).astype(np.uint32)
+    index = GroupEventIndex(event_parent_group_id)
+
+    # The events of each group match a full scan, in their original order
+    for group_id in range(-1, 52):
+        np.testing.assert_array_equal(
+            index.event_indices(group_id),
+            np.where(event_parent_group_id == group_id)[0],
+        )
+    group_ids = np.arange(-1, 52)
+    np.testing.assert_array_equal(
+        index.event_counts(group_ids),
+        [np.sum(event_parent_group_id == group_id) for group_id in group_ids],
+    )
+
+    assert index.is_built_from(event_parent_group_id)
+    assert not index.is_built_from(event_parent_group_id.copy())
+
+
+def test_cluster_segment_index():
+    """test_cluster_segment_index()"""
+    rng = np.random.default_rng(321)
+    cluster_id = rng.integers(-1, 20, size=500).astype(np.int32)
+    sat_id = rng.choice([16, 18], size=500).astype(np.uint8)
+    time_s = rng.integers(0, 100, size=500) / 10.0
+    index = ClusterSegmentIndex(cluster_id, sat_id, time_s, -1)
+
+    def check_segments():
+        live_cluster_ids = np.unique(cluster_id[cluster_id != -1])
+        np.testing.assert_array_equal(index.live_cluster_ids(), live_cluster_ids)
+        assert index.has_bad_rows() == np.any(cluster_id == -1)
+        range_cluster_ids, start_times, end_times = index.live_cluster_time_ranges(
+            time_s
+        )
+        np.testing.assert_array_equal(range_cluster_ids, live_cluster_ids)
+        np.testing.assert_array_equal(
+            start_times, [np.min(time_s[cluster_id == i]) for i in live_cluster_ids]
+        )
+        np.testing.assert_array_equal(
+            end_times, [np.max(time_s[cluster_id == i]) for i in live_cluster_ids]
+        )
+        for cur_cluster_id in live_cluster_ids:
+            segment_inds = index.live_segments(cur_cluster_id)
+            np.testing.assert_array_equal(
+                index.segment_sat_ids[segment_inds],
+                np.unique(sat_id[cluster_id == cur_cluster_id]),
+            )
+            for segment_ind in segment_inds:
+                rows = index.segment_rows(segment_ind)
+                # Rows are in time order, with ties in their original order
+                expected_rows = np.where(
+                    (cluster_id == cur_cluster_id)
+                    & (sat_id == index.segment_sat_ids[segment_ind])
+                )[0]
+                expected_rows = expected_rows[
+                    np.argsort(time_s[expected_rows], kind="stable")
+                ]
+                np.testing.assert_array_equal(rows, expected_rows)
+
+    check_segments()
+    assert index.live_segments(-1).size == 0
+    assert index.live_segments(25).size == 0
+
+    # Marking whole clusters and cluster-satellite pairs keeps the index in sync
+    bad_rows = (cluster_id == 3) | ((cluster_id == 7) & (sat_id == 16))
+    cluster_id[bad_rows] = -1
+    assert index.mark_rows_bad(bad_rows)
+    check_segments()
+
+    # Marking part of a segment cannot be kept in sync
+    bad_rows = np.where(cluster_id == 5)[0][:1]
+    cluster_id[bad_rows] = -1
+    assert not index.mark_rows_bad(bad_rows)
+
+    assert index.is_built_from(cluster_id)
+    assert not index.is_built_from(cluster_id.copy())
@@ -0,0 +1,112 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+
+import numpy as np
+
+import src.helper_funs.math_helpers as mh
+from src.helper_funs.math_helpers import (
+    continuous_above_min,
+    energy_filter,
+    segment_continuous_above_min,
+    segment_energy_filter,
+    segment_low_medians,
+    segment_percentiles,
+)
+
+
+def test_segment_reductions():
+    """test_segment_reductions()"""
+    rng = np.random.default_rng(321)
+    segment_counts = rng.integers(1, 30, size=200)
+    segment_starts = np.cumsum(segment_counts) - segment_counts
+    energies = rng.normal(size=np.sum(segment_counts)).astype(np.float32)
+    segments = [
+        energies[start : start + count]
+        for start, count in zip(segment_starts, segment_counts)
+    ]
+
+    # Each segment matches the single segment functions
+    for max_mistakes in (0, 1, 3):
+        np.testing.assert_array_equal(
+            segment_continuous_above_min(energies, segment_starts, 0.2, max_mistakes),
+            [continuous_above_min(segment, 0.2, max_mistakes) for segment in segments],
+        )
+    medians = segment_low_medians(energies, segment_starts, 0.1)
+    assert medians.dtype == energies.dtype
+    np.testing.assert_array_equal(
+        medians,
+        [
+            np.median(np.sort(segment)[: int(np.ceil(len(segment) * 0.1))])
+            for segment in segments
+        ],
+    )
+    for dtype in (np.float32, np.float64):
+        percentiles = segment_percentiles(energies.astype(dtype), segment_starts, 90)
+        assert percentiles.dtype == dtype
+        np.testing.assert_array_equal(
+            percentiles,
+            [np.percentile(segment.astype(dtype), 90) for segment in segments],
+        )
+
+
+def test_segment_energy_filter(monkeypatch):
+    """test_segment_energy_filter(monkeypatch)"""
+    rng = np.random.default_rng(321)
+    segment_counts = rng.integers(1, 40, size=100)
+    segment_starts = np.cumsum(segment_counts) - segment_counts
+    num_points = np.sum(segment_counts)
+    # Smooth curves with drops, some small enough to reach the min difference
+    energies = np.repeat(rng.choice([1e-16, 1e-15, 1e-14], 100), segment_counts) * (
+        1 + 0.01 * rng.normal(size=num_points)
+    )
+    are_drops = rng.random(num_points) < 0.15
+    energies[are_drops] *= rng.choice([0.1, 0.5, 0.9], np.sum(are_drops))
+
+    for dtype in (np.float32, np.float64):
+        segment_energies = energies.astype(dtype)
+        segments = [
+            segment_energies[start : start + count]
+            for start, count in zip(segment_starts, segment_counts)
+        ]
+        expected_forward = np.concatenate(
+            [energy_filter(segment, 0, len(segment) - 1, 5) for segment in segments]
+        )
+        expected_backward = np.concatenate(
+            [energy_filter(segment, len(segment) - 1, 0, 5) for segment in segments]
+        )
+        assert np.any(expected_forward == 0) and np.any(expected_backward == 0)
+
+        # The JIT compiled (if available), Python, and NumPy versions all match
+        # the single segment function
+        for loop in (
+            mh.energy_filter_segments_jit,
+            mh.energy_filter_segments_loop,
+            None,
+        ):
+            monkeypatch.setattr(mh, "energy_filter_segments_jit", loop)
+            np.testing.assert_array_equal(
+                segment_energy_filter(segment_energies, segment_starts, 5),
+                expected_forward,
+            )
+            np.testing.assert_array_equal(
+                segment_energy_filter(
+                    segment_energies, segment_starts, 5, backward=True
+                ),
+                expected_backward,
+            )
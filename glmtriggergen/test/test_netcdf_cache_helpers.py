@@ -0,0 +1,55 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+
+import glob
+import os
+import shutil
+
+from src.helper_funs.datetime_helpers import get_ssue_from_datetime_string
+from src.helper_funs.netcdf_cache_helpers import NetcdfFileCache
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), "test_data")
+
+
+def test_netcdf_cache_eviction(tmp_path):
+    """test_netcdf_cache_eviction()"""
+    data_dir = str(tmp_path) + "/"
+    for file_path in sorted(glob.glob(os.path.join(TEST_DATA_DIR, "*.nc"))):
+        shutil.copy(file_path, data_dir)
+    file_paths = sorted(glob.glob(data_dir + "*.nc"))
+    g16_first_file, g16_second_file, g18_first_file, g18_second_file = file_paths
+
+    # Budget for a single file, with the files found on disk at startup
+    cache = NetcdfFileCache(data_dir, max_bytes=os.path.getsize(g18_second_file))
+    assert sorted(cache.entries) == file_paths
+
+    # Pin the second files with a queued event, the rest go least recently
+    # used first
+    event_ssue = get_ssue_from_datetime_string("20240425122550")
+    deleted_files = cache.evict([event_ssue])
+    assert deleted_files == [g16_first_file, g18_first_file]
+    assert sorted(glob.glob(data_dir + "*.nc")) == [g16_second_file, g18_second_file]
+
+    # A restart picks up the manifest. Once unpinned, the least recently used
+    # file is evicted.
+    cache = NetcdfFileCache(data_dir, max_bytes=os.path.getsize(g18_second_file))
+    assert sorted(cache.entries) == [g16_second_file, g18_second_file]
+    cache.add([g18_second_file])
+    assert cache.evict([]) == [g16_second_file]
+    assert cache.total_bytes() <= cache.max_bytes
@@ -0,0 +1,98 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+
+import glob
+import os
+import shutil
+import threading
+
+import src.glm_data_set as gds
+import src.helper_funs.prefetch_helpers as pfh
+from src.helper_funs.datetime_helpers import get_ssue_from_datetime_string
+from src.helper_funs.file_io_helpers import get_glm_file_index
+from src.helper_funs.glm_decode_helpers import DecodedFileCache
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), "test_data")
+
+
+class NoStatus:
+    """Stand in for a StatusHelper that drops everything"""
+
+    def send_status(self, status_tuples_list):
+        """send_status(status_tuples_list)"""
+
+    def send_logs(self, log_tuples_list):
+        """send_logs(log_tuples_list)"""
+
+
+def test_prefetcher_releases_finished_slots(monkeypatch):
+    """test_prefetcher_releases_finished_slots()"""
+    can_download = threading.Event()
+
+    def download_glm_files(start_time_ssue, end_time_ssue, data_dir, status_helper):
+        can_download.wait()
+        return [f"{data_dir}{(start_time_ssue + end_time_ssue) / 2:.0f}.nc"], True
+
+    monkeypatch.setattr(pfh, "download_glm_files", download_glm_files)
+    monkeypatch.setattr(pfh.settings, "DECODED_FILE_CACHE_MAX_BYTES", 0)
+    prefetcher = pfh.GlmFilePrefetcher("data/", NoStatus(), max_windows=2)
+
+    # Only max_windows event times are scheduled or in flight at once
+    for event_ssue in (100, 200, 300):
+        prefetcher.schedule(event_ssue)
+    assert list(prefetcher.pending) == [100, 200]
+
+    # Finished guesses that are never collected free their slots
+    can_download.set()
+    prefetcher.executor.submit(lambda: None).result()
+    assert not prefetcher.pending
+    prefetcher.schedule(300)
+    prefetcher.schedule(200)
+    prefetcher.executor.submit(lambda: None).result()
+
+    # Only max_windows of them are held, older ones are handed over with the
+    # next collected event time
+    assert list(prefetcher.finished) == [200, 300]
+    assert prefetcher.collect(300) == ["data/100.nc", "data/300.nc"]
+    assert prefetcher.collect(300) == []
+
+    # The others are still handed over on shutdown
+    assert prefetcher.shutdown() == ["data/200.nc"]
+
+
+def test_prefetcher_decodes_files(monkeypatch, tmp_path):
+    """test_prefetcher_decodes_files()"""
+    data_dir = str(tmp_path) + "/"
+    for file_path in glob.glob(os.path.join(TEST_DATA_DIR, "*.nc")):
+        shutil.copy(file_path, data_dir)
+    monkeypatch.setattr(pfh, "download_glm_files", lambda *args: [[], True])
+    monkeypatch.setattr(pfh.settings, "PROCESS_TIME_SIZE_S", 20.0)
+    decoded_file_cache = DecodedFileCache(max_bytes=2**40)
+    monkeypatch.setattr(gds, "DECODED_FILE_CACHE", decoded_file_cache)
+
+    # The files of a prefetched event time are decoded in the background
+    prefetcher = pfh.GlmFilePrefetcher(data_dir, NoStatus())
+    event_ssue = get_ssue_from_datetime_string("20240425122550")
+    prefetcher.schedule(event_ssue)
+    prefetcher.collect(event_ssue)
+    prefetcher.shutdown()
+    assert sorted(decoded_file_cache.entries) == sorted(
+        get_glm_file_index(data_dir).query(event_ssue - 10, event_ssue + 10)
+    )
+    assert len(decoded_file_cache.entries) == 2
@@ -0,0 +1,146 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+
+import glob
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import src.helper_funs.gcloud_helpers as ghf
+from src.helper_funs.datetime_helpers import get_ssue_from_datetime_string
+from src.helper_funs.file_io_helpers import download_glm_files
+from src.helper_funs.storage_backends import LocalStorageBackend, StorageBackend
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), "test_data")
+
+
+class NoStatus:
+    """Stand in for a StatusHelper that drops everything"""
+
+    def send_status(self, status_tuples_list):
+        """send_status(status_tuples_list)"""
+
+    def send_logs(self, log_tuples_list):
+        """send_logs(log_tuples_list)"""
+
+
+def make_bucket_mirror(root_dir):
+    """make_bucket_mirror(root_dir)
+
+    Copy the test data into a directory mirroring the GOES gcloud buckets
+    """
+    for file_path in glob.glob(os.path.join(TEST_DATA_DIR, "*.nc")):
+        file_name = os.path.basename(file_path)
+        sat_id = file_name[16:18]
+        hour_dir = os.path.join(
+            root_dir,
+            f"gcp-public-data-goes-{sat_id}",
+            "GLM-L2-LCFA",
+            file_name[20:24],
+            file_name[24:27],
+            file_name[27:29],
+        )
+        os.makedirs(hour_dir, exist_ok=True)
+        shutil.copy(file_path, hour_dir)
+
+
+def test_incomplete_storage_backend():
+    """test_incomplete_storage_backend()"""
+
+    class ListingOnlyBackend(StorageBackend):
+        """A backend missing most of the interface"""
+
+        def list_prefix(self, uri_prefix):
+            return []
+
+    with pytest.raises(TypeError, match="fetch_to_path"):
+        ListingOnlyBackend()
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+
+def test_local_storage_backend(tmp_path):
+    """test_local_storage_backend()"""
+    make_bucket_mirror(str(tmp_path))
+    backend = LocalStorageBackend(str(tmp_path))
+    hour_uri = "gs://gcp-public-data-goes-16/GLM-L2-LCFA/2024/116/12/"
+
+    files = backend.list_prefix(hour_uri)
+    assert len(files) == 2
+    assert backend.list_prefix(hour_uri + "OR_GLM-L2-LCFA_G16_s2024116122540") == [
+        files[1]
+    ]
+    assert backend.list_prefix(hour_uri.replace("/12/", "/13/")) == []
+
+    assert not backend.fetch_to_path(
+        hour_uri + "missing.nc", str(tmp_path / "missing.nc")
+    )
+    assert not os.path.exists(tmp_path / "missing.nc")
+
+
+def test_concurrent_fetch_to_path(tmp_path):
+    """test_concurrent_fetch_to_path()"""
+    bucket_dir = tmp_path / "buckets"
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    make_bucket_mirror(str(bucket_dir))
+    backend = LocalStorageBackend(str(bucket_dir))
+    uri = backend.list_prefix("gs://gcp-public-data-goes-16/GLM-L2-LCFA/2024/116/12/")[
+        0
+    ]
+    local_path = str(data_dir / os.path.basename(uri))
+
+    # Fetches of the same file each write their own temporary file
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        fetched = list(
+            executor.map(lambda _: backend.fetch_to_path(uri, local_path), range(8))
+        )
+
+    assert all(fetched)
+    with open(local_path, "rb") as local_file, open(
+        backend.get_local_path(uri), "rb"
+    ) as bucket_file:
+        assert local_file.read() == bucket_file.read()
+    assert os.listdir(data_dir) == [os.path.basename(uri)]
+
+
+def test_download_glm_files_from_local_backend(tmp_path, monkeypatch):
+    """test_download_glm_files_from_local_backend()"""
+    bucket_dir = tmp_path / "buckets"
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    make_bucket_mirror(str(bucket_dir))
+    monkeypatch.setattr(ghf, "BACKEND", LocalStorageBackend(str(bucket_dir)))
+    monkeypatch.setattr(
+        ghf, "LISTING_CACHE", ghf.GcloudListingCache(20, 200, cache_file="")
+    )
+
+    event_ssue = get_ssue_from_datetime_string("20240425122540")
+    [local_filenames, got_all] = download_glm_files(
+        event_ssue - 10, event_ssue + 10, str(data_dir) + "/", NoStatus()
+    )
+
+    assert got_all
+    assert sorted(os.path.basename(file) for file in local_filenames) == sorted(
+        os.path.basename(file)
+        for file in glob.glob(os.path.join(TEST_DATA_DIR, "*.nc"))
+    )
+    assert not glob.glob(str(data_dir / "*.part"))
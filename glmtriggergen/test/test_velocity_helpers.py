@@ -0,0 +1,62 @@
+################################################################################################
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#################################################################################################
+import numpy as np
+
+from src.helper_funs.velocity_helpers import (
+    associate_los_vectors,
+    compute_nearest_approach_points,
+)
+
+
+def test_associate_los_vectors():
+    """test_associate_los_vectors()"""
+    least_times_s = np.array([0.125, 0.25, 0.3125, 0.5])
+    most_times_s = np.array(
+        [0.1171875, 0.1328125, 0.1328125, 0.30078125, 0.33203125, 0.625]
+    )
+    least_cluster_sat_data = (least_times_s, np.arange(4), np.arange(4))
+    most_cluster_sat_data = (most_times_s, np.arange(6), np.arange(6))
+
+    (least_associated, most_associated) = associate_los_vectors(
+        least_cluster_sat_data, most_cluster_sat_data
+    )
+
+    # Ties go to the earlier point, and points without a match within the
+    # window are dropped
+    np.testing.assert_array_equal(least_associated[1], [0, 2])
+    np.testing.assert_array_equal(most_associated[1], [0, 3])
+    np.testing.assert_array_equal(most_associated[0], [0.1171875, 0.30078125])
+
+
+def test_compute_nearest_approach_points():
+    """test_compute_nearest_approach_points()"""
+    rng = np.random.default_rng(321)
+    points_m = rng.normal(size=(5, 3)) * 1e5 + [6.4e6, 0, 0]
+    sat0_pos_m = np.array([4.2e7, -1e7, 0.0])
+    sat1_pos_m = np.array([4.2e7, 1e7, 0.0])
+
+    # Lines-of-sight from both satellites through the same points
+    (points, lats, lons, alts, times) = compute_nearest_approach_points(
+        (np.arange(5.0), sat0_pos_m + 0 * points_m, 2 * points_m - sat0_pos_m),
+        (np.arange(5.0) + 1, sat1_pos_m + 0 * points_m, 2 * points_m - sat1_pos_m),
+    )
+
+    np.testing.assert_allclose(points, points_m, atol=1e-3)
+    np.testing.assert_allclose(times, np.arange(5.0) + 0.5)
+    assert len(lats) == len(lons) == len(alts) == 5